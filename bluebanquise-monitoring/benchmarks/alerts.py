@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Healthchecker alert delivery benchmark.
+
+Starts the local SMTP stand-in (benchmarks/smtp_standin.py), then feeds
+the alert dispatcher with host transitions, as the monitoring loop does:
+  - outage: N hosts going to ERROR over R rounds (a rack power failure),
+    then recovering
+  - flapping: one host going ERROR and back every round
+and reports the time the loop spent queuing alerts, and the SMTP
+sessions and emails the stand-in received.
+
+Usage, from bluebanquise-monitoring folder:
+  python3 benchmarks/alerts.py [-n HOSTS] [-r ROUNDS] [-d DIGEST_INTERVAL]
+
+Digest interval defaults to 0 here, a digest per round, the worst case.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from engines import free_port, load_healthchecker, MONITORING_DIR
+
+
+def start_standin(port: int):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(MONITORING_DIR, "benchmarks", "smtp_standin.py"), "--port", str(port)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    # Stand-in prints a line once listening
+    if not process.stdout.readline():
+        raise RuntimeError("SMTP stand-in did not start")
+    lines = []
+    reader = threading.Thread(target=lambda: lines.extend(iter(process.stdout.readline, "")), daemon=True)
+    reader.start()
+    return process, reader, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Healthchecker alert delivery benchmark")
+    parser.add_argument("-n", "--hosts", type=int, default=500, help="Hosts failing")
+    parser.add_argument("-r", "--rounds", type=int, default=10, help="Rounds the failure is spread over")
+    parser.add_argument("-d", "--digest-interval", type=float, default=0, help="email.digest_interval")
+    args = parser.parse_args()
+
+    hc = load_healthchecker()
+    port = free_port()
+    standin, reader, lines = start_standin(port)
+    email_cfg = {
+        "enabled": True, "smtp_server": "127.0.0.1", "smtp_port": port, "username": "bench",
+        "password": "bench", "from": "monitor@localhost", "to": ["admin@localhost"], "use_tls": False,
+        "send_recovery": True, "digest_interval": args.digest_interval,
+    }
+    alerts = hc.AlertDispatcher(email_cfg)
+    failed = {"errors": True, "healthchecks": [{"name": "check", "stdout": "", "stderr": "down", "error": True}]}
+    ok = {"errors": False, "healthchecks": [{"name": "check", "stdout": "", "stderr": "", "error": False}]}
+    hosts = [f"c{i:05d}" for i in range(args.hosts)]
+    per_round = max(1, len(hosts) // args.rounds)
+    queued = 0.0
+    try:
+        for round_hosts, data, prev_errors in (
+            *((hosts[i:i + per_round], failed, False) for i in range(0, len(hosts), per_round)),
+            (hosts, ok, True),
+            *(([f"flapping"], failed if r % 2 == 0 else ok, r % 2 == 1) for r in range(2 * args.rounds)),
+        ):
+            start = time.perf_counter()
+            for host in round_hosts:
+                alerts.add(host, data, prev_errors)
+            alerts.flush()
+            queued += time.perf_counter() - start
+            # Let the dispatcher send between rounds, as rounds are seconds apart
+            time.sleep(0.05)
+        alerts.close()
+        time.sleep(0.2)
+    finally:
+        standin.kill()
+        standin.wait()
+        reader.join(timeout=1)
+
+    sessions = sum(1 for line in lines if line.startswith("SESSION"))
+    messages = [line.split(" ", 2)[2].strip() for line in lines if line.startswith("MESSAGE")]
+    transitions = 2 * args.hosts + 2 * args.rounds
+    print(f"{transitions} transitions, {queued * 1000:.1f} ms spent queuing them in the loop")
+    print(f"{sessions} SMTP sessions, {len(messages)} emails:")
+    for subject in messages:
+        print(f"  {subject}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Healthchecker execution engines benchmark.
+
+Starts the local SSH stand-in (benchmarks/ssh_standin.py), then runs
+healthcheck iterations over N hosts (127.0.0.1, 127.0.0.2... all served by
+the stand-in) with each engine, and reports wall time and failed hosts of
+each iteration, and the CPU time used by the healthchecker process (SSH
+key exchanges are mostly CPU):
+  - dask: one task per host on a local cluster (skipped if dask is not
+    installed)
+  - asyncio: one process, at most --concurrency hosts in flight
+  - asyncio + pool: same, SSH connections kept between iterations
+
+Usage, from bluebanquise-monitoring folder:
+  python3 benchmarks/engines.py [-n HOSTS] [-k CHECKS] [-c CONCURRENCY] [-i ITERATIONS]
+"""
+
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MONITORING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_healthchecker():
+    # Healthchecker imports its sibling modules
+    if MONITORING_DIR not in sys.path:
+        sys.path.insert(0, MONITORING_DIR)
+    spec = importlib.util.spec_from_file_location(
+        "healthchecker", os.path.join(MONITORING_DIR, "bluebanquise-healthchecker.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin(port: int, workers: int = 1) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(MONITORING_DIR, "benchmarks", "ssh_standin.py"),
+         "--port", str(port), "--workers", str(workers)],
+        stdout=subprocess.PIPE, text=True, start_new_session=True,
+    )
+    # Stand-in prints a line once listening
+    if not process.stdout.readline():
+        raise RuntimeError("SSH stand-in did not start")
+    return process
+
+
+def stop_standin(process: subprocess.Popen) -> None:
+    # Workers are forked in the stand-in session
+    os.killpg(process.pid, signal.SIGKILL)
+    process.wait()
+
+
+def loopback_hosts(count: int) -> list:
+    # 127.0.0.1 ... 127.0.0.254, 127.0.1.1 ...
+    return [f"127.0.{i // 254}.{i % 254 + 1}" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Healthchecker engines benchmark")
+    parser.add_argument("-n", "--hosts", type=int, default=200, help="Hosts")
+    parser.add_argument("-k", "--checks", type=int, default=3, help="Healthchecks per host")
+    parser.add_argument("-c", "--concurrency", type=int, default=500, help="asyncio engine max_concurrency")
+    parser.add_argument("--deadline", type=float, default=120, help="asyncio engine host_deadline")
+    parser.add_argument("-i", "--iterations", type=int, default=3, help="Iterations per engine")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="SSH stand-in processes")
+    args = parser.parse_args()
+
+    hc = load_healthchecker()
+    port = free_port()
+    checks = [{"name": f"check {i}", "command": "echo ok", "ok_exitcode": 0, "timeout": 10}
+              for i in range(args.checks)]
+    hosts_config = {host: {"healthchecks": checks} for host in loopback_hosts(args.hosts)}
+    ssh_args = ("bench", port, "bench", None, 30)
+
+    standin = start_standin(port, args.workers)
+    try:
+        print(f"{args.hosts} hosts, {args.checks} checks per host")
+        print(f"{'engine':<36}{'iteration':>10}{'wall (s)':>10}{'cpu (s)':>10}{'hosts/s':>10}{'failed':>8}")
+
+        def report(name, run_iteration):
+            for iteration in range(args.iterations):
+                start, cpu_start = time.perf_counter(), time.process_time()
+                results = run_iteration()
+                duration, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+                failed = sum(1 for res in results.values() if res["errors"])
+                print(f"{name:<36}{iteration + 1:>10}{duration:>10.2f}{cpu:>10.2f}"
+                      f"{len(results) / duration:>10.1f}{failed:>8}")
+
+        if hc.Client is None:
+            print(f"{'dask':<36}{'skipped, dask.distributed not installed':>48}")
+        else:
+            client = hc.Client(processes=True)
+            report(f"dask ({len(client.nthreads())} workers)",
+                   lambda: hc.run_iteration_dask(client, hosts_config, ssh_args))
+            client.close()
+
+        executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        report(f"asyncio ({args.concurrency} concurrent)",
+               lambda: hc.run_iteration_asyncio(hosts_config, ssh_args, executor, args.concurrency, args.deadline))
+        pool = hc.SSHConnectionPool(*ssh_args[:4])
+        report(f"asyncio + pool ({args.concurrency} concurrent)",
+               lambda: hc.run_iteration_asyncio(
+                   hosts_config, ssh_args, executor, args.concurrency, args.deadline, pool))
+        pool.close()
+        executor.shutdown()
+    finally:
+        stop_standin(standin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Local SMTP stand-in server for healthchecker tests and benchmarks.
+
+Accepts any login (AUTH PLAIN or LOGIN) and any message, without TLS,
+and prints a line per SMTP session opened and per message received:
+
+  python3 benchmarks/smtp_standin.py --port 2525
+  SESSION 1
+  MESSAGE 1 [ALERT] 12 hosts in ERROR
+
+Then point the healthchecker email.smtp_server to 127.0.0.1, smtp_port
+to 2525 and use_tls to false.
+"""
+
+import argparse
+import itertools
+import socketserver
+import sys
+import threading
+from email.parser import BytesHeaderParser
+
+SESSIONS = itertools.count(1)
+OUTPUT_LOCK = threading.Lock()
+
+
+def report(line: str) -> None:
+    with OUTPUT_LOCK:
+        print(line, flush=True)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        session = next(SESSIONS)
+        report(f"SESSION {session}")
+        self.reply("220 smtp-standin ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-smtp-standin\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif verb == "AUTH":
+                # AUTH LOGIN asks user and password, AUTH PLAIN has them inline
+                words = command.split()
+                if len(words) > 1 and words[1].upper() == "LOGIN":
+                    prompts = ["334 VXNlcm5hbWU6", "334 UGFzc3dvcmQ6"][len(words) - 2:]
+                    for prompt in prompts:
+                        self.reply(prompt)
+                        self.rfile.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                headers = BytesHeaderParser().parsebytes(b"".join(data))
+                report(f"MESSAGE {session} {headers.get('Subject', '')}")
+                self.reply("250 2.0.0 Ok: queued")
+            elif verb == "QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 2.0.0 Ok")
+            else:
+                self.reply("502 5.5.2 Command not implemented")
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in server")
+    parser.add_argument("-p", "--port", type=int, default=2525, help="Listening port")
+    args = parser.parse_args()
+
+    server = StandInServer(("127.0.0.1", args.port), SMTPHandler)
+    report(f"SMTP stand-in listening on 127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
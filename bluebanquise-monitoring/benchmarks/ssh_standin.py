@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Local SSH stand-in server for healthchecker tests and benchmarks.
+
+A paramiko based SSH server accepting any user, password or key, running
+exec requests as local shell commands. It listens on all addresses but
+only accepts loopback peers, so that each 127.x.y.z address can stand for
+a different cluster host:
+
+  python3 benchmarks/ssh_standin.py --port 2222 [--workers N]
+
+With several workers, each is a process listening on the same port
+(the listening socket is shared), so that the stand-in is not the bottleneck of a benchmark.
+
+Then point the healthchecker ssh.port to 2222 and use 127.0.0.1,
+127.0.0.2... as host names in hosts.yaml.
+"""
+
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import paramiko
+
+
+class StandInServer(paramiko.ServerInterface):
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_OPEN_REQUEST
+
+    def check_channel_exec_request(self, channel, command):
+        # Started by StandInTransport once the request is answered
+        channel.standin_command = command.decode("utf-8")
+        return True
+
+
+def handle_channel_request(channel: paramiko.Channel, m: paramiko.Message) -> None:
+    paramiko.Channel._handle_request(channel, m)
+    # Commands start after the exec request reply is sent, otherwise a fast
+    # command can close the channel before, which clients see as a failure
+    command = getattr(channel, "standin_command", None)
+    if command is not None:
+        del channel.standin_command
+        threading.Thread(target=run_command, args=(channel, command), daemon=True).start()
+
+
+class StandInTransport(paramiko.Transport):
+    _channel_handler_table = dict(paramiko.Transport._channel_handler_table)
+    _channel_handler_table[paramiko.common.MSG_CHANNEL_REQUEST] = handle_channel_request
+
+
+def run_command(channel: paramiko.Channel, command: str) -> None:
+    try:
+        process = subprocess.Popen(
+            command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        # Forward stderr from a second thread, so that large outputs on
+        # both streams do not block the command
+        def forward_stderr():
+            for chunk in iter(lambda: process.stderr.read1(32768), b""):
+                channel.sendall_stderr(chunk)
+
+        stderr_thread = threading.Thread(target=forward_stderr, daemon=True)
+        stderr_thread.start()
+        for chunk in iter(lambda: process.stdout.read1(32768), b""):
+            channel.sendall(chunk)
+        stderr_thread.join()
+        channel.send_exit_status(process.wait())
+    except (OSError, EOFError):
+        # Client closed the channel (command timeout on its side)
+        return
+    finally:
+        channel.close()
+
+
+def listen(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(4096)
+    return sock
+
+
+def serve(sock: socket.socket, host_key: paramiko.PKey) -> None:
+    while True:
+        client, address = sock.accept()
+        if not address[0].startswith("127."):
+            client.close()
+            continue
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = StandInTransport(client)
+        transport.add_server_key(host_key)
+        try:
+            transport.start_server(server=StandInServer())
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SSH stand-in server")
+    parser.add_argument("-p", "--port", type=int, default=2222, help="Listening port")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Server processes")
+    args = parser.parse_args()
+
+    # Clients closing connections are logged as socket errors
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+    host_key = paramiko.RSAKey.generate(2048)
+    # Listening before the ready line, workers share the socket
+    sock = listen(args.port)
+    for _ in range(args.workers - 1):
+        if os.fork() == 0:
+            break
+    else:
+        print(f"SSH stand-in listening on port {args.port}, loopback peers only", flush=True)
+    try:
+        serve(sock, host_key)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
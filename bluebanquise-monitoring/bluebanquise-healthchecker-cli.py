@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import sys
+import time
 import yaml
 import os
 
+from healthchecker_store import ResultsStore
+
+DB_FILE = "/var/lib/bluebanquise/bluebanquise-healtchecker/results.db"
 RESULTS_FILE = "/var/lib/bluebanquise/bluebanquise-healtchecker/results.yaml"
 
 # ANSI colors
@@ -12,7 +16,18 @@ BOLD = "\033[1m"
 RESET = "\033[0m"
 
 
-def load_results():
+def open_store():
+    # None if the healthchecker only exports results.yaml
+    if not os.path.exists(DB_FILE):
+        return None
+    return ResultsStore(DB_FILE, readonly=True)
+
+
+def load_results(store, host=None, only_errors=False):
+    if store is not None:
+        # Outputs are only needed to show a host
+        return store.latest(host=host, only_errors=only_errors, outputs=host is not None)
+
     if not os.path.exists(RESULTS_FILE):
         print(f"Results file not found: {RESULTS_FILE}")
         sys.exit(1)
@@ -29,11 +44,16 @@ def print_all_hosts(results, only_errors=False):
             continue
 
         status = f"{GREEN}OK{RESET}" if not is_error else f"{RED}ERROR{RESET}"
+        # Hosts not checked anymore, until back up or out of maintenance
+        if data.get("state", "up") != "up":
+            status += f" ({data['state']})"
         print(f"{host}: {status}")
 
 
 def print_host_details(host, data):
     header_status = f"{GREEN}OK{RESET}" if not data.get("errors") else f"{RED}ERROR{RESET}"
+    if data.get("state", "up") != "up":
+        header_status += f" ({data['state']}, results are from its last check)"
     print(f"{BOLD}{host}{RESET} — {header_status}")
     print("-" * 60)
 
@@ -61,25 +81,60 @@ def print_host_details(host, data):
         print("-" * 60)
 
 
-def main():
-    results = load_results()
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
 
+
+def print_host_history(store, host, only_errors=False):
+    print(f"{BOLD}{host}{RESET} — state changes")
+    print("-" * 60)
+    for change in store.changes(host=host):
+        status = f"{GREEN}OK{RESET}" if not change["error"] else f"{RED}ERROR{RESET}"
+        print(f"{format_time(change['time'])}  {change['name'] or '(host)'} → {status}")
+    print("-" * 60)
+    print(f"{BOLD}{host}{RESET} — {'failed' if only_errors else 'latest'} check results")
+    print("-" * 60)
+    for entry in store.history(host, only_errors=only_errors):
+        status = f"{GREEN}OK{RESET}" if not entry["error"] else f"{RED}ERROR{RESET}"
+        print(f"{format_time(entry['time'])}  {entry['name']} — {status}")
+        if entry["error"] and entry["stderr"].strip():
+            for line in entry["stderr"].strip().splitlines():
+                print(f"    {line}")
+
+
+def main():
     # Parse arguments
     args = sys.argv[1:]
     only_errors = False
+    history = False
 
     # Detect --in-error flag
     if "--in-error" in args or "-e" in args:
         only_errors = True
         args = [a for a in args if a not in ("--in-error", "-e")]
 
+    # Detect --history flag, needs the results database
+    if "--history" in args:
+        history = True
+        args = [a for a in args if a != "--history"]
+
+    store = open_store()
+
     # No argument → list hosts
     if len(args) == 0:
-        print_all_hosts(results, only_errors=only_errors)
+        print_all_hosts(load_results(store, only_errors=only_errors), only_errors=only_errors)
         return
 
     # One argument → show host details
     host = args[0]
+    if history:
+        if store is None:
+            print(f"History needs the results database, not found: {DB_FILE}")
+            sys.exit(1)
+        print_host_history(store, host, only_errors=only_errors)
+        return
+
+    results = load_results(store, host=host)
     if host not in results:
         print(f"Host '{host}' not found in results.")
         sys.exit(1)
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
+import os
+import time
 import yaml
-from flask import Flask, render_template_string, abort
+from flask import Flask, Response, render_template_string, abort
+
+from healthchecker_store import ResultsStore
 
 app = Flask(__name__, static_url_path='/static')
 
+DB_FILE = "results.db"
 RESULTS_FILE = "results.yaml"
+# Characters of each output shown in host page, the rest is fetched on demand
+OUTPUT_PREVIEW = 4096
 
 # -----------------------------
 # Templates
@@ -654,6 +661,9 @@ HOST_TEMPLATE = """
         {% else %}
             <span class="tag is-success is-medium">OK</span>
         {% endif %}
+        {% if data.state and data.state != "up" %}
+            <span class="tag is-warning is-medium">{{ data.state | upper }}</span>
+        {% endif %}
 
         <div style="margin-top: 30px;">
             {% for hc in data.healthchecks %}
@@ -668,19 +678,60 @@ HOST_TEMPLATE = """
                     {% endif %}
                 </p>
 
-                <p><strong>stdout:</strong></p>
-                <pre class="has-background-white-ter" style="padding: 10px; color: #303030">{{ hc.stdout }}</pre>
-
-                <p><strong>stderr:</strong></p>
-                <pre class="has-background-white-ter" style="padding: 10px; color: #303030">{{ hc.stderr }}</pre>
+                {% for stream in ["stdout", "stderr"] %}
+                <p><strong>{{ stream }}:</strong></p>
+                <pre class="has-background-white-ter" style="padding: 10px; color: #303030">{{ hc[stream] }}</pre>
+                {% if hc[stream ~ "_size"] is defined and hc[stream ~ "_size"] > hc[stream] | length %}
+                <button class="button is-small" onclick="showFullOutput(this, '{{ hc[stream ~ "_id"] }}')">
+                    Show full output ({{ hc[stream ~ "_size"] }} characters)
+                </button>
+                {% endif %}
+                {% endfor %}
             </div>
             {% endfor %}
         </div>
 
+        {% if changes %}
+        <div class="box" style="margin-top: 30px;">
+            <h2 class="title is-5">State changes</h2>
+            <table class="table is-striped is-fullwidth">
+                <thead>
+                    <tr><th>Time</th><th>Check</th><th>State</th></tr>
+                </thead>
+                <tbody>
+                {% for change in changes %}
+                    <tr>
+                        <td>{{ change.time | datetime }}</td>
+                        <td>{{ change.name or "(host)" }}</td>
+                        <td>
+                        {% if change.error %}
+                            <span class="tag is-danger is-light">ERROR</span>
+                        {% else %}
+                            <span class="tag is-success is-light">OK</span>
+                        {% endif %}
+                        </td>
+                    </tr>
+                {% endfor %}
+                </tbody>
+            </table>
+        </div>
+        {% endif %}
+
     </div>
 </section>
 
 <script>
+function showFullOutput(button, outputId) {
+    button.disabled = true;
+    fetch("/output/" + outputId)
+        .then(response => response.text())
+        .then(text => {
+            button.previousElementSibling.textContent = text;
+            button.remove();
+        })
+        .catch(() => { button.disabled = false; });
+}
+
 function toggleDarkMode() {
     document.body.classList.toggle("dark-mode");
 
@@ -718,13 +769,44 @@ window.onload = function() {
 # Helpers
 # -----------------------------
 
-def load_results():
+def open_store():
+    # None if the healthchecker only exports results.yaml
+    if not os.path.exists(DB_FILE):
+        return None
+    return ResultsStore(DB_FILE, readonly=True)
+
+
+def load_results(host=None):
+    store = open_store()
+    if store is not None:
+        try:
+            # Hosts list needs no outputs, host page only their beginning
+            if host is None:
+                return store.latest(outputs=False)
+            return store.latest(host=host, preview=OUTPUT_PREVIEW)
+        finally:
+            store.close()
     try:
         with open(RESULTS_FILE, "r", encoding="utf-8") as f:
             return yaml.safe_load(f) or {}
     except FileNotFoundError:
         return {}
 
+
+def load_changes(host):
+    store = open_store()
+    if store is None:
+        return []
+    try:
+        return store.changes(host=host, limit=50)
+    finally:
+        store.close()
+
+
+@app.template_filter("datetime")
+def format_datetime(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
 # -----------------------------
 # Routes
 # -----------------------------
@@ -737,10 +819,24 @@ def index():
 
 @app.route("/host/<host>")
 def host_page(host):
-    results = load_results()
+    results = load_results(host)
     if host not in results:
         abort(404)
-    return render_template_string(HOST_TEMPLATE, host=host, data=results[host])
+    return render_template_string(HOST_TEMPLATE, host=host, data=results[host], changes=load_changes(host))
+
+@app.route("/output/<output_id>")
+def output_page(output_id):
+    # Full check output, fetched by host page on demand
+    store = open_store()
+    if store is None:
+        abort(404)
+    try:
+        text = store.output(output_id)
+    finally:
+        store.close()
+    if text is None:
+        abort(404)
+    return Response(text, mimetype="text/plain")
 
 # -----------------------------
 # Main
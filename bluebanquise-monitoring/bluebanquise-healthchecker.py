@@ -4,14 +4,30 @@ import sys
 import time
 import signal
 import smtplib
-from email.mime_text import MIMEText
+import asyncio
+import functools
+import heapq
+import zlib
+import shlex
+import socket
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.mime.text import MIMEText
 
 import yaml
 import paramiko
-from dask.distributed import Client, as_completed
+
+# Dask is only needed by the dask engine
+try:
+    from dask.distributed import Client, as_completed, wait as dask_wait
+except ImportError:
+    Client = None
 
 import subprocess
 
+from healthchecker_store import ResultsStore
+
 CONFIG_PATH = "/etc/bluebanquise/bluebanquise-healtchecker/configuration.yaml"
 
 
@@ -91,9 +107,410 @@ def create_ssh_client(
         key_filename=os.path.expanduser(key_filename) if key_filename else None,
         timeout=timeout,
     )
+    # Checks are short request/response exchanges, do not let Nagle
+    # algorithm and delayed ACKs add 40 ms to each channel open and close
+    client.get_transport().sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     return client
 
 
+class SSHConnectionPool:
+    """
+    Authenticated SSH connections kept open between iterations, one per
+    host, so that steady state iterations only open new channels instead of
+    doing TCP connection, key exchange and authentication again.
+
+    - keepalive: seconds between SSH (and TCP) keepalives of idle connections
+    - idle_timeout: connections unused for that long are closed
+    - max_size: open connections limit, least recently used idle ones are
+      closed first; if all are busy, the extra connection is not pooled
+
+    Connections found dead are reopened transparently. Thread safe, a
+    connection is used by a single thread at a time.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        port: int = 22,
+        password: str = None,
+        key_filename: str = None,
+        keepalive: int = 30,
+        idle_timeout: int = 600,
+        max_size: int = 10000,
+    ):
+        self.username = username
+        self.port = port
+        self.password = password
+        self.key_filename = key_filename
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # hostname: [client, last release time, busy]
+        self.connections: dict[str, list] = {}
+        self.stats = {"opened": 0, "reused": 0, "reconnected": 0, "evicted": 0}
+
+    def _open(self, hostname: str, timeout: float) -> paramiko.SSHClient:
+        client = create_ssh_client(
+            hostname=hostname,
+            username=self.username,
+            port=self.port,
+            password=self.password,
+            key_filename=self.key_filename,
+            timeout=timeout,
+        )
+        transport = client.get_transport()
+        if self.keepalive:
+            transport.set_keepalive(self.keepalive)
+            transport.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return client
+
+    @staticmethod
+    def _alive(client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def acquire(self, hostname: str, timeout: float) -> tuple:
+        """
+        Returns (client, reused), reused telling whether client is a pooled
+        connection (which may have died since last keepalive) or a new one.
+        """
+        stale = None
+        with self.lock:
+            entry = self.connections.get(hostname)
+            if entry is not None and not entry[2]:
+                if self._alive(entry[0]):
+                    entry[2] = True
+                    self.stats["reused"] += 1
+                    return entry[0], True
+                stale = self.connections.pop(hostname)[0]
+                self.stats["reconnected"] += 1
+        if stale is not None:
+            stale.close()
+        client = self._open(hostname, timeout)
+        with self.lock:
+            self.stats["opened"] += 1
+            if hostname not in self.connections and self._make_room():
+                self.connections[hostname] = [client, time.time(), True]
+        return client, False
+
+    def reconnect(self, hostname: str, client: paramiko.SSHClient, timeout: float) -> paramiko.SSHClient:
+        """
+        Replace a pooled connection that turned out to be dead.
+        """
+        with self.lock:
+            entry = self.connections.get(hostname)
+            if entry is not None and entry[0] is client:
+                del self.connections[hostname]
+            self.stats["reconnected"] += 1
+        client.close()
+        client, _ = self.acquire(hostname, timeout)
+        return client
+
+    def release(self, hostname: str, client: paramiko.SSHClient) -> None:
+        with self.lock:
+            entry = self.connections.get(hostname)
+            if entry is not None and entry[0] is client:
+                if self._alive(client):
+                    entry[1] = time.time()
+                    entry[2] = False
+                    return
+                del self.connections[hostname]
+        # Not pooled, or dead
+        client.close()
+
+    def _make_room(self) -> bool:
+        # Caller holds the lock
+        if len(self.connections) < self.max_size:
+            return True
+        idle = [(entry[1], hostname) for hostname, entry in self.connections.items() if not entry[2]]
+        if not idle:
+            return False
+        _, hostname = min(idle)
+        self.connections.pop(hostname)[0].close()
+        self.stats["evicted"] += 1
+        return True
+
+    def evict_idle(self) -> int:
+        """
+        Close connections idle for more than idle_timeout, and dead ones.
+        """
+        now = time.time()
+        with self.lock:
+            expired = [
+                hostname for hostname, (client, last_used, busy) in self.connections.items()
+                if not busy and (now - last_used > self.idle_timeout or not self._alive(client))
+            ]
+            clients = [self.connections.pop(hostname)[0] for hostname in expired]
+            self.stats["evicted"] += len(clients)
+        for client in clients:
+            client.close()
+        return len(clients)
+
+    def close(self) -> None:
+        with self.lock:
+            clients = [entry[0] for entry in self.connections.values()]
+            self.connections.clear()
+        for client in clients:
+            client.close()
+
+
+def failed_host_result(host_config: dict, message: str) -> dict:
+    """
+    Result of a host whose healthchecks could not run: all marked as failed.
+    """
+    return {
+        "errors": True,
+        "healthchecks": [
+            {
+                "name": hc.get("name", ""),
+                "stdout": "",
+                "stderr": message,
+                "error": True,
+            }
+            for hc in host_config.get("healthchecks", [])
+        ],
+    }
+
+
+class CappedOutput:
+    """
+    Output of a command, keeping only its first and last limit / 2 bytes
+    (limit 0: everything), so that a check printing megabytes costs
+    neither memory here nor space in results. What is dropped is replaced
+    by a "[... N bytes truncated ...]" line.
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.size = 0
+
+    def append(self, data: bytes) -> None:
+        self.size += len(data)
+        if not self.limit:
+            self.head += data
+            return
+        room = self.limit // 2 - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        self.tail += data
+        excess = len(self.tail) - (self.limit - self.limit // 2)
+        if excess > 0:
+            del self.tail[:excess]
+
+    def value(self) -> bytes:
+        dropped = self.size - len(self.head) - len(self.tail)
+        if dropped <= 0:
+            return bytes(self.head + self.tail)
+        return bytes(self.head) + f"\n[... {dropped} bytes truncated ...]\n".encode() + bytes(self.tail)
+
+
+def truncate_output(data: bytes, limit: int) -> bytes:
+    output = CappedOutput(limit)
+    output.append(data)
+    return output.value()
+
+
+def wait_channel(channel: paramiko.Channel, timeout: float, limit: int = 0) -> tuple:
+    """
+    Wait at most timeout seconds for the command running on channel to
+    exit, reading stdout and stderr as data arrives, so that a command
+    filling one stream never blocks on the other.
+    No polling: paramiko wakes us up on new data and end of output.
+    Returns (exit status, or None on timeout, stdout bytes, stderr bytes),
+    each output capped to limit bytes, see CappedOutput.
+    """
+    end = time.monotonic() + timeout
+    ready = threading.Event()
+    # Set by paramiko when data, or end of file, reaches either buffer
+    channel.in_buffer.set_event(ready)
+    channel.in_stderr_buffer.set_event(ready)
+    stdout = CappedOutput(limit)
+    stderr = CappedOutput(limit)
+
+    def drain():
+        while channel.recv_ready():
+            stdout.append(channel.recv(32768))
+        while channel.recv_stderr_ready():
+            stderr.append(channel.recv_stderr(32768))
+
+    while True:
+        drain()
+        left = end - time.monotonic()
+        if channel.eof_received or channel.closed:
+            # Data received before end of file could have come after drain()
+            drain()
+            # Exit status comes after end of output
+            if channel.status_event.wait(max(0, left)):
+                return channel.exit_status, stdout.value(), stderr.value()
+            return None, stdout.value(), stderr.value()
+        if left <= 0:
+            return None, stdout.value(), stderr.value()
+        if not (channel.recv_ready() or channel.recv_stderr_ready()):
+            ready.wait(left)
+
+
+def run_healthcheck(open_channel, hc: dict, cmd_timeout: float, max_output: int = 0) -> dict:
+    """
+    Run one healthcheck, on a channel from open_channel(command).
+    Outputs are capped to the check max_output, else to max_output.
+    """
+    name = hc.get("name", "")
+    command = hc.get("command", "")
+    ok_exitcode = hc.get("ok_exitcode", 0)
+
+    hc_result: dict[str, object] = {
+        "name": name,
+        "stdout": "",
+        "stderr": "",
+        "error": True,  # assume error until proven otherwise
+    }
+
+    if cmd_timeout <= 0:
+        hc_result["stderr"] = "Host deadline exceeded before command could run"
+        return hc_result
+
+    if not command:
+        hc_result["stderr"] = "No command provided"
+        return hc_result
+
+    try:
+        channel = open_channel(command)
+        try:
+            exit_status, out, err = wait_channel(channel, cmd_timeout, hc.get("max_output", max_output))
+        finally:
+            channel.close()  # kills remote command if still running
+
+        if exit_status is None:
+            hc_result["stderr"] = f"Command timed out after {cmd_timeout} seconds"
+        else:
+            hc_result["stdout"] = out.decode("utf-8", errors="replace").strip()
+            hc_result["stderr"] = err.decode("utf-8", errors="replace").strip()
+            hc_result["error"] = exit_status != ok_exitcode
+
+    except Exception as e:
+        hc_result["stderr"] = f"Exception while running command: {e}"
+        hc_result["error"] = True
+
+    return hc_result
+
+
+# Batched execution: all checks of a host in one remote script, one channel.
+# Each check runs under timeout(1) with its output kept in files, then the
+# script prints a frame per check:
+#   <marker> <index> <exit code> <stdout size> <stderr size>\n<stdout><stderr>
+# Sizes make the frames safe whatever the commands print.
+BATCH_MARKER = "@@bluebanquise-healthcheck"
+BATCH_TIMEOUT_EXITCODE = 124  # timeout(1) exit code on timeout
+
+BATCH_SCRIPT_HEADER = f"""t=$(mktemp -d) || exit 97
+trap 'rm -rf "$t"' EXIT
+run() {{
+  timeout -k 1 "$2" sh -c "$3" >"$t/o" 2>"$t/e" </dev/null
+  rc=$?
+  printf '{BATCH_MARKER} %s %s %s %s\\n' "$1" "$rc" $(wc -c <"$t/o") $(wc -c <"$t/e")
+  cat "$t/o" "$t/e"
+}}
+"""
+
+
+def build_batch_script(checks: list) -> str:
+    """
+    Remote script running checks, a list of (index, command, timeout).
+    """
+    lines = [BATCH_SCRIPT_HEADER]
+    for index, command, cmd_timeout in checks:
+        lines.append(f"run {index} {cmd_timeout:g} {shlex.quote(command)}\n")
+    return "".join(lines)
+
+
+def parse_batch_output(output: bytes) -> dict:
+    """
+    {index: (exit code, stdout bytes, stderr bytes)} from batch script
+    output. Parsing stops at the first incomplete frame.
+    """
+    frames = {}
+    position = 0
+    while position < len(output):
+        end = output.find(b"\n", position)
+        if end < 0:
+            break
+        header = output[position:end].decode("utf-8", errors="replace").split()
+        if len(header) != 5 or header[0] != BATCH_MARKER:
+            break
+        index, exit_status, out_size, err_size = (int(field) for field in header[1:])
+        out_start = end + 1
+        err_start = out_start + out_size
+        position = err_start + err_size
+        if position > len(output):
+            break
+        frames[index] = (exit_status, output[out_start:err_start], output[err_start:position])
+    return frames
+
+
+def run_healthchecks_batch(open_channel, healthchecks: list, remaining, max_output: int = 0) -> list:
+    """
+    Run healthchecks in a single remote script, on one channel from
+    open_channel(command). Returns the per check results, as
+    run_healthcheck() does. Outputs are capped once received, the batch
+    output being a single stream.
+    """
+    results = []
+    checks = []
+    for index, hc in enumerate(healthchecks):
+        results.append({
+            "name": hc.get("name", ""),
+            "stdout": "",
+            "stderr": "",
+            "error": True,
+        })
+        if not hc.get("command", ""):
+            results[index]["stderr"] = "No command provided"
+        else:
+            checks.append((index, hc["command"], hc.get("timeout", 10)))
+    if not checks:
+        return results
+
+    # Checks run one after the other, the whole script must fit in their
+    # timeouts (plus timeout(1) kill delay) and the host deadline
+    total_timeout = remaining(sum(cmd_timeout + 1 for _, _, cmd_timeout in checks) + 5)
+    try:
+        if total_timeout <= 0:
+            raise TimeoutError("Host deadline exceeded before command could run")
+        channel = open_channel(build_batch_script(checks))
+        try:
+            exit_status, out, err = wait_channel(channel, total_timeout)
+        finally:
+            channel.close()  # kills remote script if still running
+    except Exception as e:
+        for index, _, _ in checks:
+            results[index]["stderr"] = f"Exception while running command: {e}"
+        return results
+
+    frames = parse_batch_output(out)
+    for index, _, cmd_timeout in checks:
+        hc_result = results[index]
+        if index not in frames:
+            if exit_status is None:
+                hc_result["stderr"] = f"Batch timed out after {total_timeout:.1f} seconds"
+            else:
+                detail = err.decode("utf-8", errors="replace").strip()
+                hc_result["stderr"] = f"No result from batch script (exit code {exit_status}) {detail}".strip()
+            continue
+        check_exit_status, check_out, check_err = frames[index]
+        if check_exit_status == BATCH_TIMEOUT_EXITCODE:
+            hc_result["stderr"] = f"Command timed out after {cmd_timeout} seconds"
+            continue
+        limit = healthchecks[index].get("max_output", max_output)
+        hc_result["stdout"] = truncate_output(check_out, limit).decode("utf-8", errors="replace").strip()
+        hc_result["stderr"] = truncate_output(check_err, limit).decode("utf-8", errors="replace").strip()
+        hc_result["error"] = check_exit_status != healthchecks[index].get("ok_exitcode", 0)
+    return results
+
+
 def run_healthchecks_on_host(
     hostname: str,
     host_config: dict,
@@ -102,11 +519,19 @@ def run_healthchecks_on_host(
     password: str,
     key_filename: str,
     ssh_timeout: int,
+    deadline: float = None,
+    pool: SSHConnectionPool = None,
 ) -> dict:
     """
-    Executed on a Dask worker.
+    Executed on a Dask worker, or in a thread of the asyncio engine.
     Opens a single SSH connection, runs all healthchecks with per-command timeouts,
-    and closes it.
+    and closes it. With a pool, the connection is taken from and given back
+    to it instead.
+    Up to parallel_checks healthchecks of the host (host configuration,
+    default 1) run at the same time, in channels of this connection, or
+    all of them in a single remote script if batch is set.
+    If deadline (a time.time() value) is set, connection and command timeouts
+    are cut so that the host is done by then.
     """
     result: dict[str, object] = {
         "errors": False,
@@ -118,123 +543,643 @@ def run_healthchecks_on_host(
     if not healthchecks:
         return result
 
-    client = None
-    try:
-        client = create_ssh_client(
-            hostname=hostname,
-            username=username,
-            port=port,
-            password=password,
-            key_filename=key_filename,
-            timeout=ssh_timeout,
-        )
+    def remaining(timeout):
+        if deadline is None:
+            return timeout
+        return max(0, min(timeout, deadline - time.time()))
 
-        for hc in healthchecks:
-            name = hc.get("name", "")
-            command = hc.get("command", "")
-            ok_exitcode = hc.get("ok_exitcode", 0)
-            cmd_timeout = hc.get("timeout", 10)  # seconds
+    # Shared by parallel checks, client may be replaced on reconnection
+    connection = {"client": None, "reused": False}
+    lock = threading.Lock()
 
-            hc_result: dict[str, object] = {
-                "name": name,
-                "stdout": "",
-                "stderr": "",
-                "error": True,  # assume error until proven otherwise
-            }
+    def open_channel(command: str) -> paramiko.Channel:
+        with lock:
+            client, reused = connection["client"], connection["reused"]
+        try:
+            channel = client.get_transport().open_session()
+        except paramiko.SSHException:
+            # Pooled connection died since last use (node rebooted...)
+            if not reused:
+                raise
+            with lock:
+                if connection["client"] is client:
+                    connection["client"] = pool.reconnect(hostname, client, remaining(ssh_timeout) or 0.1)
+                client = connection["client"]
+            channel = client.get_transport().open_session()
+        with lock:
+            connection["reused"] = False
+        channel.exec_command(command)
+        return channel
 
-            if not command:
-                hc_result["stderr"] = "No command provided"
-                result["healthchecks"].append(hc_result)
-                result["errors"] = True
-                continue
+    try:
+        if pool is not None:
+            connection["client"], connection["reused"] = pool.acquire(hostname, remaining(ssh_timeout) or 0.1)
+        else:
+            connection["client"] = create_ssh_client(
+                hostname=hostname,
+                username=username,
+                port=port,
+                password=password,
+                key_filename=key_filename,
+                timeout=remaining(ssh_timeout) or 0.1,
+            )
 
-            try:
-                stdin, stdout, stderr = client.exec_command(command)
-                channel = stdout.channel
-                start_time = time.time()
-
-                # Wait for command to finish or timeout
-                while not channel.exit_status_ready():
-                    if time.time() - start_time > cmd_timeout:
-                        channel.close()  # kills remote command
-                        hc_result["stderr"] = (
-                            f"Command timed out after {cmd_timeout} seconds"
-                        )
-                        hc_result["error"] = True
-                        result["errors"] = True
-                        result["healthchecks"].append(hc_result)
-                        break
-                    time.sleep(0.1)
-
-                else:
-                    # Command finished normally
-                    out_str = stdout.read().decode("utf-8", errors="replace")
-                    err_str = stderr.read().decode("utf-8", errors="replace")
-                    exit_status = channel.recv_exit_status()
-
-                    hc_result["stdout"] = out_str.strip()
-                    hc_result["stderr"] = err_str.strip()
-                    hc_result["error"] = exit_status != ok_exitcode
-
-                    if hc_result["error"]:
-                        result["errors"] = True
-
-                    result["healthchecks"].append(hc_result)
+        max_output = host_config.get("max_output", 0)
 
-            except Exception as e:
-                hc_result["stderr"] = f"Exception while running command: {e}"
-                hc_result["error"] = True
-                result["errors"] = True
-                result["healthchecks"].append(hc_result)
+        def run(hc):
+            return run_healthcheck(open_channel, hc, remaining(hc.get("timeout", 10)), max_output)
 
+        parallel_checks = min(host_config.get("parallel_checks", 1), len(healthchecks))
+        if host_config.get("batch", False):
+            result["healthchecks"] = run_healthchecks_batch(open_channel, healthchecks, remaining, max_output)
+        elif parallel_checks > 1:
+            with ThreadPoolExecutor(max_workers=parallel_checks) as executor:
+                result["healthchecks"] = list(executor.map(run, healthchecks))
+        else:
+            result["healthchecks"] = [run(hc) for hc in healthchecks]
+        result["errors"] = any(hc_result["error"] for hc_result in result["healthchecks"])
+
+    except paramiko.AuthenticationException as e:
+        # Host answers, but refuses us: a check error, not a down host
+        result = failed_host_result(host_config, f"SSH authentication failed: {e}")
     except Exception as e:
         # SSH connection failed: mark all healthchecks as failed
-        result["errors"] = True
-        result["healthchecks"] = []
-        for hc in host_config.get("healthchecks", []):
-            result["healthchecks"].append(
-                {
-                    "name": hc.get("name", ""),
-                    "stdout": "",
-                    "stderr": f"SSH connection failed: {e}",
-                    "error": True,
-                }
-            )
+        result = failed_host_result(host_config, f"SSH connection failed: {e}")
+        # Could not connect at all (refused, no route, timeout, including
+        # NoValidConnectionsError): the host may be down, see
+        # ReachabilityTracker. SSH protocol errors of a host which answers
+        # are reported as check errors only.
+        if connection["client"] is None and isinstance(e, OSError):
+            result["unreachable"] = True
     finally:
+        client = connection["client"]
         if client is not None:
-            client.close()
+            if pool is not None:
+                pool.release(hostname, client)
+            else:
+                client.close()
 
     return result
 
 
+# -----------------------------
+# Dask engine
+# -----------------------------
+
+def run_iteration_dask(
+    client, hosts_config: dict, ssh_args: tuple, on_result=None, deadline: float = None
+) -> dict:
+    """
+    Run healthchecks of all hosts, one Dask task per host, returns
+    {hostname: result} once all hosts are done.
+    on_result(hostname, result) is called as soon as each host is done.
+    Hosts not done by deadline (a time.time() value) are reported as
+    timed out and their tasks cancelled.
+    """
+    # Future -> host, completed futures are mapped back in O(1)
+    hosts_by_future = {}
+
+    # Submit a task per host
+    for hostname, host_cfg in hosts_config.items():
+        future = client.submit(
+            run_healthchecks_on_host,
+            hostname,
+            host_cfg,
+            *ssh_args,
+        )
+        hosts_by_future[future] = hostname
+
+    results: dict[str, dict] = {}
+
+    def publish(hostname, res):
+        results[hostname] = res
+        if on_result is not None:
+            on_result(hostname, res)
+
+    timeout = None if deadline is None else max(0, deadline - time.time())
+    try:
+        for future in as_completed(list(hosts_by_future), timeout=timeout):
+            try:
+                res = future.result()
+            except Exception as e:
+                res = {
+                    "errors": True,
+                    "healthchecks": [
+                        {
+                            "name": "Dask execution",
+                            "stdout": "",
+                            "stderr": f"Dask task failed: {e}",
+                            "error": True,
+                        }
+                    ],
+                }
+            publish(hosts_by_future[future], res)
+    except TimeoutError:
+        pass
+
+    # Stragglers
+    stragglers = [future for future, hostname in hosts_by_future.items() if hostname not in results]
+    if stragglers:
+        client.cancel(stragglers)
+    for future in stragglers:
+        hostname = hosts_by_future[future]
+        publish(hostname, failed_host_result(hosts_config[hostname], "Iteration deadline exceeded"))
+
+    return results
+
+
+class DaskHostRunner:
+    """
+    Dask engine fed continuously by the monitoring loop: a task is
+    submitted per host as its checks come due (submit), and hosts are
+    collected as they are done (wait), each within its own deadline, so
+    that a slow host holds back nobody else.
+    """
+
+    def __init__(self, client, ssh_args: tuple):
+        self.client = client
+        self.ssh_args = ssh_args
+        # Future -> (host, host configuration, deadline)
+        self.futures: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.futures)
+
+    def submit(self, hostname: str, host_config: dict, timeout: float) -> None:
+        deadline = time.time() + timeout
+        future = self.client.submit(run_healthchecks_on_host, hostname, host_config, *self.ssh_args, deadline=deadline)
+        self.futures[future] = (hostname, host_config, deadline)
+
+    def wait(self, timeout: float) -> list:
+        """
+        [(hostname, result)] of hosts done, or past their deadline, within
+        timeout seconds.
+        """
+        if not self.futures:
+            time.sleep(timeout)
+            return []
+        try:
+            dask_wait(list(self.futures), timeout=timeout, return_when="FIRST_COMPLETED")
+        except TimeoutError:
+            pass
+        now = time.time()
+        results = []
+        for future, (hostname, host_config, deadline) in list(self.futures.items()):
+            if future.done():
+                try:
+                    res = future.result()
+                except Exception as e:
+                    res = failed_host_result(host_config, f"Dask task failed: {e}")
+            elif now > deadline + 1:
+                # Small grace, the host function enforces the deadline itself
+                future.cancel()
+                res = failed_host_result(host_config, "Host deadline exceeded")
+            else:
+                continue
+            del self.futures[future]
+            results.append((hostname, res))
+        return results
+
+    def close(self) -> None:
+        if self.futures:
+            self.client.cancel(list(self.futures))
+        self.futures.clear()
+
+
+# -----------------------------
+# Asyncio engine
+# -----------------------------
+#
+# Alternative to Dask for large clusters: one process drives all hosts from
+# an asyncio event loop. At most max_concurrency hosts are in flight (global
+# semaphore), each running in a thread of a shared pool (paramiko is
+# blocking), and each host must be done within host_deadline seconds,
+# connection included. No scheduler, no task serialization.
+
+async def _run_host_async(
+    executor: ThreadPoolExecutor,
+    semaphore: asyncio.Semaphore,
+    hostname: str,
+    host_config: dict,
+    ssh_args: tuple,
+    host_deadline: float,
+    pool: SSHConnectionPool = None,
+) -> tuple:
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + host_deadline
+        call = functools.partial(
+            run_healthchecks_on_host, hostname, host_config, *ssh_args, deadline=deadline, pool=pool
+        )
+        try:
+            # Small grace, the host function enforces the deadline itself
+            res = await asyncio.wait_for(loop.run_in_executor(executor, call), host_deadline + 1)
+        except asyncio.TimeoutError:
+            res = failed_host_result(host_config, f"Host deadline of {host_deadline} seconds exceeded")
+        except Exception as e:
+            res = failed_host_result(host_config, f"Healthchecks execution failed: {e}")
+        return hostname, res
+
+
+async def _run_iteration_async(
+    hosts_config: dict,
+    ssh_args: tuple,
+    executor: ThreadPoolExecutor,
+    max_concurrency: int,
+    host_deadline: float,
+    pool: SSHConnectionPool = None,
+    on_result=None,
+    deadline: float = None,
+) -> dict:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Task -> host, for stragglers
+    tasks = {
+        asyncio.ensure_future(
+            _run_host_async(executor, semaphore, hostname, host_cfg, ssh_args, host_deadline, pool)
+        ): hostname
+        for hostname, host_cfg in hosts_config.items()
+    }
+    results: dict[str, dict] = {}
+
+    def publish(hostname, res):
+        results[hostname] = res
+        if on_result is not None:
+            on_result(hostname, res)
+
+    pending = set(tasks)
+    while pending:
+        timeout = None if deadline is None else deadline - time.time()
+        if timeout is not None and timeout <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            publish(*task.result())
+
+    # Stragglers, their threads end by themselves at host deadline
+    for task in pending:
+        task.cancel()
+        hostname = tasks[task]
+        publish(hostname, failed_host_result(hosts_config[hostname], "Iteration deadline exceeded"))
+    return results
+
+
+def run_iteration_asyncio(
+    hosts_config: dict,
+    ssh_args: tuple,
+    executor: ThreadPoolExecutor,
+    max_concurrency: int,
+    host_deadline: float,
+    pool: SSHConnectionPool = None,
+    on_result=None,
+    deadline: float = None,
+) -> dict:
+    """
+    Run healthchecks of all hosts with the asyncio engine, returns
+    {hostname: result} once all hosts are done. Connections are taken from
+    pool if given.
+    on_result and deadline as for run_iteration_dask().
+    """
+    return asyncio.run(
+        _run_iteration_async(
+            hosts_config, ssh_args, executor, max_concurrency, host_deadline, pool, on_result, deadline
+        )
+    )
+
+
+class AsyncioHostRunner:
+    """
+    Asyncio engine fed continuously by the monitoring loop, as
+    DaskHostRunner. The event loop runs in a thread of its own, hosts are
+    submitted to it as their checks come due, at most max_concurrency in
+    flight, each within its own deadline.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, max_concurrency: int, ssh_args: tuple, pool: SSHConnectionPool = None):
+        self.executor = executor
+        self.ssh_args = ssh_args
+        self.pool = pool
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.thread = threading.Thread(target=self.loop.run_forever, name="asyncio-engine", daemon=True)
+        self.thread.start()
+        # concurrent.futures.Future -> (host, host configuration)
+        self.futures: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.futures)
+
+    def submit(self, hostname: str, host_config: dict, timeout: float) -> None:
+        coroutine = _run_host_async(
+            self.executor, self.semaphore, hostname, host_config, self.ssh_args, timeout, self.pool
+        )
+        self.futures[asyncio.run_coroutine_threadsafe(coroutine, self.loop)] = (hostname, host_config)
+
+    def wait(self, timeout: float) -> list:
+        """
+        [(hostname, result)] of hosts done within timeout seconds. Hosts
+        never last more than their deadline, _run_host_async enforces it.
+        """
+        if not self.futures:
+            time.sleep(timeout)
+            return []
+        done, _ = wait(self.futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        results = []
+        for future in done:
+            hostname, host_config = self.futures.pop(future)
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append((hostname, failed_host_result(host_config, f"Healthchecks execution failed: {e}")))
+        return results
+
+    def close(self) -> None:
+        for future in self.futures:
+            future.cancel()
+        self.futures.clear()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
 # -----------------------------
 # Email alerting
 # -----------------------------
 
-def send_alert_email(subject: str, body: str, config: dict) -> None:
+class AlertDispatcher:
+    """
+    Alert emails, sent from a thread of their own so that the monitoring
+    loop never waits on SMTP:
+    - transitions of hosts (add) are collected, and sent as one digest
+      when flush() is called as results come in, at most every
+      digest_interval seconds. A host back to its previous state before
+      the digest is sent does not appear in it.
+    - at most max_per_hour digests are sent, further transitions wait
+      for the next allowed one, they are not dropped. Neither are those
+      of a digest which could not be sent, they go in the next one.
+    - a host changing state flap_threshold times within flap_window
+      seconds is reported once as flapping, then its transitions are
+      left out until it settles: no transition for flap_settle seconds.
+      Its state then is reported.
+    - the SMTP session (STARTTLS, login) is kept open between digests,
+      closed after idle_timeout seconds unused, and opened again once if
+      the server dropped it.
+    """
+
+    def __init__(self, email_cfg: dict):
+        self.email_cfg = email_cfg
+        self.send_recovery = email_cfg.get("send_recovery", False)
+        self.digest_interval = email_cfg.get("digest_interval", 60)
+        self.max_per_hour = email_cfg.get("max_per_hour", 20)
+        self.flap_threshold = email_cfg.get("flap_threshold", 4)
+        self.flap_window = email_cfg.get("flap_window", 3600)
+        self.flap_settle = email_cfg.get("flap_settle", 600)
+        self.idle_timeout = email_cfg.get("idle_timeout", 300)
+
+        # {host: [errors before the first pending transition, latest result]}
+        self.pending: dict[str, list] = {}
+        # {host: transition times}, flapping hosts as {host: [latest
+        # result, last transition time]}, those not reported yet, and
+        # those settled since the last digest, as {host: latest result}
+        self.transitions: dict[str, deque] = {}
+        self.flapping: dict[str, list] = {}
+        self.new_flapping: set = set()
+        self.settled: dict[str, dict] = {}
+        self.sent: deque = deque()
+        self.last_attempt = 0.0
+
+        self.smtp = None
+        self.smtp_used = 0.0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.flush_requested = False
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="alerts", daemon=True)
+        self.thread.start()
+
+    # Called from the monitoring loop
+
+    def add(self, host: str, data: dict, prev_errors: bool) -> None:
+        now = time.time()
+        with self.lock:
+            times = self.transitions.setdefault(host, deque())
+            times.append(now)
+            while times and times[0] < now - self.flap_window:
+                times.popleft()
+            if len(times) >= self.flap_threshold:
+                if host not in self.flapping:
+                    self.new_flapping.add(host)
+                self.flapping[host] = [data, now]
+                self.settled.pop(host, None)
+                self.pending.pop(host, None)
+                return
+            self.flapping.pop(host, None)
+            if host in self.pending:
+                self.pending[host][1] = data
+            else:
+                self.pending[host] = [prev_errors, data]
+
+    def flush(self) -> None:
+        with self.lock:
+            self.flush_requested = True
+        self.wakeup.set()
+
+    def close(self) -> None:
+        """
+        Send what is pending, whatever the digest interval, and stop.
+        """
+        with self.lock:
+            self.stopping = True
+            self.flush_requested = True
+        self.wakeup.set()
+        self.thread.join()
+
+    # Alerts thread
+
+    def run(self) -> None:
+        while True:
+            self.wakeup.wait(timeout=max(1.0, self.digest_interval / 2))
+            self.wakeup.clear()
+            with self.lock:
+                if self.settle(time.time()):
+                    self.flush_requested = True
+                stopping = self.stopping
+                due = self.flush_requested and (stopping or self.digest_allowed(time.time()))
+                if due:
+                    self.flush_requested = False
+                    digest = self.take_digest()
+            if due and digest is not None:
+                subject, body, taken = digest
+                self.last_attempt = time.time()
+                if not self.send(subject, body) and not stopping:
+                    self.requeue(*taken)
+            if self.smtp is not None and (stopping or time.time() - self.smtp_used >= self.idle_timeout):
+                self.disconnect()
+            if stopping:
+                return
+
+    def digest_allowed(self, now: float) -> bool:
+        while self.sent and self.sent[0] < now - 3600:
+            self.sent.popleft()
+        if self.stopping:
+            return True
+        return now - self.last_attempt >= self.digest_interval and len(self.sent) < self.max_per_hour
+
+    def settle(self, now: float) -> bool:
+        """
+        Move flapping hosts without transition for flap_settle seconds to
+        settled. Returns True if there are settled hosts to report. Caller
+        holds the lock.
+        """
+        for host, (data, last) in list(self.flapping.items()):
+            if now - last >= self.flap_settle:
+                del self.flapping[host]
+                self.transitions.pop(host, None)
+                self.settled[host] = data
+        return bool(self.settled)
+
+    def requeue(self, pending: dict, new_flapping: set, settled: dict) -> None:
+        """
+        Give back what a digest which could not be sent had taken, merged
+        with what came in meanwhile, for the next digest.
+        """
+        with self.lock:
+            for host, (prev_errors, data) in pending.items():
+                if host in self.pending:
+                    # State before the first transition not sent yet
+                    self.pending[host][0] = prev_errors
+                elif host not in self.flapping:
+                    self.pending[host] = [prev_errors, data]
+            self.new_flapping |= new_flapping
+            for host, data in settled.items():
+                if host not in self.flapping:
+                    self.settled.setdefault(host, data)
+            self.flush_requested = True
+
+    def take_digest(self):
+        """
+        (subject, body, taken) of pending transitions, or None if there is
+        nothing to report. Pending transitions are cleared, taken holds
+        them for requeue(). Caller holds the lock.
+        """
+        errors, recovered = [], []
+        for host, (prev_errors, data) in sorted(self.pending.items()):
+            now_errors = data.get("errors", False)
+            if now_errors == prev_errors:
+                continue
+            if now_errors:
+                errors.append((host, data))
+            elif self.send_recovery:
+                recovered.append(host)
+        flapping = sorted(self.new_flapping)
+        settled = sorted(self.settled.items())
+        taken = (self.pending, self.new_flapping, self.settled)
+        self.pending = {}
+        self.new_flapping = set()
+        self.settled = {}
+        if not (errors or recovered or flapping or settled):
+            return None
+
+        if len(errors) == 1 and not (recovered or flapping or settled):
+            subject = f"[ALERT] Host {errors[0][0]} is in ERROR"
+        elif len(recovered) == 1 and not (errors or flapping or settled):
+            subject = f"[RECOVERY] Host {recovered[0]} is back to OK"
+        elif recovered and not (errors or flapping or settled):
+            subject = f"[RECOVERY] {len(recovered)} hosts are back to OK"
+        else:
+            parts = []
+            if errors:
+                parts.append(f"{len(errors)} hosts in ERROR")
+            if recovered:
+                parts.append(f"{len(recovered)} recovered")
+            if flapping:
+                parts.append(f"{len(flapping)} flapping")
+            if settled:
+                parts.append(f"{len(settled)} settled")
+            subject = f"[ALERT] {', '.join(parts)}"
+
+        body_lines = []
+        for host, data in errors:
+            body_lines += [f"The host {host} has entered an error state.", "", "Details:"]
+            for hc in data.get("healthchecks", []):
+                status = "ERROR" if hc.get("error") else "OK"
+                body_lines.append(f"- {hc.get('name')} : {status}")
+                if hc.get("error"):
+                    body_lines.append(f"  stderr: {hc.get('stderr')}")
+            body_lines.append("")
+        for host in recovered:
+            body_lines.append(f"The host {host} has recovered and is now OK.")
+        if flapping:
+            body_lines += [
+                "",
+                f"Hosts changing state {self.flap_threshold} times or more within {self.flap_window}s,"
+                " alerts suppressed until they settle:",
+            ]
+            body_lines += [f"- {host}" for host in flapping]
+        if settled:
+            body_lines += ["", "Hosts no longer flapping, and their state now:"]
+            body_lines += [f"- {host} : {'ERROR' if data.get('errors') else 'OK'}" for host, data in settled]
+        return subject, "\n".join(body_lines).strip() + "\n", taken
+
+    def connect(self) -> smtplib.SMTP:
+        email_cfg = self.email_cfg
+        server = smtplib.SMTP(email_cfg["smtp_server"], email_cfg["smtp_port"], timeout=30)
+        if email_cfg.get("use_tls", False):
+            server.starttls()
+        server.login(email_cfg["username"], email_cfg["password"])
+        return server
+
+    def disconnect(self) -> None:
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+
+    def send(self, subject: str, body: str) -> bool:
+        email_cfg = self.email_cfg
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = email_cfg["from"]
+        msg["To"] = ", ".join(email_cfg["to"])
+
+        for attempt in range(2):
+            reused = self.smtp is not None
+            try:
+                if self.smtp is None:
+                    self.smtp = self.connect()
+                self.smtp.sendmail(email_cfg["from"], email_cfg["to"], msg.as_string())
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                if self.smtp is not None:
+                    self.smtp.close()
+                    self.smtp = None
+                # Session kept open may have been dropped by the server
+                if not reused or attempt:
+                    print(f"Failed to send alert email '{subject}', kept for the next one: {e}", file=sys.stderr)
+                    return False
+        now = time.time()
+        self.smtp_used = now
+        with self.lock:
+            self.sent.append(now)
+        print(f"Sent alert email '{subject}'")
+        return True
+
+
+def alert_dispatcher(config: dict):
+    """
+    AlertDispatcher from configuration, None if emails are disabled or
+    not configured.
+    """
     email_cfg = config.get("email", {})
     if not email_cfg.get("enabled", False):
-        return
+        return None
 
     required_keys = ["smtp_server", "smtp_port", "username", "password", "from", "to"]
     for key in required_keys:
         if key not in email_cfg:
-            # Missing required email config; silently skip
-            return
-
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = email_cfg["from"]
-    msg["To"] = ", ".join(email_cfg["to"])
-
-    server = smtplib.SMTP(email_cfg["smtp_server"], email_cfg["smtp_port"])
-
-    if email_cfg.get("use_tls", False):
-        server.starttls()
-
-    server.login(email_cfg["username"], email_cfg["password"])
-    server.sendmail(email_cfg["from"], email_cfg["to"], msg.as_string())
-    server.quit()
+            print(f"Alert emails disabled, email.{key} is not set", file=sys.stderr)
+            return None
+    return AlertDispatcher(email_cfg)
 
 
 # -----------------------------
@@ -267,6 +1212,339 @@ def run_error_triggers(host: str, triggers: list):
             print(f"[TRIGGER] ERROR running trigger '{name}' for {host}: {e}")
 
 
+# -----------------------------
+# State transitions
+# -----------------------------
+
+def handle_transition(host: str, data: dict, previous: dict, alerts, hosts_config: dict) -> None:
+    """
+    Alerts and triggers of a host, from its previous and new results.
+    Alerts (an AlertDispatcher, or None) are only queued here. Entering
+    or leaving maintenance is not a transition: nothing ran, results are
+    the ones from before.
+    """
+    if ReachabilityTracker.MAINTENANCE in (data.get("state"), (previous or {}).get("state")):
+        return
+    prev_errors = (previous or {}).get("errors", False)
+    now_errors = data.get("errors", False)
+
+    # OK -> ERROR, and ERROR -> OK (recovery email if enabled)
+    if alerts is not None and now_errors != prev_errors:
+        alerts.add(host, data, prev_errors)
+
+    # ERROR transition: run triggers
+    if now_errors and not prev_errors:
+        triggers = hosts_config.get(host, {}).get("on_error_triggers", [])
+        if triggers:
+            run_error_triggers(host, triggers)
+
+
+# -----------------------------
+# Results
+# -----------------------------
+
+class ResultsPublisher:
+    """
+    Latest result of each host, kept across runs, and handled as host
+    results arrive:
+    - on_transition(host, result, previous result) is called at once
+    - hosts updated since the last flush are written to the store in one
+      transaction every publish_interval seconds (flush_due, called by the
+      monitoring loop, and add), or when flush is called
+    - the results file, if any, is rewritten at most every
+      publish_interval seconds, as it holds all hosts
+    """
+
+    def __init__(self, store, results_file: str, publish_interval: float, previous: dict, on_transition):
+        self.store = store
+        self.results_file = results_file
+        self.publish_interval = publish_interval
+        self.on_transition = on_transition
+        self.results: dict[str, dict] = dict(previous)
+        self.pending: list = []
+        self.last_store = self.last_export = time.time()
+
+    def add(self, host: str, data: dict) -> None:
+        previous = self.results.get(host)
+        self.results[host] = data
+        self.pending.append((host, data, time.time()))
+        try:
+            self.on_transition(host, data, previous)
+        except Exception as e:
+            print(f"Failed to handle state transition of {host}: {e}", file=sys.stderr)
+        if time.time() - self.last_store >= self.publish_interval:
+            self.flush()
+
+    def flush_due(self) -> None:
+        """
+        Flush if the last one is publish_interval seconds old.
+        """
+        if time.time() - self.last_store >= self.publish_interval:
+            self.flush()
+
+    def flush(self, export: bool = False) -> None:
+        """
+        Store pending results, and rewrite the results file if due or
+        export is set.
+        """
+        now = time.time()
+        self.last_store = now
+        if self.store is not None and self.pending:
+            try:
+                self.store.write(self.pending)
+            except Exception as e:
+                print(f"Failed to store results: {e}", file=sys.stderr)
+        self.pending = []
+        if self.results_file and (export or now - self.last_export >= self.publish_interval):
+            self.last_export = now
+            try:
+                dump_yaml(self.results, self.results_file)
+            except Exception as e:
+                print(f"Failed to write results: {e}", file=sys.stderr)
+
+
+# -----------------------------
+# Scheduling
+# -----------------------------
+
+def host_phase(hostname: str) -> float:
+    """
+    Fraction of its intervals a host checks are offset by, in [0, 1).
+    Deterministic (same across restarts) and uniform, so that hosts are
+    spread over each interval instead of all checked at the same time.
+    Checks of a host with the same interval stay together, and run over a
+    single connection.
+    """
+    return zlib.crc32(hostname.encode("utf-8")) / 2**32
+
+
+class CheckScheduler:
+    """
+    Priority queue of the next run time of each check of each host, as
+    [due, hostname, check index] entries.
+
+    A check runs every interval seconds: its healthcheck interval, else
+    its host interval, else the global one. Run times are aligned on
+    interval * (k + host phase), so that the load is flat over time, and
+    a late run does not shift the next ones; runs missed (slow host,
+    overloaded admin node) are skipped, not caught up.
+    """
+
+    def __init__(self, hosts_config: dict, default_interval: float, now: float):
+        self.intervals: dict[tuple, float] = {}
+        self.queue: list[list] = []
+        for hostname, host_config in hosts_config.items():
+            phase = host_phase(hostname)
+            for index, hc in enumerate(host_config.get("healthchecks", [])):
+                interval = hc.get("interval", host_config.get("interval", default_interval))
+                self.intervals[(hostname, index)] = interval
+                self.queue.append([self.next_run(now, interval, phase), hostname, index])
+        heapq.heapify(self.queue)
+
+    @staticmethod
+    def next_run(after: float, interval: float, phase: float) -> float:
+        # First interval * (k + phase) after after
+        k = (after / interval - phase) // 1 + 1
+        return (k + phase) * interval
+
+    def next_due(self) -> float:
+        return self.queue[0][0] if self.queue else float("inf")
+
+    def run_now(self, hostname: str, now: float) -> None:
+        """
+        Make all checks of hostname due now, a host back from down state
+        is not left waiting for its next run times.
+        """
+        for entry in self.queue:
+            if entry[1] == hostname:
+                entry[0] = now
+        heapq.heapify(self.queue)
+
+    def pop_due(self, until: float) -> dict:
+        """
+        Remove and return checks due by until, as {hostname: [check index]}.
+        """
+        due: dict[str, list] = {}
+        while self.queue and self.queue[0][0] <= until:
+            _, hostname, index = heapq.heappop(self.queue)
+            due.setdefault(hostname, []).append(index)
+        return due
+
+    def reschedule(self, due: dict, after: float) -> None:
+        """
+        Queue the next run of checks returned by pop_due, after after: the
+        end of their host run, or the until of pop_due if later, not to run
+        again checks taken early.
+        """
+        for hostname, indexes in due.items():
+            phase = host_phase(hostname)
+            for index in indexes:
+                interval = self.intervals[(hostname, index)]
+                heapq.heappush(self.queue, [self.next_run(after, interval, phase), hostname, index])
+
+
+def round_hosts_config(hosts_config: dict, due: dict) -> dict:
+    """
+    Hosts configuration restricted to due checks, for the engines.
+    """
+    return {
+        hostname: dict(hosts_config[hostname], healthchecks=[hosts_config[hostname]["healthchecks"][i] for i in indexes])
+        for hostname, indexes in due.items()
+    }
+
+
+def merge_host_result(host_config: dict, previous: dict, indexes: list, partial: dict) -> dict:
+    """
+    Full result of a host, from the results of the checks just run
+    (partial, checks in indexes order) and the previous result of the
+    others, matched by name. Checks never run yet are left out. Each check
+    result gets the time it ran.
+    """
+    now = time.time()
+    previous_checks = {hc.get("name"): hc for hc in (previous or {}).get("healthchecks", [])}
+    ran = {index: dict(hc_result, time=now) for index, hc_result in zip(indexes, partial.get("healthchecks", []))}
+    healthchecks = []
+    for index, hc in enumerate(host_config.get("healthchecks", [])):
+        hc_result = ran.get(index) or previous_checks.get(hc.get("name", ""))
+        if hc_result is not None:
+            healthchecks.append(hc_result)
+    return {
+        "errors": any(hc_result["error"] for hc_result in healthchecks),
+        "healthchecks": healthchecks,
+    }
+
+
+# -----------------------------
+# Reachability
+# -----------------------------
+
+async def _probe_host(semaphore: asyncio.Semaphore, hostname: str, port: int, timeout: float) -> bool:
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(hostname, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+
+def probe_hosts(hostnames: list, port: int, timeout: float, max_concurrency: int = 512) -> set:
+    """
+    TCP connect to the SSH port of hostnames, all at once, and return those
+    accepting. Costs at most timeout, where an SSH connection to a powered
+    off host costs the whole ssh.timeout.
+    """
+    if not hostnames:
+        return set()
+
+    async def probe_all():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        reachable = await asyncio.gather(*(_probe_host(semaphore, h, port, timeout) for h in hostnames))
+        return {hostname for hostname, up in zip(hostnames, reachable) if up}
+
+    return asyncio.run(probe_all())
+
+
+class ReachabilityTracker:
+    """
+    Circuit breaker of hosts checks, a host is:
+    - up: checked as scheduled. Once SSH failed to connect to it, it is
+      TCP probed before each SSH attempt.
+    - down: after failure_threshold connection or probe failures in a row.
+      Its checks are not run, it is only probed, after backoff seconds,
+      doubled on each failed probe up to max_backoff. As soon as a probe
+      succeeds, it is up again and all its checks run at once.
+    - maintenance: listed in maintenance_file (one host per line, reloaded
+      when it changes). Nothing runs, no alert, until removed from it.
+    """
+
+    UP = "up"
+    DOWN = "down"
+    MAINTENANCE = "maintenance"
+
+    def __init__(self, failure_threshold: int, backoff: float, max_backoff: float, maintenance_file: str = None):
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.maintenance_file = maintenance_file
+        self.maintenance_mtime = None
+        self.maintenance: set = set()
+        # {hostname: consecutive failures} and {hostname: [next probe time, backoff]}
+        self.failures: dict[str, int] = {}
+        self.down: dict[str, list] = {}
+
+    def state(self, hostname: str) -> str:
+        if hostname in self.maintenance:
+            return self.MAINTENANCE
+        if hostname in self.down:
+            return self.DOWN
+        return self.UP
+
+    def set_down(self, hostname: str, now: float) -> None:
+        # Host known down from a previous run of the healthchecker
+        self.failures[hostname] = self.failure_threshold
+        self.down[hostname] = [now, self.backoff]
+
+    def reload_maintenance(self) -> tuple:
+        """
+        Reload maintenance_file if it changed. Returns hosts entering and
+        leaving maintenance.
+        """
+        if not self.maintenance_file:
+            return set(), set()
+        try:
+            mtime = os.stat(self.maintenance_file).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.maintenance_mtime:
+            return set(), set()
+        self.maintenance_mtime = mtime
+        maintenance = set()
+        if mtime is not None:
+            try:
+                with open(self.maintenance_file, "r", encoding="utf-8") as f:
+                    maintenance = {line.strip() for line in f if line.strip() and not line.startswith("#")}
+            except OSError as e:
+                print(f"Failed to read maintenance file {self.maintenance_file}: {e}", file=sys.stderr)
+                return set(), set()
+        entering, leaving = maintenance - self.maintenance, self.maintenance - maintenance
+        self.maintenance = maintenance
+        return entering, leaving
+
+    def runnable(self, hostname: str) -> bool:
+        return hostname not in self.maintenance and hostname not in self.down
+
+    def suspect(self, hostname: str) -> bool:
+        # Failed to connect last time, probe before trying SSH again
+        return self.failures.get(hostname, 0) > 0
+
+    def probes_due(self, now: float) -> list:
+        return [
+            hostname for hostname, (probe_at, _) in self.down.items()
+            if probe_at <= now and hostname not in self.maintenance
+        ]
+
+    def record(self, hostname: str, reachable: bool, now: float) -> str:
+        """
+        Record a connection or probe outcome. Returns the new state of
+        hostname if it changed, else None.
+        """
+        if reachable:
+            self.failures.pop(hostname, None)
+            if self.down.pop(hostname, None) is not None:
+                return self.UP
+            return None
+        self.failures[hostname] = self.failures.get(hostname, 0) + 1
+        if hostname in self.down:
+            backoff = min(self.down[hostname][1] * 2, self.max_backoff)
+            self.down[hostname] = [now + backoff, backoff]
+            return None
+        if self.failures[hostname] >= self.failure_threshold:
+            self.down[hostname] = [now + self.backoff, self.backoff]
+            return self.DOWN
+        return None
+
+
 # -----------------------------
 # Config
 # -----------------------------
@@ -286,7 +1564,17 @@ def load_global_config() -> dict:
 def main():
     config = load_global_config()
 
+    # Default interval of checks, hosts.yaml can set it per host or check
     interval = config.get("interval", 60)
+    # Hosts still running after that are reported as timed out
+    iteration_deadline = config.get("iteration_deadline", interval)
+    # Results are written at most that often
+    publish_interval = config.get("publish_interval", 10)
+    # Checks of a host due within that many seconds run together
+    schedule_window = config.get("schedule_window", 1)
+
+    reachability_cfg = config.get("reachability", {})
+    probe_timeout = reachability_cfg.get("probe_timeout", 1)
 
     ssh_cfg = config.get("ssh", {})
     ssh_user = ssh_cfg.get("user")
@@ -300,13 +1588,16 @@ def main():
         sys.exit(1)
 
     hosts_file = config.get("hosts_file")
+    # Results database, and optional results.yaml export for older readers
+    store_cfg = config.get("store", {})
+    store_path = store_cfg.get("path")
     results_file = config.get("results_file")
 
     if not hosts_file:
         print("hosts_file must be defined in configuration", file=sys.stderr)
         sys.exit(1)
-    if not results_file:
-        print("results_file must be defined in configuration", file=sys.stderr)
+    if not store_path and not results_file:
+        print("store.path or results_file must be defined in configuration", file=sys.stderr)
         sys.exit(1)
 
     # Load hosts configuration
@@ -334,119 +1625,206 @@ def main():
         print("Hosts file does not define any hosts", file=sys.stderr)
         sys.exit(1)
 
-    # Setup Dask client
-    dask_cfg = config.get("dask", {})
-    dask_address = dask_cfg.get("address")
-    if dask_address:
-        client = Client(address=dask_address)
+    # Healthchecks of a host run one after the other, unless set per host
+    parallel_checks = ssh_cfg.get("parallel_checks", 1)
+    batch = ssh_cfg.get("batch", False)
+    # Outputs kept of each check, can be set per host or check
+    max_output = config.get("output", {}).get("max_size", 65536)
+    for host_cfg in hosts_config.values():
+        host_cfg.setdefault("parallel_checks", parallel_checks)
+        host_cfg.setdefault("batch", batch)
+        host_cfg.setdefault("max_output", max_output)
+
+    ssh_args = (ssh_user, ssh_port, ssh_password, ssh_key, ssh_timeout)
+
+    engine = config.get("engine", "dask")
+    if engine == "asyncio":
+        # Setup asyncio engine, threads are kept between iterations
+        asyncio_cfg = config.get("asyncio", {})
+        max_concurrency = asyncio_cfg.get("max_concurrency", 1000)
+        host_deadline = asyncio_cfg.get("host_deadline", 120)
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="healthcheck")
+        print(f"Asyncio engine: {max_concurrency} concurrent hosts, {host_deadline}s per host deadline")
+        # SSH connections kept open between iterations
+        pool = None
+        pool_cfg = ssh_cfg.get("pool", {})
+        if pool_cfg.get("enabled", True):
+            pool = SSHConnectionPool(
+                ssh_user,
+                ssh_port,
+                ssh_password,
+                ssh_key,
+                keepalive=pool_cfg.get("keepalive", 30),
+                idle_timeout=pool_cfg.get("idle_timeout", 600),
+                max_size=pool_cfg.get("max_size", 10000),
+            )
+    elif engine == "dask":
+        if Client is None:
+            print("Dask engine requires dask.distributed, install it or use engine: asyncio", file=sys.stderr)
+            sys.exit(1)
+        # Setup Dask client
+        dask_cfg = config.get("dask", {})
+        dask_address = dask_cfg.get("address")
+        if dask_address:
+            client = Client(address=dask_address)
+        else:
+            client = Client(processes=True)
+
+        print("Dask client:", client)
     else:
-        client = Client(processes=True)
-
-    print("Dask client:", client)
+        print(f"Unknown engine '{engine}', use dask or asyncio", file=sys.stderr)
+        sys.exit(1)
 
     # Handle clean shutdown with Ctrl+C
     stop = {"flag": False}
 
     def handle_sigint(signum, frame):
-        print("Received interrupt, stopping after current iteration...")
+        print("Received interrupt, stopping once hosts in flight are done...")
         stop["flag"] = True
 
     signal.signal(signal.SIGINT, handle_sigint)
 
+    store = None
     previous_results: dict[str, dict] = {}
-
-    print("Starting healthcheck loop. Press Ctrl+C to stop.")
-    while not stop["flag"]:
-        loop_start = time.time()
-        futures = {}
-
-        # Submit a task per host
-        for hostname, host_cfg in hosts_config.items():
-            futures[hostname] = client.submit(
-                run_healthchecks_on_host,
-                hostname,
-                host_cfg,
-                ssh_user,
-                ssh_port,
-                ssh_password,
-                ssh_key,
-                ssh_timeout,
-            )
-
-        results: dict[str, dict] = {}
-        for future in as_completed(list(futures.values())):
-            host_for_future = None
-            for host, fut in futures.items():
-                if fut == future:
-                    host_for_future = host
-                    break
-
-            try:
-                res = future.result()
-            except Exception as e:
-                res = {
-                    "errors": True,
-                    "healthchecks": [
-                        {
-                            "name": "Dask execution",
-                            "stdout": "",
-                            "stderr": f"Dask task failed: {e}",
-                            "error": True,
-                        }
-                    ],
-                }
-
-            if host_for_future is not None:
-                results[host_for_future] = res
-
-        # Write results
+    if store_path:
         try:
-            dump_yaml(results, results_file)
-            print(f"Wrote results to {results_file}")
+            store = ResultsStore(store_path)
         except Exception as e:
-            print(f"Failed to write results: {e}", file=sys.stderr)
+            print(f"Failed to open results database {store_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+        store.forget_hosts(set(hosts_config))
+        # States survive restarts, no alert again for hosts already in error
+        previous_results = store.latest()
+        retention_cfg = store_cfg.get("retention", {})
+        results_days = retention_cfg.get("results_days", 7)
+        changes_days = retention_cfg.get("changes_days", 90)
 
-        # Check for state transitions and send alerts
-        email_cfg = config.get("email", {})
-        send_recovery = email_cfg.get("send_recovery", False)
+    # Alert emails, sent from their own thread
+    alerts = alert_dispatcher(config)
 
-        for host, data in results.items():
-            prev_errors = previous_results.get(host, {}).get("errors", False)
-            now_errors = data.get("errors", False)
+    print("Starting healthcheck loop. Press Ctrl+C to stop.")
+    publisher = ResultsPublisher(
+        store,
+        results_file,
+        publish_interval,
+        {host: data for host, data in previous_results.items() if host in hosts_config},
+        lambda host, data, previous: handle_transition(host, data, previous, alerts, hosts_config),
+    )
+    scheduler = CheckScheduler(hosts_config, interval, time.time())
+    last_prune = 0.0
+    if engine == "asyncio":
+        runner = AsyncioHostRunner(executor, max_concurrency, ssh_args, pool)
+    else:
+        runner = DaskHostRunner(client, ssh_args)
+    # Hosts in flight: {host: (check indexes, dispatch time)}
+    running: dict[str, tuple] = {}
+
+    tracker = ReachabilityTracker(
+        reachability_cfg.get("failure_threshold", 2),
+        reachability_cfg.get("backoff", 10),
+        reachability_cfg.get("max_backoff", 60),
+        reachability_cfg.get("maintenance_file"),
+    )
+    for host, data in publisher.results.items():
+        if data.get("state") == ReachabilityTracker.DOWN:
+            tracker.set_down(host, time.time())
+
+    def publish_state(host, state):
+        # Last results are kept, with the new state, nothing runs meanwhile.
+        # Without any, no check ran: nothing to report as failed.
+        print(f"Host {host} is now {state}")
+        data = dict(publisher.results.get(host) or {"errors": False, "healthchecks": []})
+        data["state"] = state
+        publisher.add(host, data)
+
+    def record_reachability(host, reachable):
+        state = tracker.record(host, reachable, time.time())
+        if state == ReachabilityTracker.UP:
+            # Back: run all its checks now, not at their next run times
+            scheduler.run_now(host, time.time())
+        if state is not None:
+            publish_state(host, state)
 
-            # OK -> ERROR
-            if now_errors and not prev_errors:
-                subject = f"[ALERT] Host {host} is in ERROR"
-                body_lines = [f"The host {host} has entered an error state.", "", "Details:"]
-                for hc in data.get("healthchecks", []):
-                    status = "ERROR" if hc.get("error") else "OK"
-                    body_lines.append(f"- {hc.get('name')} : {status}")
-                    if hc.get("error"):
-                        body_lines.append(f"  stderr: {hc.get('stderr')}")
-                body = "\n".join(body_lines)
-                send_alert_email(subject, body, config)
-
-            # ERROR -> OK (optional recovery email)
-            if send_recovery and prev_errors and not now_errors:
-                subject = f"[RECOVERY] Host {host} is back to OK"
-                body = f"The host {host} has recovered and is now OK."
-                send_alert_email(subject, body, config)
-
-            # ERROR transition: run triggers
-            if now_errors and not prev_errors:
-                triggers = hosts_config.get(host, {}).get("on_error_triggers", [])
-                if triggers:
-                    run_error_triggers(host, triggers)
-
-                
-
-        previous_results = results
-
-        # Sleep until next iteration
-        elapsed = time.time() - loop_start
-        remaining = max(0, interval - elapsed)
-        if remaining > 0 and not stop["flag"]:
-            time.sleep(remaining)
+    while not stop["flag"]:
+        entering, leaving = tracker.reload_maintenance()
+        for host in sorted(entering & hosts_config.keys()):
+            publish_state(host, ReachabilityTracker.MAINTENANCE)
+        for host in sorted(leaving & hosts_config.keys()):
+            publish_state(host, tracker.state(host))
+            scheduler.run_now(host, time.time())
+
+        # Down hosts: probe only, readmitted as soon as they answer
+        probes = tracker.probes_due(time.time())
+        if probes:
+            reachable = probe_hosts(probes, ssh_port, probe_timeout)
+            for host in probes:
+                record_reachability(host, host in reachable)
+            publisher.flush()
+            if alerts is not None:
+                alerts.flush()
+
+        # Hosts are dispatched as their checks come due, checks of a host
+        # together, each host within its own deadline: a slow host holds
+        # back nobody else. Hosts down or in maintenance are skipped,
+        # hosts which failed to connect last time are probed first.
+        now = time.time()
+        due = scheduler.pop_due(now + schedule_window)
+        if due:
+            runnable = {host: indexes for host, indexes in due.items() if tracker.runnable(host)}
+            suspects = [host for host in runnable if tracker.suspect(host)]
+            if suspects:
+                reachable = probe_hosts(suspects, ssh_port, probe_timeout)
+                for host in suspects:
+                    if host not in reachable:
+                        del runnable[host]
+                        record_reachability(host, False)
+            scheduler.reschedule(
+                {host: indexes for host, indexes in due.items() if host not in runnable}, now + schedule_window
+            )
+            for host, host_config in round_hosts_config(hosts_config, runnable).items():
+                # A host may not run longer than the shortest interval of its checks
+                timeout = min([iteration_deadline] + [scheduler.intervals[(host, i)] for i in runnable[host]])
+                if engine == "asyncio":
+                    timeout = min(timeout, host_deadline)
+                runner.submit(host, host_config, timeout)
+                running[host] = (runnable[host], now)
+
+        # Collect hosts done until next checks are due, by steps to notice
+        # Ctrl+C and maintenance changes
+        done = runner.wait(min(max(scheduler.next_due() - time.time(), 0), 1))
+        for host, partial in done:
+            indexes, started = running.pop(host)
+            publisher.add(host, merge_host_result(hosts_config[host], publisher.results.get(host), indexes, partial))
+            record_reachability(host, not partial.get("unreachable", False))
+            # Not before the end of the window its checks were taken in
+            scheduler.reschedule({host: indexes}, max(time.time(), started + schedule_window))
+        publisher.flush_due()
+        if done and alerts is not None:
+            alerts.flush()
+
+        if now - last_prune >= interval:
+            last_prune = now
+            if engine == "asyncio" and pool is not None:
+                pool.evict_idle()
+                print(f"SSH pool: {len(pool.connections)} connections, {pool.stats}")
+            if store is not None:
+                store.prune(results_days, changes_days)
+
+    # Hosts in flight are done by their deadline
+    while len(runner):
+        for host, partial in runner.wait(1):
+            indexes, _ = running.pop(host)
+            publisher.add(host, merge_host_result(hosts_config[host], publisher.results.get(host), indexes, partial))
+    runner.close()
+
+    publisher.flush(export=True)
+    if alerts is not None:
+        alerts.close()
+
+    if engine == "asyncio" and pool is not None:
+        pool.close()
+    if store is not None:
+        store.close()
 
     print("Healthcheck loop stopped.")
 
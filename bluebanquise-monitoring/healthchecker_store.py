@@ -0,0 +1,404 @@
+"""
+Healthchecker results store.
+
+An SQLite database in WAL mode, written by the healthchecker and read by
+the CLI and the UI at the same time without locking each other out:
+
+  hosts     latest state of each host (one row per host), errors and
+            reachability state: up, down or maintenance
+  latest    latest result of each check (one row per host and check)
+  results   every check result, for history, pruned after retention
+  changes   state changes, OK -> ERROR and back, of hosts (check NULL)
+            and checks, kept longer than results
+  outputs   check outputs (stdout, stderr), by sha1 of their content:
+            the same df output of a host every minute, or the same empty
+            stderr of every check, is stored once. Large ones are zlib
+            compressed. Outputs no result refers to anymore are dropped
+            after retention.
+
+Results of a round of checks are written in a few transactions (one per
+publish of the healthchecker), not one per host or check.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    time REAL NOT NULL,
+    errors INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'up'
+);
+CREATE TABLE IF NOT EXISTS latest (
+    host TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    time REAL NOT NULL,
+    error INTEGER NOT NULL,
+    stdout_id TEXT NOT NULL,
+    stderr_id TEXT NOT NULL,
+    PRIMARY KEY (host, name)
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    host TEXT NOT NULL,
+    name TEXT NOT NULL,
+    error INTEGER NOT NULL,
+    stdout_id TEXT NOT NULL,
+    stderr_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_host_time ON results (host, time);
+CREATE INDEX IF NOT EXISTS results_time ON results (time);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    host TEXT NOT NULL,
+    name TEXT,
+    error INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_host_time ON changes (host, time);
+CREATE INDEX IF NOT EXISTS changes_time ON changes (time);
+CREATE TABLE IF NOT EXISTS outputs (
+    id TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    compressed INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+DAY = 86400
+# Outputs from that size (bytes) are compressed
+COMPRESS_MIN_SIZE = 256
+# Unreferenced outputs are looked for at most that often (seconds)
+COLLECT_INTERVAL = 3600
+
+
+def output_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def output_text(data: bytes, compressed: int) -> str:
+    if compressed:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+
+class ResultsStore:
+    """
+    Read and write access to the results database. Writers create the
+    database, readers (readonly=True) fail if it does not exist.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        # Known states, to detect changes without reading them back:
+        # {host: errors}, {(host, check): error} and {(host, check): time}
+        self.host_states: dict = {}
+        self.check_states: dict = {}
+        self.check_times: dict = {}
+        # Ids of stored outputs, not to compress again known outputs
+        self.output_ids: set = set()
+        self.last_collect = time.time()
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Results database not found: {path}")
+            self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            # WAL stays consistent on power loss, only the last commits can
+            # be lost, which the next iteration rewrites anyway
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.migrate()
+        self.db.row_factory = sqlite3.Row
+        if not readonly:
+            self.output_ids = {row[0] for row in self.db.execute("SELECT id FROM outputs")}
+            for row in self.db.execute("SELECT host, errors FROM hosts"):
+                self.host_states[row["host"]] = bool(row["errors"])
+            for row in self.db.execute("SELECT host, name, time, error FROM latest"):
+                self.check_states[(row["host"], row["name"])] = bool(row["error"])
+                self.check_times[(row["host"], row["name"])] = row["time"]
+
+    def migrate(self) -> None:
+        # Columns added after the first release of the database
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(hosts)")}
+        if "state" not in columns:
+            with self.db:
+                self.db.execute("ALTER TABLE hosts ADD COLUMN state TEXT NOT NULL DEFAULT 'up'")
+        # Outputs were stored in results and latest rows
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(results)")}
+        if "stdout" in columns:
+            self.migrate_outputs()
+
+    def migrate_outputs(self) -> None:
+        self.db.execute("BEGIN")
+        try:
+            self.db.execute("DROP INDEX results_host_time")
+            self.db.execute("DROP INDEX results_time")
+            self.db.execute("ALTER TABLE results RENAME TO results_old")
+            self.db.execute("ALTER TABLE latest RENAME TO latest_old")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.db.execute(statement)
+            outputs = {}
+            for table, columns in (
+                ("results", "id, time, host, name, error"),
+                ("latest", "host, name, position, time, error"),
+            ):
+                rows = []
+                for row in self.db.execute(f"SELECT {columns}, stdout, stderr FROM {table}_old"):
+                    ids = tuple(self.output_row(text, outputs) for text in row[-2:])
+                    rows.append(tuple(row[:-2]) + ids)
+                placeholders = ", ".join("?" * (len(columns.split(",")) + 2))
+                self.db.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+                self.db.execute(f"DROP TABLE {table}_old")
+            self.db.executemany("INSERT INTO outputs VALUES (?, ?, ?, ?)", outputs.values())
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            raise
+
+    def close(self) -> None:
+        self.db.close()
+
+    # -----------------------------
+    # Write
+    # -----------------------------
+
+    def output_row(self, text: str, outputs: dict) -> str:
+        """
+        Id of output text, adding its outputs table row to outputs if it
+        is not stored yet.
+        """
+        key = output_id(text)
+        if key not in self.output_ids and key not in outputs:
+            data = text.encode("utf-8")
+            compressed = 0
+            if len(data) >= COMPRESS_MIN_SIZE:
+                packed = zlib.compress(data)
+                if len(packed) < len(data):
+                    data, compressed = packed, 1
+            outputs[key] = (key, len(text), compressed, data)
+        return key
+
+    def write(self, batch: list) -> int:
+        """
+        Store a batch of (host, result, time) in one transaction, result as
+        returned by the healthchecker. Check results carrying the time they
+        ran are only added to history if not stored already, checks of a
+        host running at different intervals. Returns the number of state
+        changes. A host appearing more than once is stored with its last
+        result only.
+        """
+        batch = {host: (host, data, when) for host, data, when in batch}.values()
+        results, latest, hosts, changes = [], [], [], []
+        outputs: dict = {}
+        # Known states are only updated once stored: after a failed write,
+        # the next one still sees (and stores) the same changes
+        host_states: dict = {}
+        check_states: dict = {}
+        check_times: dict = {}
+        for host, data, when in batch:
+            errors = bool(data.get("errors"))
+            if self.host_states.get(host, False) != errors:
+                changes.append((when, host, None, errors))
+            host_states[host] = errors
+            hosts.append((host, when, errors, data.get("state", "up")))
+            for position, hc in enumerate(data.get("healthchecks", [])):
+                name = hc.get("name", f"check {position}")
+                error = bool(hc.get("error"))
+                stdout = self.output_row(hc.get("stdout") or "", outputs)
+                stderr = self.output_row(hc.get("stderr") or "", outputs)
+                checked = hc.get("time", when)
+                latest.append((host, name, position, checked, error, stdout, stderr))
+                if self.check_times.get((host, name)) == checked:
+                    continue
+                check_times[(host, name)] = checked
+                if self.check_states.get((host, name), False) != error:
+                    changes.append((checked, host, name, error))
+                check_states[(host, name)] = error
+                results.append((checked, host, name, error, stdout, stderr))
+
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO outputs VALUES (?, ?, ?, ?)", outputs.values())
+            # Checks removed from a host configuration leave the latest state
+            self.db.executemany("DELETE FROM latest WHERE host = ?", [(h[0],) for h in hosts])
+            self.db.executemany("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?)", hosts)
+            self.db.executemany("INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?, ?)", latest)
+            self.db.executemany(
+                "INSERT INTO results (time, host, name, error, stdout_id, stderr_id) VALUES (?, ?, ?, ?, ?, ?)",
+                results,
+            )
+            self.db.executemany("INSERT INTO changes (time, host, name, error) VALUES (?, ?, ?, ?)", changes)
+        self.output_ids.update(outputs)
+        self.host_states.update(host_states)
+        self.check_states.update(check_states)
+        self.check_times.update(check_times)
+        return len(changes)
+
+    def prune(self, results_days: float, changes_days: float) -> None:
+        """
+        Drop results and state changes older than their retention, in days,
+        0 keeping them forever.
+        """
+        now = time.time()
+        with self.db:
+            if results_days:
+                self.db.execute("DELETE FROM results WHERE time < ?", (now - results_days * DAY,))
+            if changes_days:
+                self.db.execute("DELETE FROM changes WHERE time < ?", (now - changes_days * DAY,))
+        if now - self.last_collect >= COLLECT_INTERVAL:
+            self.collect_outputs()
+
+    def collect_outputs(self) -> None:
+        """
+        Drop outputs no result refers to anymore. Scans results, so not on
+        each prune.
+        """
+        self.last_collect = time.time()
+        with self.db:
+            self.db.execute(
+                "DELETE FROM outputs WHERE id NOT IN ("
+                " SELECT stdout_id FROM results UNION SELECT stderr_id FROM results"
+                " UNION SELECT stdout_id FROM latest UNION SELECT stderr_id FROM latest)"
+            )
+        self.output_ids = {row[0] for row in self.db.execute("SELECT id FROM outputs")}
+
+    def forget_hosts(self, keep: set) -> None:
+        """
+        Drop latest state of hosts not in keep, removed from hosts.yaml.
+        History is left to retention.
+        """
+        gone = [(host,) for host in self.host_states if host not in keep]
+        if not gone:
+            return
+        with self.db:
+            self.db.executemany("DELETE FROM hosts WHERE host = ?", gone)
+            self.db.executemany("DELETE FROM latest WHERE host = ?", gone)
+        for (host,) in gone:
+            del self.host_states[host]
+        self.check_states = {key: error for key, error in self.check_states.items() if key[0] in keep}
+        self.check_times = {key: checked for key, checked in self.check_times.items() if key[0] in keep}
+
+    # -----------------------------
+    # Read
+    # -----------------------------
+
+    def latest(self, host: str = None, only_errors: bool = False, outputs: bool = True, preview: int = 0) -> dict:
+        """
+        Latest results, in the results.yaml layout:
+        {host: {"errors": bool, "time": float, "healthchecks": [...]}}, with
+        "state" for hosts down or in maintenance.
+        Check results also have stdout_id and stderr_id, for output(). If
+        outputs is False, stdout and stderr are not read at all (hosts
+        lists), else if preview is set, they are cut to preview characters,
+        stdout_size and stderr_size telling if they were.
+        """
+        where, params = [], []
+        if host is not None:
+            where.append("hosts.host = ?")
+            params.append(host)
+        if only_errors:
+            where.append("hosts.errors = 1")
+        query = (
+            "SELECT hosts.host, hosts.errors, hosts.time AS host_time, hosts.state, latest.name, latest.time, latest.error,"
+            " latest.stdout_id, latest.stderr_id"
+        )
+        if outputs:
+            query += (
+                ", o.data AS stdout, o.compressed AS stdout_compressed, o.size AS stdout_size,"
+                " e.data AS stderr, e.compressed AS stderr_compressed, e.size AS stderr_size"
+                " FROM hosts LEFT JOIN latest ON latest.host = hosts.host"
+                " LEFT JOIN outputs o ON o.id = latest.stdout_id LEFT JOIN outputs e ON e.id = latest.stderr_id"
+            )
+        else:
+            query += " FROM hosts LEFT JOIN latest ON latest.host = hosts.host"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY hosts.host, latest.position"
+        output: dict = {}
+        for row in self.db.execute(query, params):
+            entry = output.setdefault(
+                row["host"], {"errors": bool(row["errors"]), "time": row["host_time"], "healthchecks": []}
+            )
+            if row["state"] != "up":
+                entry["state"] = row["state"]
+            if row["name"] is not None:
+                hc = {
+                    "name": row["name"],
+                    "error": bool(row["error"]),
+                    "time": row["time"],
+                    "stdout_id": row["stdout_id"],
+                    "stderr_id": row["stderr_id"],
+                }
+                if outputs:
+                    for stream in ("stdout", "stderr"):
+                        text = output_text(row[stream], row[f"{stream}_compressed"]) if row[stream] is not None else ""
+                        hc[stream] = text[:preview] if preview else text
+                        hc[f"{stream}_size"] = len(text)
+                entry["healthchecks"].append(hc)
+        return output
+
+    def output(self, key: str):
+        """
+        Text of output key (a stdout_id or stderr_id), None if unknown.
+        """
+        row = self.db.execute("SELECT data, compressed FROM outputs WHERE id = ?", (key,)).fetchone()
+        return output_text(row["data"], row["compressed"]) if row is not None else None
+
+    def errors(self, outputs: bool = True) -> dict:
+        return self.latest(only_errors=True, outputs=outputs)
+
+    def history(self, host: str, since: float = None, limit: int = 100, only_errors: bool = False) -> list:
+        """
+        Check results of host, most recent first.
+        """
+        query = (
+            "SELECT time, name, error, o.data AS stdout, o.compressed AS stdout_compressed,"
+            " e.data AS stderr, e.compressed AS stderr_compressed FROM results"
+            " JOIN outputs o ON o.id = stdout_id JOIN outputs e ON e.id = stderr_id WHERE host = ?"
+        )
+        params: list = [host]
+        if since is not None:
+            query += " AND time >= ?"
+            params.append(since)
+        if only_errors:
+            query += " AND error = 1"
+        query += " ORDER BY time DESC, results.id DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                "time": row["time"],
+                "name": row["name"],
+                "error": bool(row["error"]),
+                "stdout": output_text(row["stdout"], row["stdout_compressed"]),
+                "stderr": output_text(row["stderr"], row["stderr_compressed"]),
+            }
+            for row in self.db.execute(query, params)
+        ]
+
+    def changes(self, host: str = None, since: float = None, limit: int = 100) -> list:
+        """
+        State changes, of host or all hosts, most recent first. name is None
+        for host level changes.
+        """
+        where, params = [], []
+        if host is not None:
+            where.append("host = ?")
+            params.append(host)
+        if since is not None:
+            where.append("time >= ?")
+            params.append(since)
+        query = "SELECT time, host, name, error FROM changes"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY time DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row, error=bool(row["error"])) for row in self.db.execute(query, params)]
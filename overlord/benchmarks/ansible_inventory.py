@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Ansible dynamic inventory check and benchmark.
+
+Compares what Ansible itself parses from the inventory file layout with
+what bluebanquise-overlord-inventory.py provides, both read through
+ansible-inventory so that variable merging is done by Ansible:
+  - group membership of every host
+  - variables of every host (host_vars and group_vars merged)
+Then times both sources, the Overlord one with a cold and a warm cache.
+
+Requires ansible-inventory in PATH. Usage, from overlord folder:
+  OVERLORD_CONFIG=bluebanquise-overlord.yml python3 benchmarks/ansible_inventory.py [-n RUNS]
+Exit code is 1 if inventories differ.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+OVERLORD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, OVERLORD_DIR)
+
+from common.files import load_config
+
+SCRIPT = os.path.join(OVERLORD_DIR, "bluebanquise-overlord-inventory.py")
+CACHE_FILE = "ansible_inventory.json"
+
+
+def ansible_inventory(source, env):
+    result = subprocess.run(
+        ["ansible-inventory", "-i", source, "--list"],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def normalize(data):
+    """
+    Return ({host: sorted groups}, {host: vars}) from ansible-inventory --list output.
+    """
+    memberships = {}
+    for group, content in data.items():
+        if group == "_meta" or not isinstance(content, dict):
+            continue
+        for host in content.get("hosts", []):
+            memberships.setdefault(host, set()).add(group)
+    hostvars = data.get("_meta", {}).get("hostvars", {})
+    return {h: sorted(g) for h, g in memberships.items()}, hostvars
+
+
+def compare(expected, actual):
+    errors = []
+    for label, exp, act in (("groups", expected[0], actual[0]), ("vars", expected[1], actual[1])):
+        for host in sorted(set(exp) | set(act)):
+            if exp.get(host) != act.get(host):
+                errors.append(f"{label} of {host}: files={exp.get(host)!r} overlord={act.get(host)!r}")
+    return errors
+
+
+def timed(cmd, env, before=None):
+    if before:
+        before()
+    start = time.perf_counter()
+    subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlord Ansible inventory check and benchmark")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Runs per scenario")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OVERLORD_CONFIG", os.path.join(OVERLORD_DIR, "bluebanquise-overlord.yml"))
+    env["OVERLORD_CONFIG"] = os.path.abspath(env["OVERLORD_CONFIG"])
+    config = load_config(env["OVERLORD_CONFIG"])
+    files_source = os.path.join(config["inventory_path"], "inventory")
+    cache_path = os.path.join(config["working_folder"], CACHE_FILE)
+
+    errors = compare(
+        normalize(ansible_inventory(files_source, env)),
+        normalize(ansible_inventory(SCRIPT, env)),
+    )
+    for error in errors:
+        print(f"DIFF {error}")
+    print(f"Equivalence: {'FAILED' if errors else 'OK'}")
+
+    def drop_cache():
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
+
+    scenarios = [
+        ("ansible-inventory, files", ["ansible-inventory", "-i", files_source, "--list"], None),
+        ("ansible-inventory, overlord cold", ["ansible-inventory", "-i", SCRIPT, "--list"], drop_cache),
+        ("ansible-inventory, overlord warm", ["ansible-inventory", "-i", SCRIPT, "--list"], None),
+        ("overlord script --list, warm", [sys.executable, SCRIPT, "--list"], None),
+    ]
+    print(f"{'scenario':<36}{'mean (ms)':>12}{'min (ms)':>12}")
+    for name, cmd, before in scenarios:
+        timings = [timed(cmd, env, before) for _ in range(args.runs)]
+        print(f"{name:<36}{statistics.mean(timings) * 1000:>12.1f}{min(timings) * 1000:>12.1f}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
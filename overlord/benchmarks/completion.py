@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Shell completion latency benchmark.
+
+Builds a completion index of N hosts (default 50000) in a temporary
+working folder, sources the bash completion script and times the
+completion function itself (no bash startup) with $EPOCHREALTIME, for:
+  - sections, plugins and actions
+  - host names, with a short prefix (many candidates) and a long one
+
+Requires bash >= 5. Usage, from overlord folder:
+  python3 benchmarks/completion.py [-n HOSTS] [-r RUNS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+
+OVERLORD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, OVERLORD_DIR)
+
+from common.completion import completion_script, write_name_index, write_plugin_index
+from common.plugins import enabled_plugins, scan_plugins
+
+TIMING_SNIPPET = """
+source "$1"
+shift
+runs=$1
+shift
+for line in "$@"; do
+    read -ra COMP_WORDS <<< "$line"
+    [[ "$line" == *" " ]] && COMP_WORDS+=("")
+    COMP_CWORD=$((${#COMP_WORDS[@]} - 1))
+    for ((run = 0; run < runs; run++)); do
+        start=$EPOCHREALTIME
+        _bluebanquise_overlord
+        end=$EPOCHREALTIME
+        echo "$line|${#COMPREPLY[@]}|$start|$end"
+    done
+done
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlord shell completion benchmark")
+    parser.add_argument("-n", "--hosts", type=int, default=50000, help="Hosts in the index")
+    parser.add_argument("-r", "--runs", type=int, default=20, help="Runs per scenario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="overlord-completion-") as working_folder:
+        racks = max(1, args.hosts // 1000)
+        inventory = SimpleNamespace(
+            working_folder=working_folder,
+            hosts={f"c{i:05d}": {} for i in range(args.hosts)},
+            groups={f"rack_{i}": {} for i in range(racks)},
+        )
+        write_name_index(inventory)
+        manifest = scan_plugins(os.path.join(OVERLORD_DIR, "plugins"))
+        write_plugin_index(working_folder, enabled_plugins(manifest))
+        script_path = os.path.join(working_folder, "completion.bash")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(completion_script("bash", working_folder))
+
+        scenarios = [
+            "bluebanquise-overlord.py ",
+            "bluebanquise-overlord.py inventory ",
+            "bluebanquise-overlord.py inventory host ",
+            "bluebanquise-overlord.py inventory host get c",
+            "bluebanquise-overlord.py inventory host get c1",
+            "bluebanquise-overlord.py inventory host get c4999",
+            "bluebanquise-overlord.py inventory group add_hosts rack_1 c0012",
+        ]
+        result = subprocess.run(
+            ["bash", "-c", TIMING_SNIPPET, "bash", script_path, str(args.runs)] + scenarios,
+            check=True, capture_output=True, text=True,
+        )
+
+    timings = {}
+    for line in result.stdout.splitlines():
+        scenario, candidates, start, end = line.split("|")
+        entry = timings.setdefault(scenario, {"candidates": int(candidates), "durations": []})
+        entry["durations"].append(float(end) - float(start))
+
+    print(f"{'words':<52}{'candidates':>12}{'mean (ms)':>12}{'max (ms)':>12}")
+    for scenario in scenarios:
+        entry = timings[scenario]
+        words = scenario.split(" ", 1)[1] + "<TAB>"
+        print(
+            f"{words:<52}{entry['candidates']:>12}"
+            f"{statistics.mean(entry['durations']) * 1000:>12.2f}{max(entry['durations']) * 1000:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark for Overlord entry points.
+
+Measures the UI/API application creation (create_app) and a CLI run,
+each in a fresh process, with a cold plugins manifest (cache removed
+before each run) and with a warm one.
+
+Usage, from overlord folder:
+  OVERLORD_CONFIG=bluebanquise-overlord.yml python3 benchmarks/startup.py [-n RUNS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+OVERLORD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, OVERLORD_DIR)
+
+from common.files import load_config
+from common.plugins import MANIFEST_FILE
+
+UI_SNIPPET = """
+import importlib.util, os
+spec = importlib.util.spec_from_file_location("overlord_ui", "bluebanquise-overlord-ui.py")
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.create_app(os.environ["OVERLORD_CONFIG"])
+"""
+
+
+def run_timed(cmd, env, manifest_path, cold):
+    if cold and os.path.isfile(manifest_path):
+        os.remove(manifest_path)
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=OVERLORD_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlord startup benchmark")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Runs per scenario")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OVERLORD_CONFIG", "bluebanquise-overlord.yml")
+    config = load_config(os.path.join(OVERLORD_DIR, env["OVERLORD_CONFIG"]))
+    manifest_path = os.path.join(config["working_folder"], MANIFEST_FILE)
+
+    scenarios = {
+        "ui create_app": [sys.executable, "-c", UI_SNIPPET],
+        "cli inventory host list": [sys.executable, "bluebanquise-overlord.py", "inventory", "host", "list"],
+    }
+
+    print(f"{'scenario':<28}{'manifest':<10}{'mean (ms)':>12}{'min (ms)':>12}")
+    for name, cmd in scenarios.items():
+        for cold in (True, False):
+            # Warm run to populate cache and OS file cache
+            run_timed(cmd, env, manifest_path, cold=False)
+            timings = [run_timed(cmd, env, manifest_path, cold) for _ in range(args.runs)]
+            print(
+                f"{name:<28}{'cold' if cold else 'warm':<10}"
+                f"{statistics.mean(timings) * 1000:>12.1f}{min(timings) * 1000:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
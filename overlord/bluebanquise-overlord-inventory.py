@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Ansible dynamic inventory backed by Overlord inventory model.
+
+Ansible re-parses every hosts.yml, groups/*.ini, host_vars and group_vars
+file at each playbook run. This script renders the same inventory once,
+caches the rendered JSON in Overlord working folder, and serves it as is
+as long as inventory files did not change (checked with stats only).
+
+Usage:
+  ansible-playbook -i /path/to/bluebanquise-overlord-inventory.py site.yml
+  bluebanquise-overlord-inventory.py --list | --host HOST [--refresh]
+
+Configuration is read from OVERLORD_CONFIG, or bluebanquise-overlord.yml
+next to this script.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+
+OVERLORD_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, OVERLORD_DIR)
+
+from common.files import load_config
+from common.inventory import AnsibleInventory, inventory_signature
+
+CACHE_FILE = "ansible_inventory.json"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="BlueBanquise Overlord Ansible inventory")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--list", action="store_true", help="Output whole inventory")
+    group.add_argument("--host", help="Output variables of a single host")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached inventory")
+    return parser.parse_args(argv)
+
+
+def write_atomic(path: str, content: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def cached_inventory(inventory_root: str, working_folder: str, refresh: bool = False) -> str:
+    """
+    Return path of the rendered --list JSON, rendering it again only if
+    inventory files changed since it was cached.
+    """
+    os.makedirs(working_folder, exist_ok=True)
+    cache_path = os.path.join(working_folder, CACHE_FILE)
+    signature_path = cache_path + ".signature"
+    signature = f"{os.path.abspath(inventory_root)}:{inventory_signature(inventory_root)}"
+
+    if not refresh and os.path.isfile(cache_path):
+        try:
+            with open(signature_path, "r", encoding="utf-8") as f:
+                if f.read().strip() == signature:
+                    return cache_path
+        except FileNotFoundError:
+            pass
+
+    inventory = AnsibleInventory(inventory_root=inventory_root, working_folder=working_folder)
+    write_atomic(cache_path, json.dumps(inventory.to_ansible()))
+    write_atomic(signature_path, signature + "\n")
+    return cache_path
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    config_path = os.environ.get(
+        "OVERLORD_CONFIG", os.path.join(OVERLORD_DIR, "bluebanquise-overlord.yml")
+    )
+    try:
+        config = load_config(config_path)
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    inventory_root = config.get("inventory_path")
+    working_folder = config.get("working_folder")
+    if not inventory_root or not working_folder:
+        print("inventory_path or working_folder not defined in configuration", file=sys.stderr)
+        return 1
+
+    cache_path = cached_inventory(inventory_root, working_folder, args.refresh)
+
+    if args.list:
+        # Already rendered, no need to parse it
+        with open(cache_path, "r", encoding="utf-8") as f:
+            shutil.copyfileobj(f, sys.stdout)
+        sys.stdout.write("\n")
+        return 0
+
+    with open(cache_path, "r", encoding="utf-8") as f:
+        hostvars = json.load(f)["_meta"]["hostvars"]
+    print(json.dumps(hostvars.get(args.host, {})))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
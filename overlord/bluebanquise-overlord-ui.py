@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 
+import gc
 import os
 import sys
+import threading
+import time
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 
-from common.inventory import AnsibleInventory
+from common.errors import PluginError, NotFoundError, ConflictError
+from common.events import EventJournal, sse_stream
+from common.inventory import AnsibleInventory, enable_inventory_cache
+from common.jobs import get_job_manager
+from common.completion import register_completion_index
 from common.files import load_config, load_yaml_file
+from common.generators import register_generators
 from common.logging import configure_logging
-from common.plugins import load_plugin_module, load_plugin_metadata
+from common.metrics import REGISTRY, SIZE_BUCKETS, collect_metrics_folder
+from common.plugins import load_plugin_module, load_plugin_manifest, enabled_plugins
 from common.ui import deep_merge_ui_skeleton
 
 
@@ -49,6 +58,17 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
         }
     ]
 
+    # Change feed pollers
+    # Plugins can register callables(journal) here, called by each /api/v1/events
+    # stream at every poll, to detect their own changes and publish events.
+    app.config["EVENT_POLLERS"] = []
+    # Each open stream holds a server thread: at most max_streams per
+    # process, further ones are told to come back later (see events_stream)
+    events_cfg = config.get("events", {})
+    event_streams = threading.BoundedSemaphore(
+        int(events_cfg.get("max_streams", max(1, int(config.get("ui", {}).get("threads", 8)) // 2)))
+    )
+
 
     def deep_merge_ui_skeleton(base_list: list, other_list: list) -> list:
         """
@@ -154,26 +174,25 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
     plugins_path = config.get("plugins_path", "./plugins")
     sys.path.insert(0, os.path.abspath(plugins_path))
 
+    # Plugins are described by a manifest, scanned once and cached in working_folder
+    manifest = load_plugin_manifest(plugins_path, working_folder, logger)
+    app.config["PLUGINS_MANIFEST"] = manifest
+    plugins = enabled_plugins(manifest, config.get("plugins_enabled"))
+
     # Add plugin template folders to Jinja search path
-    for root, dirs, files in os.walk(plugins_path):
-        if "templates" in dirs:
-            template_dir = os.path.join(root, "templates")
-            app.jinja_loader.searchpath.append(os.path.abspath(template_dir))
-
-    # Discover plugin UI and API blueprints
-    for root, dirs, files in os.walk(plugins_path):
-
-        # Load plugin config first
-        plugin_config = {}
-        if "config.yml" in files:
-            plugin_config_path = os.path.join(root, "config.yml")
-            plugin_config = load_yaml_file(plugin_config_path) or {}
-        if "main_ui.py" in files:
-            main_ui_path = os.path.join(root, "main_ui.py")
+    for entry in plugins:
+        if entry["templates"]:
+            app.jinja_loader.searchpath.append(entry["templates"])
+
+    # Load plugin UI and API blueprints
+    for entry in plugins:
+        rel = os.path.join(entry["section"], entry["plugin"])
+
+        if entry["main_ui"]:
+            main_ui_path = os.path.join(entry["path"], "main_ui.py")
 
             # Build a unique module name from path
-            rel = os.path.relpath(main_ui_path, plugins_path)
-            mod_name = "plugins_ui_" + rel.replace(os.sep, "_").replace(".py", "")
+            mod_name = "plugins_ui_" + rel.replace(os.sep, "_") + "_main_ui"
 
             try:
                 module = load_plugin_module(main_ui_path, mod_name)
@@ -184,7 +203,7 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
             # Expect: module.blueprint and module.ui_integration
             blueprint = getattr(module, "blueprint", None)
 
-            ui_integration = plugin_config.get("ui_integration", None)
+            ui_integration = entry["ui_integration"]
 
             if blueprint is None or ui_integration is None:
                 logger.warning(
@@ -202,12 +221,11 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
 
             logger.debug("Loaded UI plugin from %s", main_ui_path)
 
-        if "main_api.py" in files:
-            main_api_path = os.path.join(root, "main_api.py")
+        if entry["main_api"]:
+            main_api_path = os.path.join(entry["path"], "main_api.py")
 
             # Build a unique module name from path
-            rel = os.path.relpath(main_api_path, plugins_path)
-            mod_name = "plugins_api_" + rel.replace(os.sep, "_").replace(".py", "")
+            mod_name = "plugins_api_" + rel.replace(os.sep, "_") + "_main_api"
 
             try:
                 module = load_plugin_module(main_api_path, mod_name)
@@ -231,6 +249,108 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
             logger.debug("Loaded API plugin from %s", main_api_path)
 
 
+    # Plugin errors raised down in the stack (inventory save conflict, etc.)
+    # are returned as regular API errors instead of a 500.
+    # flask_restful only lets exceptions reach app error handlers if propagated.
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+
+    @app.errorhandler(PluginError)
+    def handle_plugin_error(e):
+        status_code = 400
+        if isinstance(e, NotFoundError):
+            status_code = 404
+        elif isinstance(e, ConflictError):
+            status_code = 409
+        return jsonify({"status": "error", "message": str(e)}), status_code
+
+    # Generators to run after inventory saves, if any
+    register_generators(config, logger)
+    # Shell completion name index, refreshed after inventory saves
+    register_completion_index(logger)
+
+    # In memory inventory snapshot, shared by all requests as long as the
+    # inventory version did not change. Preloaded here so that in production
+    # mode, workers inherit it from the master process (copy-on-write).
+    ui_cfg = config.get("ui", {})
+    if config.get("inventory_cache", ui_cfg.get("mode") == "production"):
+        enable_inventory_cache()
+        if inventory_root and working_folder:
+            logger.debug("Preloading inventory")
+            AnsibleInventory(inventory_root, working_folder, logger=logger)
+
+    # Request metrics, exposed at /metrics in Prometheus text format
+    # Each process dumps its own metrics into working_folder/metrics, and /metrics
+    # merges them, so all workers and CLI runs are visible whichever worker answers.
+    metrics_cfg = config.get("metrics", {})
+    if metrics_cfg.get("enabled", True):
+        metrics_dir = os.path.join(working_folder, "metrics") if working_folder else None
+        metrics_dump_interval = float(metrics_cfg.get("dump_interval", 5))
+        metrics_state = {"last_dump": 0.0}
+        metrics_lock = threading.Lock()
+
+        # Metrics of previous server instances are meaningless now
+        if metrics_dir and os.path.isdir(metrics_dir):
+            for fname in os.listdir(metrics_dir):
+                if fname.startswith("ui-"):
+                    os.remove(os.path.join(metrics_dir, fname))
+
+        def dump_process_metrics(force: bool = False) -> None:
+            if not metrics_dir:
+                return
+            # Request threads race here, a single one dumps per interval
+            with metrics_lock:
+                now = time.time()
+                if not force and now - metrics_state["last_dump"] < metrics_dump_interval:
+                    return
+                metrics_state["last_dump"] = now
+            try:
+                REGISTRY.dump(os.path.join(metrics_dir, f"ui-{os.getpid()}.json"))
+            except OSError as e:
+                logger.warning("Failed to dump metrics: %s", e)
+
+        @app.before_request
+        def metrics_start_timer():
+            g.request_start = time.perf_counter()
+
+        @app.after_request
+        def metrics_record_request(response):
+            start = g.get("request_start")
+            if start is None:
+                return response
+            # Route template, not the raw path, to keep cardinality low
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            labels = {"route": route, "method": request.method}
+            REGISTRY.observe(
+                "overlord_http_request_duration_seconds",
+                time.perf_counter() - start,
+                labels,
+                help_text="HTTP request duration (until response headers for streams)",
+            )
+            REGISTRY.inc(
+                "overlord_http_requests_total",
+                dict(labels, status=response.status_code),
+                help_text="HTTP requests by route, method and status code",
+            )
+            if not response.is_streamed:
+                REGISTRY.observe(
+                    "overlord_http_response_size_bytes",
+                    response.calculate_content_length() or 0,
+                    labels,
+                    buckets=SIZE_BUCKETS,
+                    help_text="HTTP response body size",
+                )
+            dump_process_metrics()
+            return response
+
+        @app.route("/metrics")
+        def metrics():
+            if metrics_dir:
+                dump_process_metrics(force=True)
+                registry = collect_metrics_folder(metrics_dir)
+            else:
+                registry = REGISTRY
+            return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
     # This is a special move
     # We can inject a dict into templates rendering context, this avoids to pass it all the time
     # Super useful for us here
@@ -240,6 +360,69 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
             "ui_skeleton": app.config.get("UI_SKELETON", {}),
         }
 
+    # Change feed: inventory and health events, as Server-Sent Events
+    # ?types=host.,group. allows to filter on event type prefixes
+    @app.route("/api/v1/events")
+    def events_stream():
+        events_cfg = config.get("events", {})
+        journal = EventJournal(
+            working_folder,
+            max_size=int(events_cfg.get("max_journal_size", 1024 * 1024)),
+        )
+        types = [t for t in request.args.get("types", "").split(",") if t]
+        if not event_streams.acquire(blocking=False):
+            # EventSource gives up for good on an error status, but
+            # reconnects after retry milliseconds from a stream that ends
+            return Response(
+                "retry: 5000\n\n",
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+        stream = sse_stream(
+            journal,
+            last_event_id=request.headers.get("Last-Event-ID"),
+            types=types,
+            pollers=app.config["EVENT_POLLERS"],
+            poll_interval=float(events_cfg.get("poll_interval", 1)),
+            heartbeat=float(events_cfg.get("heartbeat", 15)),
+            max_duration=float(events_cfg.get("max_duration", 300)),
+        )
+        response = Response(
+            stream,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Called once the stream ended or the client went away
+        response.call_on_close(event_streams.release)
+        return response
+
+    # Background jobs, submitted by plugin APIs with ?async=1
+    # Job state is shared through working_folder, any worker can answer.
+    @app.route("/api/v1/jobs")
+    def jobs_list():
+        jobs = get_job_manager(config, logger).list()
+        return jsonify({"status": "ok", "data": {"jobs": jobs}})
+
+    @app.route("/api/v1/jobs/<job_id>")
+    def jobs_get(job_id):
+        job = get_job_manager(config, logger).get(job_id)
+        return jsonify({"status": "ok", "data": {"job": job}})
+
+    @app.route("/api/v1/jobs/<job_id>/log")
+    def jobs_log(job_id):
+        # Streamed as plain text, line by line, until the job is finished,
+        # or for ui.log_max_duration seconds: resume with ?offset=<bytes received>
+        stream = get_job_manager(config, logger).follow_log(
+            job_id,
+            offset=max(0, request.args.get("offset", 0, type=int)),
+            max_duration=float(config.get("ui", {}).get("log_max_duration", 300)),
+        )
+        return Response(
+            stream,
+            mimetype="text/plain",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @app.route('/webfonts/<path:filename>')
     def cover_webfonts(filename):
         return send_from_directory(app.root_path + '/static/webfonts/', filename)
@@ -247,13 +430,57 @@ def create_app(config_path: str = "bluebanquise-overlord.yml") -> Flask:
     return app
 
 
+def run_production(app: Flask, host: str, port: int, ui_cfg: dict) -> int:
+    """
+    Serve app with gunicorn pre-forking server.
+    App, plugins and inventory are already loaded, workers are forked from
+    this process and share this memory copy-on-write.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Production mode requires gunicorn, please install it", file=sys.stderr)
+        return 1
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": int(ui_cfg.get("workers", 4)),
+        "threads": int(ui_cfg.get("threads", 8)),
+        "worker_class": "gthread",
+        "timeout": int(ui_cfg.get("timeout", 120)),
+        "preload_app": True,
+    }
+
+    class OverlordApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    # Workers start with empty metrics, not the master loading ones
+    REGISTRY.metrics.clear()
+
+    # Move everything loaded so far out of the garbage collector tracking,
+    # so that collections in workers do not touch (and copy) shared pages
+    gc.freeze()
+
+    OverlordApplication().run()
+    return 0
+
+
 if __name__ == "__main__":
     config_path = os.environ.get("OVERLORD_CONFIG", "bluebanquise-overlord.yml")
     app = create_app(config_path)
     cfg = app.config["OVERLORD_CONFIG"]
-    host = cfg.get("ui", {}).get("host", "127.0.0.1")
-    port = int(cfg.get("ui", {}).get("port", 5000))
-    
+    ui_cfg = cfg.get("ui", {})
+    host = ui_cfg.get("host", "127.0.0.1")
+    port = int(ui_cfg.get("port", 5000))
+
+    if ui_cfg.get("mode", "development") == "production":
+        sys.exit(run_production(app, host, port, ui_cfg))
+
     print("URLs map:")
     print(app.url_map)
     app.run(host=host, port=port, debug=False)
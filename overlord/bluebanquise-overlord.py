@@ -3,12 +3,16 @@
 import os
 import sys
 import json
+import time
 import yaml
 import argparse
 
+from common.completion import completion_script, register_completion_index, write_name_index, write_plugin_index
 from common.files import load_config, load_yaml_file
+from common.generators import register_generators
 from common.logging import configure_logging
-from common.plugins import load_plugin_module
+from common.metrics import REGISTRY, accumulate_snapshot
+from common.plugins import load_plugin_module, load_plugin_manifest, enabled_plugins
 from common.inventory import AnsibleInventory
 
 
@@ -35,6 +39,12 @@ def parse_args(argv):
         metavar="WORKING_FOLDER",
         help="Use this working folder instead of the one defined in the configuration",
     )
+    parser.add_argument(
+        "--completion",
+        metavar="SHELL",
+        choices=["bash", "zsh"],
+        help="Print shell completion script and refresh its name index",
+    )
     parser.add_argument(
         "-h",
         "--help",
@@ -48,7 +58,7 @@ def parse_args(argv):
     return parser, known, remaining
 
 
-def print_main_help():
+def print_main_help(plugins=None):
     print(
         """Usage:
   bluebanquise-overlord.py [GLOBAL_OPTIONS] SECTION PLUGIN [ACTION ...]
@@ -60,18 +70,63 @@ Global options:
   -h, --help              Show this help or plugin-specific help
   -i, --inventory PATH    Override inventory root path from configuration
   -w, --working-folder P  Override working folder path from configuration
+  --completion SHELL      Print bash or zsh completion script
 
 Example:
   bluebanquise-overlord.py inventory host list
   bluebanquise-overlord.py inventory host add c001 '{"alias": "compute-1"}'
+  source <(bluebanquise-overlord.py --completion bash)
 """
     )
+    if plugins:
+        print("Available plugins:")
+        for entry in plugins:
+            if entry["main"]:
+                description = entry["config"].get("description", "")
+                name = f"{entry['section']} {entry['plugin']}"
+                print(f"  {name:<24}{description}")
+
+
+def record_cli_metrics(config, working_folder, labels, status, duration, logger):
+    """
+    Accumulate this run counters into working_folder/metrics/cli.json,
+    exposed by the UI /metrics endpoint, and optionally into a Prometheus
+    textfile (node_exporter textfile collector).
+    """
+    metrics_cfg = config.get("metrics", {})
+    if not metrics_cfg.get("enabled", True):
+        return
+    REGISTRY.inc(
+        "overlord_cli_runs_total",
+        dict(labels, status=status),
+        help_text="CLI runs by section, plugin, action and status",
+    )
+    REGISTRY.observe(
+        "overlord_cli_run_duration_seconds",
+        duration,
+        labels,
+        help_text="CLI run duration, plugin loading included",
+    )
+    try:
+        accumulated = accumulate_snapshot(
+            os.path.join(working_folder, "metrics", "cli.json"), REGISTRY
+        )
+        textfile = metrics_cfg.get("cli_textfile")
+        if textfile:
+            tmp_path = f"{textfile}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(accumulated.render())
+            os.replace(tmp_path, textfile)
+    except OSError as e:
+        logger.warning("Failed to record CLI metrics: %s", e)
 
 
 def main(argv=None):
     if argv is None:
         argv = sys.argv[1:]
 
+    start = time.perf_counter()
+
     # Get parameters
     parser, global_args, remaining = parse_args(argv)
 
@@ -106,9 +161,29 @@ def main(argv=None):
         return 1
     logger.debug("Working folder: " + working_folder)
 
+    # Generators to run after inventory saves, if any
+    register_generators(dict(config, working_folder=working_folder), logger)
+    # Shell completion name index, refreshed after inventory saves
+    register_completion_index(logger)
+
+    # Plugins manifest, cached in working folder, avoids to scan plugins each run
+    plugins_path = config.get("plugins_path", "./plugins")
+    manifest = load_plugin_manifest(plugins_path, working_folder, logger)
+    plugins = enabled_plugins(manifest, config.get("plugins_enabled"))
+    try:
+        write_plugin_index(working_folder, plugins)
+    except OSError as e:
+        logger.warning("Failed to update completion index: %s", e)
+
+    if global_args.completion:
+        # Full refresh, catches manual inventory edits
+        write_name_index(AnsibleInventory(inventory_root, working_folder, logger=logger))
+        print(completion_script(global_args.completion, working_folder), end="")
+        return 0
+
     if len(remaining) < 2:
         if global_args.help:
-            print_main_help()
+            print_main_help(plugins)
             return 0
         print("Missing SECTION and PLUGIN. Use --help for usage.", file=sys.stderr)
         return 1
@@ -124,16 +199,20 @@ def main(argv=None):
         )
         return 0
 
-    # Load plugin
+    # Load plugin, only this one is imported
     logger.debug("Loading plugin")
-    plugins_path = config.get("plugins_path", "./plugins")
-    plugin_main_path = os.path.join(plugins_path, section, plugin_name, "main.py")
-    if not os.path.isfile(plugin_main_path):
+    plugin_entry = None
+    for entry in plugins:
+        if entry["section"] == section and entry["plugin"] == plugin_name and entry["main"]:
+            plugin_entry = entry
+            break
+    if plugin_entry is None:
         print(
-            f"Plugin not found: section={section}, plugin={plugin_name}, path={plugin_main_path}",
+            f"Plugin not found: section={section}, plugin={plugin_name}, path={plugins_path}",
             file=sys.stderr,
         )
         return 1
+    plugin_main_path = os.path.join(plugin_entry["path"], "main.py")
 
     module_name = f"plugins.{section}.{plugin_name}.main"
     plugin_module = load_plugin_module(plugin_main_path, module_name)
@@ -157,13 +236,8 @@ def main(argv=None):
         "config": config,
     }
 
-    # Load plugin config.yml if present, not mandatory for CLI
-    plugin_config_path = os.path.join(
-        plugins_path, section, plugin_name, "config.yml"
-    )
-    plugin_config = {}
-    if os.path.isfile(plugin_config_path):
-        plugin_config = load_yaml_file(plugin_config_path) or {}
+    # Plugin config.yml content, if present, not mandatory for CLI
+    plugin_config = plugin_entry["config"]
 
     # Ok, we are ready, lets create our instance, this will call plugin init
     plugin_instance = PluginClass(
@@ -177,6 +251,15 @@ def main(argv=None):
     # We get the result to parse
     result = plugin_instance.cli_execute()
 
+    record_cli_metrics(
+        config,
+        working_folder,
+        {"section": section, "plugin": plugin_name, "action": action_args[0] if action_args else ""},
+        result.get("status", "ok") if isinstance(result, dict) else "ok",
+        time.perf_counter() - start,
+        logger,
+    )
+
     # In theory, result is in JSON, but could be raw output, so lest check if this is a dict:
     if isinstance(result, dict):
         status = result.get("status", "ok")
@@ -0,0 +1,176 @@
+# common/completion.py
+#
+# Shell completion for the Overlord CLI.
+#
+# Candidates come from a small name index in <working_folder>/completion,
+# plain sorted text files read by the shell function directly, so that no
+# Python process and no inventory parsing happens on <TAB>:
+#
+#   hosts, groups, networks   one name per line, rewritten on each save
+#   plugins                   one "section plugin args action..." line per
+#                             plugin, rewritten when the plugins change
+#
+# args is the comma separated list of index names completing the arguments
+# following the action ("-" if none), from the plugin config.yml:
+#
+#   cli_completion: [groups, hosts]  # first argument a group, then hosts
+#
+# Usage, in ~/.bashrc or ~/.zshrc:
+#   source <(bluebanquise-overlord.py --completion bash)
+
+import os
+from typing import Any, Dict, List
+
+from common.files import write_file_atomic
+from common.inventory import register_save_hook
+
+COMPLETION_FOLDER = "completion"
+NAME_INDEXES = ("hosts", "groups", "networks")
+MAX_CANDIDATES = 1000
+
+
+def completion_folder(working_folder: str) -> str:
+    return os.path.join(os.path.abspath(working_folder), COMPLETION_FOLDER)
+
+
+def write_name_index(inventory) -> List[str]:
+    """
+    Write hosts, groups and networks indexes of inventory. Returns the
+    indexes actually rewritten.
+    """
+    group_all = inventory.groups.get("all") or {}
+    networks = ((group_all.get("vars") or {}).get("networks") or {}).get("networks") or {}
+    names = {
+        "hosts": inventory.hosts,
+        "groups": inventory.groups,
+        "networks": networks,
+    }
+    folder = completion_folder(inventory.working_folder)
+    written = []
+    for index in NAME_INDEXES:
+        # Sorted by code point, which is byte order, as look(1) expects
+        content = "".join(f"{name}\n" for name in sorted(names[index]))
+        if write_file_atomic(os.path.join(folder, index), content):
+            written.append(index)
+    return written
+
+
+def write_plugin_index(working_folder: str, plugins: List[Dict[str, Any]]) -> bool:
+    """
+    Write plugins index from manifest entries. Cheap when nothing changed:
+    the file is only read and compared.
+    """
+    lines = []
+    for entry in sorted(plugins, key=lambda e: (e["section"], e["plugin"])):
+        if not entry["main"]:
+            continue
+        args = [name for name in (entry["config"].get("cli_completion") or []) if name in NAME_INDEXES]
+        actions = entry.get("actions") or []
+        lines.append(" ".join([entry["section"], entry["plugin"], ",".join(args) or "-"] + actions))
+    content = "".join(f"{line}\n" for line in lines)
+    return write_file_atomic(os.path.join(completion_folder(working_folder), "plugins"), content)
+
+
+def name_index_exists(working_folder: str) -> bool:
+    folder = completion_folder(working_folder)
+    return all(os.path.isfile(os.path.join(folder, index)) for index in NAME_INDEXES)
+
+
+_REGISTERED = False
+
+
+def register_completion_index(logger=None) -> None:
+    """
+    Keep the name index up to date after each inventory save of this
+    process. Failures are logged, they never fail a save.
+    """
+    global _REGISTERED
+    if _REGISTERED:
+        return
+    def hook(inventory):
+        try:
+            write_name_index(inventory)
+        except OSError as e:
+            if logger:
+                logger.warning("Failed to update completion index: %s", e)
+
+    register_save_hook(hook)
+    _REGISTERED = True
+
+
+# Shell function, @INDEX@ is replaced by the completion folder. Positional
+# words are counted skipping global options (and -i/-w values), then:
+#   SECTION PLUGIN ACTION ARG...
+# Name candidates are looked up by prefix with look(1), a binary search in
+# the sorted index, falling back to awk if look is not installed, and
+# capped to MAX_CANDIDATES: nobody browses 50k host names, the prefix is
+# refined instead.
+BASH_SCRIPT = r"""# BlueBanquise Overlord CLI completion
+_bluebanquise_overlord_names() {
+    local file="@INDEX@/$1"
+    [[ -f "$file" ]] || return
+    if command -v look >/dev/null 2>&1; then
+        look -- "$2" "$file" | head -n @MAX@
+    else
+        # Index is sorted: stop at the end of the matching run
+        awk -v p="$2" -v max=@MAX@ 'index($0, p) == 1 {print; if (++n >= max) exit; next} n {exit}' "$file"
+    fi
+}
+
+_bluebanquise_overlord() {
+    local cur="${COMP_WORDS[COMP_CWORD]}" index="@INDEX@"
+    local -a words=()
+    local i line
+    COMPREPLY=()
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        case "${COMP_WORDS[i]}" in
+            -i|--inventory|-w|--working-folder) ((i++)) ;;
+            -*) ;;
+            *) words+=("${COMP_WORDS[i]}") ;;
+        esac
+    done
+    if [[ "$cur" == -* ]]; then
+        COMPREPLY=($(compgen -W "--json --yaml --diff --check --debug --help --inventory --working-folder" -- "$cur"))
+        return
+    fi
+    [[ -f "$index/plugins" ]] || return
+    case ${#words[@]} in
+        0)
+            COMPREPLY=($(compgen -W "$(awk '{print $1}' "$index/plugins" | uniq)" -- "$cur")) ;;
+        1)
+            COMPREPLY=($(compgen -W "$(awk -v s="${words[0]}" '$1 == s {print $2}' "$index/plugins")" -- "$cur")) ;;
+        *)
+            line=$(awk -v s="${words[0]}" -v p="${words[1]}" '$1 == s && $2 == p' "$index/plugins")
+            [[ -n "$line" ]] || return
+            local -a fields=($line)
+            if ((${#words[@]} == 2)); then
+                COMPREPLY=($(compgen -W "${fields[*]:3}" -- "$cur"))
+                return
+            fi
+            [[ "${fields[2]}" != "-" ]] || return
+            local -a args=(${fields[2]//,/ })
+            local position=$((${#words[@]} - 3))
+            ((position < ${#args[@]})) || position=$((${#args[@]} - 1))
+            local IFS=$'\n'
+            COMPREPLY=($(_bluebanquise_overlord_names "${args[position]}" "$cur"))
+            ;;
+    esac
+}
+"""
+
+BASH_REGISTER = "complete -F _bluebanquise_overlord bluebanquise-overlord.py ./bluebanquise-overlord.py\n"
+
+ZSH_HEADER = "autoload -U +X compinit && compinit\nautoload -U +X bashcompinit && bashcompinit\n"
+
+
+def completion_script(shell: str, working_folder: str) -> str:
+    """
+    Completion script for shell (bash or zsh, through bashcompinit).
+    """
+    if shell not in ("bash", "zsh"):
+        raise ValueError(f"Unsupported shell {shell}, use bash or zsh")
+    script = BASH_SCRIPT.replace("@INDEX@", completion_folder(working_folder))
+    script = script.replace("@MAX@", str(MAX_CANDIDATES)) + BASH_REGISTER
+    if shell == "zsh":
+        script = ZSH_HEADER + script
+    return script
@@ -0,0 +1,177 @@
+# common/events.py
+
+import fcntl
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+EVENTS_FILE = "events.jsonl"
+
+
+class EventJournal:
+    """
+    Append-only journal of inventory and health change events.
+
+    The journal lives under working_folder so that every process working on
+    the same inventory (CLI, UI/API workers) shares it: a host added from the
+    CLI shows up in every browser listening on /api/v1/events.
+
+    Each event is a JSON line. Its id is "<inode>:<offset>", offset being the
+    position right after the line in the journal, so resuming from a
+    Last-Event-ID is a simple seek, and a rotated journal is detected by its
+    inode change.
+    """
+
+    def __init__(self, working_folder: str, max_size: int = 1024 * 1024):
+        self.working_folder = os.path.abspath(working_folder)
+        self.path = os.path.join(self.working_folder, EVENTS_FILE)
+        self.lock_path = self.path + ".lock"
+        self.max_size = max_size
+
+    # -------------------------
+    # Writing
+    # -------------------------
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        self.publish_many([(event_type, data)])
+
+    def publish_many(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        if not events:
+            return
+        os.makedirs(self.working_folder, exist_ok=True)
+        lines = []
+        now = time.time()
+        for event_type, data in events:
+            lines.append(json.dumps({"type": event_type, "time": now, "data": data}))
+        content = ("\n".join(lines) + "\n").encode("utf-8")
+
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Rotate when too big, readers will notice the inode change
+                if os.path.isfile(self.path) and os.path.getsize(self.path) > self.max_size:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "ab") as f:
+                    f.write(content)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # -------------------------
+    # Reading
+    # -------------------------
+
+    def position(self) -> Tuple[int, int]:
+        """
+        Return current (inode, offset) of the end of the journal.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_ino, st.st_size)
+
+    def read(self, position: Tuple[int, int]) -> Tuple[List[Dict[str, Any]], Tuple[int, int]]:
+        """
+        Return events written after position, and the new position.
+        """
+        inode, offset = position
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return [], (0, 0)
+
+        events = []
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != inode or st.st_size < offset:
+                # Journal was rotated (or recreated), restart from its beginning
+                inode, offset = st.st_ino, 0
+            if st.st_size == offset:
+                return [], (inode, offset)
+
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial write, will be read next time
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    offset += len(line)
+                    continue
+                offset += len(line)
+                event["id"] = f"{inode}:{offset}"
+                events.append(event)
+
+        return events, (inode, offset)
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Convert an SSE Last-Event-ID into a journal position.
+    """
+    if not event_id:
+        return None
+    try:
+        inode, offset = event_id.split(":", 1)
+        return (int(inode), int(offset))
+    except ValueError:
+        return None
+
+
+def sse_stream(
+    journal: EventJournal,
+    last_event_id: Optional[str] = None,
+    types: Optional[List[str]] = None,
+    pollers: Optional[List] = None,
+    poll_interval: float = 1.0,
+    heartbeat: float = 15.0,
+    max_duration: float = 0,
+) -> Iterator[str]:
+    """
+    Generator producing Server-Sent Events from the journal.
+
+    types: optional list of event type prefixes to forward (e.g. ["host.", "group."])
+    pollers: optional list of callables(journal), called each poll, allowing
+             other layers (health) to detect changes and publish events.
+    max_duration: if set, seconds after which the stream ends. Browsers
+             reconnect on their own, from the last position sent, so a
+             stream does not hold a server thread forever.
+    """
+    position = parse_event_id(last_event_id)
+    if position is None:
+        position = journal.position()
+
+    # Tell the browser how long to wait before reconnecting
+    yield "retry: 3000\n\n"
+
+    last_sent = started = time.time()
+    while not max_duration or time.time() - started < max_duration:
+        for poller in pollers or []:
+            try:
+                poller(journal)
+            except Exception:
+                pass
+
+        events, position = journal.read(position)
+        for event in events:
+            if types and not any(event["type"].startswith(t) for t in types):
+                continue
+            yield (
+                f"id: {event['id']}\n"
+                f"event: {event['type']}\n"
+                f"data: {json.dumps(event['data'])}\n\n"
+            )
+            last_sent = time.time()
+
+        if time.time() - last_sent >= heartbeat:
+            # SSE comment, keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            last_sent = time.time()
+
+        time.sleep(poll_interval)
+
+    # Id without data: sets the browser Last-Event-ID to where we stopped,
+    # filtered out events included, so nothing is missed on reconnect
+    yield f"id: {position[0]}:{position[1]}\n\n"
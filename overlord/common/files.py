@@ -1,7 +1,8 @@
 import yaml
 import configparser
 import os
-from typing import Any, Dict, List, Tuple
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 def load_yaml_file(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
@@ -21,7 +22,62 @@ def load_ini_file(path: str) -> configparser.ConfigParser:
         parser.read_file(f)
     return parser
 
+def write_file_atomic(path: str, content: str) -> bool:
+    """
+    Write content to path through a temporary file and a rename, so readers
+    never see a partial file. Returns False (and writes nothing) if the file
+    already has this content.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     if not os.path.isfile(config_path):
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
-    return load_yaml_file(config_path)
\ No newline at end of file
+    return load_yaml_file(config_path)
+
+
+def follow_file(
+    path: str,
+    is_finished: Callable[[], bool],
+    poll_interval: float = 0.5,
+    offset: int = 0,
+    max_duration: float = 0,
+) -> Iterator[str]:
+    """
+    Yield lines appended to a text file, like tail -f, until is_finished()
+    returns True and the file was fully read. Only complete lines are
+    yielded, and the file is never loaded in memory.
+
+    Reading starts at byte offset. If max_duration is set, following stops
+    after that many seconds even if not finished, so that a stream does
+    not hold a server thread for a whole job: clients resume with offset
+    set to the number of bytes received.
+    """
+    position = offset
+    started = time.time()
+    while True:
+        finished = is_finished()
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                f.seek(position)
+                while True:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    position = f.tell()
+                    yield line.decode("utf-8", errors="replace")
+        if finished or (max_duration and time.time() - started >= max_duration):
+            return
+        time.sleep(poll_interval)
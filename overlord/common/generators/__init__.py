@@ -0,0 +1,81 @@
+# common/generators/__init__.py
+#
+# Configuration files rendered from the inventory model (hosts file, DNS
+# zones...). Each generator is incremental, see base.Generator.
+#
+# Configuration, in bluebanquise-overlord.yml:
+#
+#   generators:
+#     on_save: [hosts, dns, clustershell]  # run after each inventory save
+#     domain_name: cluster.local  # top level keys are shared by all generators
+#     dns:                      # per generator keys
+#       output_folder: /var/named/overlord
+#       reload_command: rndc reload
+
+from typing import Any, Dict, List, Optional
+
+from common.errors import NotFoundError
+from common.generators.base import Generator
+from common.generators.boot import BootGenerator
+from common.generators.clustershell import ClusterShellGenerator
+from common.generators.hosts import DnsGenerator, HostsGenerator
+from common.inventory import register_save_hook
+
+GENERATORS = {
+    HostsGenerator.name: HostsGenerator,
+    DnsGenerator.name: DnsGenerator,
+    ClusterShellGenerator.name: ClusterShellGenerator,
+    BootGenerator.name: BootGenerator,
+}
+
+
+def generator_settings(config: Dict[str, Any], name: str) -> Dict[str, Any]:
+    generators_cfg = config.get("generators") or {}
+    settings = {
+        key: value for key, value in generators_cfg.items()
+        if key != "on_save" and not isinstance(value, dict)
+    }
+    settings.update(generators_cfg.get(name) or {})
+    return settings
+
+
+def get_generator(config: Dict[str, Any], name: str, logger=None) -> Generator:
+    if name not in GENERATORS:
+        raise NotFoundError(f"Generator {name} not found, available: {', '.join(sorted(GENERATORS))}")
+    return GENERATORS[name](config["working_folder"], generator_settings(config, name), logger)
+
+
+def run_generators(
+    inventory, config: Dict[str, Any], names: Optional[List[str]] = None, force: bool = False, logger=None
+) -> List[Dict[str, Any]]:
+    generators = [get_generator(config, name, logger) for name in (names or sorted(GENERATORS))]
+    return [generator.run(inventory, force=force) for generator in generators]
+
+
+_REGISTERED = False
+
+
+def register_generators(config: Dict[str, Any], logger=None) -> None:
+    """
+    Run generators listed in generators.on_save after each inventory save
+    of this process. Failures are logged, they never fail a save.
+    """
+    global _REGISTERED
+    names = (config.get("generators") or {}).get("on_save") or []
+    if _REGISTERED or not names:
+        return
+    for name in names:
+        if name not in GENERATORS and logger:
+            logger.warning("Unknown generator %s in generators.on_save", name)
+    names = [name for name in names if name in GENERATORS]
+
+    def hook(inventory):
+        for name in names:
+            try:
+                get_generator(config, name, logger).run(inventory)
+            except Exception:
+                if logger:
+                    logger.exception("Generator %s failed after inventory save", name)
+
+    register_save_hook(hook)
+    _REGISTERED = True
@@ -0,0 +1,214 @@
+# common/generators/base.py
+
+import fcntl
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+from common.files import write_file_atomic
+
+GENERATED_HEADER = "Generated by BlueBanquise Overlord from inventory, do not edit"
+
+
+def data_hash(data: Any) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Generator:
+    """
+    Incremental renderer of configuration files from the inventory model.
+
+    Rendering is split in two steps:
+      - render_host(): per host fragment, cached under
+        <working_folder>/generators/<name>/state.json together with a hash
+        of the host data it was rendered from. Only hosts whose data (or
+        the shared context) changed are rendered again.
+      - render_files(): assemble fragments into output files. Gets the set
+        of changed hosts, so that it can skip files they do not touch by
+        returning None for them ("keep as is").
+
+    Output files are written atomically and only if their content changed.
+    Files generated by a previous run and not produced anymore are removed.
+    If anything changed on disk, settings reload_command is run.
+    """
+
+    name = ""
+    description = ""
+
+    def __init__(self, working_folder: str, settings: Optional[Dict[str, Any]] = None, logger=None):
+        self.settings = settings or {}
+        self.logger = logger
+        working_folder = os.path.abspath(working_folder)
+        self.state_dir = os.path.join(working_folder, "generators", self.name)
+        self.state_path = os.path.join(self.state_dir, "state.json")
+        self.output_folder = os.path.abspath(
+            self.settings.get("output_folder") or os.path.join(working_folder, "generated", self.name)
+        )
+
+    # -------------------------
+    # To be implemented by generators
+    # -------------------------
+
+    def context(self, inventory) -> Dict[str, Any]:
+        """
+        Data shared by all hosts (networks, settings...). Any change of it
+        renders every host again.
+        """
+        return {}
+
+    def host_inputs(self, inventory, hostname: str, context: Dict[str, Any]) -> Any:
+        """
+        Host data the fragment depends on.
+        """
+        return inventory.hosts.get(hostname)
+
+    def render_host(self, hostname: str, inputs: Any, context: Dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    def render_files(
+        self,
+        fragments: Dict[str, Any],
+        changed: Dict[str, Any],
+        context: Dict[str, Any],
+        state: Dict[str, Any],
+        full: bool,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Return {relative path: content} of output files. None as content
+        means the file is not affected by this run and kept as is.
+
+        changed maps each added, updated or removed host to its previous
+        fragment (None if new). full is True when everything must be
+        rendered (first run, context change, missing output file).
+        state is the generator state dict, a place to keep extra data
+        (serials...) across runs.
+        """
+        raise NotImplementedError
+
+    def after_write(self, written: List[str], removed: List[str], report: Dict[str, Any]) -> None:
+        """
+        Called when output files changed on disk. Runs reload_command.
+        """
+        command = self.settings.get("reload_command")
+        if not command:
+            return
+        try:
+            result = subprocess.run(
+                shlex.split(command), capture_output=True, text=True,
+                timeout=int(self.settings.get("reload_timeout", 60)),
+            )
+            report["reload"] = {"command": command, "returncode": result.returncode}
+            if result.returncode != 0:
+                report["reload"]["stderr"] = result.stderr.strip()[-2000:]
+                if self.logger:
+                    self.logger.warning("Generator %s reload failed: %s", self.name, result.stderr.strip())
+        except (OSError, subprocess.TimeoutExpired) as e:
+            report["reload"] = {"command": command, "error": str(e)}
+            if self.logger:
+                self.logger.warning("Generator %s reload failed: %s", self.name, e)
+
+    # -------------------------
+    # State
+    # -------------------------
+
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        state.setdefault("context", None)
+        state.setdefault("hosts", {})
+        state.setdefault("files", {})
+        return state
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        write_file_atomic(self.state_path, json.dumps(state, separators=(",", ":")))
+
+    def last_report(self) -> Optional[Dict[str, Any]]:
+        return self.load_state().get("report")
+
+    # -------------------------
+    # Run
+    # -------------------------
+
+    def run(self, inventory, force: bool = False) -> Dict[str, Any]:
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(os.path.join(self.state_dir, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._run(inventory, force)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _run(self, inventory, force: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        state = self.load_state()
+        context = self.context(inventory)
+        context_hash = data_hash(context)
+        full = force or state["context"] != context_hash or any(
+            not os.path.isfile(os.path.join(self.output_folder, path)) for path in state["files"]
+        )
+
+        cached = state["hosts"]
+        hosts: Dict[str, List[Any]] = {}
+        changed: Dict[str, Any] = {}
+        for hostname in sorted(inventory.hosts):
+            inputs = self.host_inputs(inventory, hostname, context)
+            key = data_hash([context_hash, inputs])
+            entry = cached.get(hostname)
+            if entry is not None and entry[0] == key:
+                hosts[hostname] = entry
+                continue
+            hosts[hostname] = [key, self.render_host(hostname, inputs, context)]
+            changed[hostname] = entry[1] if entry is not None else None
+        for hostname in set(cached) - set(hosts):
+            changed[hostname] = cached[hostname][1]
+
+        report = {
+            "generator": self.name,
+            "output_folder": self.output_folder,
+            "hosts": len(hosts),
+            "changed_hosts": len(changed),
+            "full": full,
+            "written": [],
+            "removed": [],
+            "unchanged": 0,
+        }
+
+        if full or changed:
+            fragments = {hostname: entry[1] for hostname, entry in hosts.items()}
+            files = self.render_files(fragments, changed, context, state, full)
+            for path, content in sorted(files.items()):
+                if content is None:
+                    continue
+                if write_file_atomic(os.path.join(self.output_folder, path), content):
+                    report["written"].append(path)
+                state["files"][path] = True
+            for path in sorted(set(state["files"]) - set(files)):
+                full_path = os.path.join(self.output_folder, path)
+                if os.path.isfile(full_path):
+                    os.remove(full_path)
+                report["removed"].append(path)
+                del state["files"][path]
+        report["unchanged"] = len(state["files"]) - len(report["written"])
+
+        if report["written"] or report["removed"]:
+            self.after_write(report["written"], report["removed"], report)
+
+        report["duration"] = round(time.perf_counter() - start, 3)
+        report["finished"] = time.time()
+        state["context"] = context_hash
+        state["hosts"] = hosts
+        state["report"] = report
+        self.save_state(state)
+        if self.logger:
+            self.logger.debug(
+                "Generator %s: %d/%d hosts rendered, %d file(s) written, %d removed",
+                self.name, len(changed), len(hosts), len(report["written"]), len(report["removed"]),
+            )
+        return report
@@ -0,0 +1,143 @@
+# common/generators/boot.py
+
+from typing import Any, Dict, List, Optional
+
+from common.generators.base import GENERATED_HEADER, Generator
+from common.generators.hosts import valid_ip
+
+# iPXE variables set from the os_ group vars of the host, name: dotted path
+DEFAULT_IPXE_VARIABLES = {
+    "distribution": "os_operating_system.distribution",
+    "distribution_version": "os_operating_system.distribution_version",
+    "distribution_major_version": "os_operating_system.distribution_major_version",
+    "kernel_parameters": "os_kernel_parameters",
+}
+DEFAULT_CHAIN_URL = "http://${next-server}/pxe/equipment_profiles/${equipment_profile}.ipxe"
+
+
+def deep_get(data: Dict[str, Any], path: str) -> Any:
+    for key in path.split("."):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+class BootGenerator(Generator):
+    """
+    ISC DHCP host entries, one include file per network, and per node
+    iPXE files setting the node boot variables from its os_ group vars.
+
+    Only DHCP files of networks holding changed hosts, and iPXE files of
+    changed hosts, are rendered again. reload_command (DHCP server) is run
+    only when a DHCP file actually changed on disk, not for iPXE changes.
+    """
+
+    name = "boot"
+    description = "ISC DHCP host entries and per node iPXE files"
+
+    def context(self, inventory) -> Dict[str, Any]:
+        # Host -> os_ group, and os_ groups vars (plugin files merged in name
+        # order), used by host_inputs(), not part of context hash.
+        self.os_groups: Dict[str, str] = {}
+        self.os_vars: Dict[str, Dict[str, Any]] = {}
+        for group_name, group in sorted(inventory.groups.items()):
+            if not group_name.startswith("os_"):
+                continue
+            merged: Dict[str, Any] = {}
+            for _, plugin_vars in sorted((group.get("vars") or {}).items()):
+                if isinstance(plugin_vars, dict):
+                    merged.update(plugin_vars)
+            self.os_vars[group_name] = merged
+            for hostname in group.get("hosts") or []:
+                self.os_groups.setdefault(hostname, group_name)
+        return {
+            "ipxe_variables": self.settings.get("ipxe_variables") or DEFAULT_IPXE_VARIABLES,
+            "chain_url": self.settings.get("chain_url", DEFAULT_CHAIN_URL),
+            "domain_name": self.settings.get("domain_name"),
+        }
+
+    def host_inputs(self, inventory, hostname, context):
+        host = inventory.hosts.get(hostname) or {}
+        os_group = self.os_groups.get(hostname)
+        return {
+            "network_interfaces": host.get("network_interfaces") or [],
+            "os_group": os_group,
+            "os_vars": {name: deep_get(self.os_vars.get(os_group) or {}, path)
+                        for name, path in context["ipxe_variables"].items()},
+        }
+
+    def render_host(self, hostname, inputs, context) -> Dict[str, Any]:
+        """
+        {"dhcp": {network: stanza}, "ipxe": content or None}
+        """
+        dhcp: Dict[str, str] = {}
+        boot_nic: Optional[Dict[str, Any]] = None
+        for nic in inputs["network_interfaces"]:
+            if not isinstance(nic, dict) or not nic.get("mac"):
+                continue
+            ip = valid_ip(nic.get("ip4"))
+            if ip is None:
+                continue
+            network = nic.get("network") or "default"
+            interface = nic.get("interface") or str(len(dhcp))
+            options = [
+                f"host {hostname}-{interface} {{",
+                f"  hardware ethernet {str(nic['mac']).lower()};",
+                f"  fixed-address {ip};",
+                f'  option host-name "{hostname}";',
+            ]
+            if context["domain_name"]:
+                options.append(f'  option domain-name "{context["domain_name"]}";')
+            options.append("}")
+            dhcp[network] = dhcp.get(network, "") + "\n".join(options) + "\n"
+            if boot_nic is None:
+                boot_nic = dict(nic, ip4=ip)
+
+        ipxe = None
+        if boot_nic is not None:
+            lines = [
+                "#!ipxe",
+                f"# {GENERATED_HEADER}",
+                f"set hostname {hostname}",
+                f"set node-mac {str(boot_nic['mac']).lower()}",
+                f"set node-ip {boot_nic['ip4']}",
+                f"set node-network {boot_nic.get('network') or ''}",
+                f"set equipment_profile {inputs['os_group'] or ''}",
+            ]
+            for name, value in sorted(inputs["os_vars"].items()):
+                if value is not None:
+                    lines.append(f"set {name} {value}")
+            lines.append(f"chain {context['chain_url']}")
+            ipxe = "\n".join(lines) + "\n"
+        return {"dhcp": dhcp, "ipxe": ipxe}
+
+    def render_files(self, fragments, changed, context, state, full):
+        files: Dict[str, Optional[str]] = {}
+        networks = sorted({network for fragment in fragments.values() for network in fragment["dhcp"]})
+        affected = set(networks) if full else set()
+        for hostname, previous in changed.items():
+            for fragment in (previous, fragments.get(hostname)):
+                if fragment is not None:
+                    affected.update(fragment["dhcp"])
+
+        for network in networks:
+            path = f"dhcpd.{network}.conf"
+            if network not in affected:
+                files[path] = None
+                continue
+            stanzas = [fragments[h]["dhcp"][network] for h in sorted(fragments) if network in fragments[h]["dhcp"]]
+            files[path] = f"# {GENERATED_HEADER}\n\n" + "\n".join(stanzas)
+
+        includes = [f"# {GENERATED_HEADER}"]
+        includes += [f'include "{self.output_folder}/dhcpd.{network}.conf";' for network in networks]
+        files["dhcpd.hosts.conf"] = "\n".join(includes) + "\n"
+
+        for hostname, fragment in fragments.items():
+            if fragment["ipxe"] is not None:
+                files[f"nodes/{hostname}.ipxe"] = fragment["ipxe"] if full or hostname in changed else None
+        return files
+
+    def after_write(self, written: List[str], removed: List[str], report: Dict[str, Any]) -> None:
+        if any(path.startswith("dhcpd.") for path in written + removed):
+            super().after_write(written, removed, report)
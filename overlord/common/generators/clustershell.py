@@ -0,0 +1,146 @@
+# common/generators/clustershell.py
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+import yaml
+
+from common.generators.base import GENERATED_HEADER, Generator
+
+NODE_INDEX_RE = re.compile(r"^(?P<prefix>.*?)(?P<index>\d+)(?P<suffix>\D*)$")
+
+
+def _ranges(indexes: List[int], width: int) -> str:
+    output = []
+    start = previous = indexes[0]
+    for index in indexes[1:] + [None]:
+        if index is not None and index == previous + 1:
+            previous = index
+            continue
+        if start == previous:
+            output.append(str(start).zfill(width))
+        else:
+            output.append(f"{str(start).zfill(width)}-{str(previous).zfill(width)}")
+        if index is not None:
+            start = previous = index
+    return ",".join(output)
+
+
+def fold_nodes(names: Iterable[str]) -> str:
+    """
+    Fold node names into a ClusterShell/genders node set string,
+    on the last number of names: c001,c002,c003,c007,m1 -> c[001-003,007],m1
+
+    Zero padding is kept, c099 and c100 fold into c[099-100].
+    """
+    names = set(names)
+    plain: List[str] = []
+    numbered: Dict[Tuple[str, str], List[str]] = {}
+    for name in names:
+        match = NODE_INDEX_RE.match(name)
+        if match:
+            numbered.setdefault((match.group("prefix"), match.group("suffix")), []).append(match.group("index"))
+        else:
+            plain.append(name)
+
+    parts: List[Tuple[Tuple[str, str, int], str]] = [((name, "", -1), name) for name in plain]
+    for (prefix, suffix), indexes in numbered.items():
+        # Padded indexes fold with unpadded ones of the same length
+        widths = {len(i) for i in indexes if len(i) > 1 and i.startswith("0")}
+        by_width: Dict[int, List[int]] = {}
+        for index in indexes:
+            width = len(index) if len(index) in widths else 0
+            by_width.setdefault(width, []).append(int(index))
+        for width, values in by_width.items():
+            values = sorted(set(values))
+            if len(values) == 1:
+                name = f"{prefix}{str(values[0]).zfill(width)}{suffix}"
+            else:
+                name = f"{prefix}[{_ranges(values, width)}]{suffix}"
+            parts.append(((prefix, suffix, values[0]), name))
+    return ",".join(name for _, name in sorted(parts))
+
+
+class ClusterShellGenerator(Generator):
+    """
+    Inventory groups (fn_, os_, hw_, rack_ and custom ones) as a ClusterShell
+    groups YAML file, to be referenced from groups.conf.d, and as a genders
+    file, host lists being folded into node sets.
+
+    Per host fragment is the sorted list of groups of the host, and only
+    groups (and genders lines) of changed hosts are folded again.
+    """
+
+    name = "clustershell"
+    description = "ClusterShell groups YAML and genders files from inventory groups"
+
+    def context(self, inventory) -> Dict[str, Any]:
+        excluded = set(self.settings.get("exclude_groups") or [])
+        # Host -> groups index, used by host_inputs(), not part of context hash:
+        # membership changes are per host changes.
+        self.memberships: Dict[str, List[str]] = {}
+        groups = []
+        for group_name, group in sorted(inventory.groups.items()):
+            if group_name == "all" or group_name in excluded:
+                continue
+            groups.append(group_name)
+            for hostname in group.get("hosts") or []:
+                self.memberships.setdefault(hostname, []).append(group_name)
+        return {
+            "groups": groups,
+            "source": self.settings.get("source_name", "bluebanquise"),
+            "groups_file": self.settings.get("groups_file", "bluebanquise.yaml"),
+            "genders_file": self.settings.get("genders_file", "genders"),
+        }
+
+    def host_inputs(self, inventory, hostname, context):
+        return self.memberships.get(hostname, [])
+
+    def render_host(self, hostname, inputs, context) -> List[str]:
+        return sorted(inputs)
+
+    def render_files(self, fragments, changed, context, state, full):
+        folded: Dict[str, str] = {} if full else state.get("folded", {})
+        genders: Dict[str, str] = {} if full else state.get("genders", {})
+
+        # Groups and genders attribute sets touched by changed hosts
+        groups = set(context["groups"]) if full else set()
+        attributes = set()
+        for hostname, previous in changed.items():
+            for fragment in (previous, fragments.get(hostname)):
+                if fragment is not None:
+                    groups.update(fragment)
+                    attributes.add(",".join(fragment))
+
+        members: Dict[str, List[str]] = {group: [] for group in groups}
+        attribute_hosts: Dict[str, List[str]] = {key: [] for key in attributes}
+        for hostname, fragment in fragments.items():
+            for group in fragment:
+                if group in members:
+                    members[group].append(hostname)
+            key = ",".join(fragment)
+            if full or key in attribute_hosts:
+                attribute_hosts.setdefault(key, []).append(hostname)
+
+        for group, hostnames in members.items():
+            folded[group] = fold_nodes(hostnames)
+        for key, hostnames in attribute_hosts.items():
+            if hostnames:
+                genders[key] = fold_nodes(hostnames)
+            else:
+                genders.pop(key, None)
+        folded = {group: folded.get(group, "") for group in context["groups"]}
+        state["folded"] = folded
+        state["genders"] = genders
+
+        groups_yaml = {context["source"]: dict(folded, all=fold_nodes(fragments))}
+        groups_content = f"# {GENERATED_HEADER}\n" + yaml.safe_dump(groups_yaml, default_flow_style=False, width=1 << 20)
+
+        lines = [f"# {GENERATED_HEADER}"]
+        for key, nodes in sorted(genders.items(), key=lambda item: item[1]):
+            # Hosts in no group are still listed, so that genders knows them
+            lines.append(f"{nodes} {key}".rstrip())
+        return {
+            context["groups_file"]: groups_content,
+            context["genders_file"]: "\n".join(lines) + "\n",
+        }
@@ -0,0 +1,256 @@
+# common/generators/hosts.py
+
+import ipaddress
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.generators.base import GENERATED_HEADER, Generator, data_hash
+
+LOCALHOST_LINES = [
+    "127.0.0.1   localhost localhost.localdomain localhost4 localhost4.localdomain4",
+    "::1         localhost localhost.localdomain localhost6 localhost6.localdomain6",
+]
+
+
+def inventory_networks(inventory) -> Dict[str, Dict[str, Any]]:
+    """
+    Networks defined in group_vars/all/networks.yml.
+    """
+    group = inventory.get_group("all") or {}
+    networks = (group.get("vars") or {}).get("networks") or {}
+    return networks.get("networks") or {}
+
+
+def host_inputs(inventory, hostname: str) -> Dict[str, Any]:
+    """
+    Part of a host the name resolution depends on.
+    """
+    host = inventory.hosts.get(hostname) or {}
+    return {
+        "alias": host.get("alias"),
+        "network_interfaces": host.get("network_interfaces") or [],
+        "bmc": host.get("bmc") or {},
+    }
+
+
+def valid_ip(value: Any) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def host_addresses(hostname: str, inputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Addresses of a host, BlueBanquise way:
+      - first interface is the resolution interface, it carries the
+        hostname, hostname-<network> and the alias
+      - other interfaces carry hostname-<network>
+      - bmc carries its own name
+    Entries without a valid ip4 are skipped.
+    """
+    addresses = []
+    interfaces = [nic for nic in inputs["network_interfaces"] if isinstance(nic, dict)]
+    for index, nic in enumerate(interfaces):
+        ip = valid_ip(nic.get("ip4"))
+        if ip is None:
+            continue
+        names = []
+        if index == 0:
+            names.append(hostname)
+        if nic.get("network"):
+            names.append(f"{hostname}-{nic['network']}")
+        if not names:
+            continue
+        alias = inputs["alias"] if index == 0 and inputs["alias"] else None
+        addresses.append({"ip": ip, "names": names, "alias": alias, "network": nic.get("network")})
+    bmc = inputs["bmc"]
+    if isinstance(bmc, dict) and bmc.get("name"):
+        ip = valid_ip(bmc.get("ip4"))
+        if ip is not None:
+            addresses.append({"ip": ip, "names": [bmc["name"]], "alias": None, "network": bmc.get("network")})
+    return addresses
+
+
+class HostsGenerator(Generator):
+    """
+    /etc/hosts file of the cluster.
+    """
+
+    name = "hosts"
+    description = "/etc/hosts file from host interfaces, bmc and alias"
+
+    def context(self, inventory) -> Dict[str, Any]:
+        return {
+            "domain_name": self.settings.get("domain_name"),
+            "file_name": self.settings.get("file_name", "hosts"),
+        }
+
+    def host_inputs(self, inventory, hostname, context):
+        return host_inputs(inventory, hostname)
+
+    def render_host(self, hostname, inputs, context) -> List[str]:
+        lines = []
+        domain = context["domain_name"]
+        for address in host_addresses(hostname, inputs):
+            names = [address["names"][0]]
+            if domain:
+                names.append(f"{address['names'][0]}.{domain}")
+            names.extend(address["names"][1:])
+            if address["alias"]:
+                names.append(str(address["alias"]))
+            lines.append(f"{address['ip']:<15} {' '.join(names)}")
+        return lines
+
+    def render_files(self, fragments, changed, context, state, full):
+        # A single file, any change rewrites it. Fragments are cached, so
+        # this is a join, not a render.
+        lines = [f"# {GENERATED_HEADER}"] + LOCALHOST_LINES + [""]
+        for hostname in sorted(fragments):
+            lines.extend(fragments[hostname])
+        return {context["file_name"]: "\n".join(lines) + "\n"}
+
+
+def reverse_origin(network: ipaddress.IPv4Network) -> Tuple[str, int]:
+    """
+    Reverse zone name of a network and its number of octets, zones being
+    cut on octet boundaries (a /20 goes to the /16 zone).
+    """
+    octets = min(3, max(1, network.prefixlen // 8))
+    parts = str(network.network_address).split(".")[:octets]
+    return ".".join(reversed(parts)) + ".in-addr.arpa", octets
+
+
+class DnsGenerator(Generator):
+    """
+    DNS forward zone of the cluster domain, and reverse zones of the
+    networks of group_vars/all/networks.yml, in BIND zone file format.
+
+    Each zone keeps its SOA serial (YYYYMMDDnn) in generator state, bumped
+    only when zone records change, and only zones holding records of
+    changed hosts are assembled again.
+    """
+
+    name = "dns"
+    description = "DNS forward and reverse zones from host interfaces and networks"
+
+    def context(self, inventory) -> Dict[str, Any]:
+        networks = {}
+        for name, network in sorted(inventory_networks(inventory).items()):
+            if not isinstance(network, dict) or not network.get("subnet") or not network.get("prefix"):
+                continue
+            try:
+                subnet = ipaddress.ip_network(f"{network['subnet']}/{network['prefix']}", strict=False)
+            except ValueError:
+                if self.logger:
+                    self.logger.warning("DNS generator: skipping network %s, invalid subnet/prefix", name)
+                continue
+            if subnet.version == 4:
+                networks[name] = str(subnet)
+        return {
+            "domain_name": self.settings.get("domain_name", "cluster.local"),
+            "nameserver": self.settings.get("nameserver", "ns"),
+            "nameserver_ip": self.settings.get("nameserver_ip"),
+            "ttl": int(self.settings.get("ttl", 86400)),
+            "networks": networks,
+        }
+
+    def host_inputs(self, inventory, hostname, context):
+        return host_inputs(inventory, hostname)
+
+    def render_host(self, hostname, inputs, context) -> Dict[str, Any]:
+        """
+        {"forward": [[name, type, value], ...], "reverse": {zone: [[name, fqdn], ...]}}
+        """
+        domain = context["domain_name"]
+        networks = sorted(
+            (ipaddress.ip_network(subnet) for subnet in context["networks"].values()),
+            key=lambda n: n.prefixlen, reverse=True,
+        )
+        forward = []
+        reverse: Dict[str, List[List[str]]] = {}
+        for address in host_addresses(hostname, inputs):
+            for name in address["names"]:
+                forward.append([name, "A", address["ip"]])
+            if address["alias"]:
+                forward.append([str(address["alias"]), "CNAME", address["names"][0]])
+            ip = ipaddress.ip_address(address["ip"])
+            # Most specific network holding this address
+            network = next((n for n in networks if ip in n), None)
+            if network is None:
+                continue
+            origin, octets = reverse_origin(network)
+            relative = ".".join(reversed(address["ip"].split(".")[octets:]))
+            reverse.setdefault(origin, []).append([relative, f"{address['names'][0]}.{domain}."])
+        return {"forward": forward, "reverse": reverse}
+
+    def zone(self, origin: str, records: List[str], context: Dict[str, Any], state: Dict[str, Any]) -> str:
+        domain = context["domain_name"]
+        body = "\n".join(records)
+        serials = state.setdefault("serials", {})
+        previous = serials.get(origin)
+        body_hash = data_hash([body, context["nameserver"], context["nameserver_ip"], context["ttl"]])
+        if previous is None or previous["hash"] != body_hash:
+            today = int(time.strftime("%Y%m%d")) * 100
+            serial = max(today, previous["serial"] + 1) if previous else today
+            serials[origin] = {"serial": serial, "hash": body_hash}
+        serial = serials[origin]["serial"]
+        nameserver = f"{context['nameserver']}.{domain}."
+        lines = [
+            f"; {GENERATED_HEADER}",
+            f"$ORIGIN {origin}.",
+            f"$TTL {context['ttl']}",
+            f"@ IN SOA {nameserver} root.{domain}. (",
+            f"    {serial} ; serial",
+            "    3600 ; refresh",
+            "    1800 ; retry",
+            "    604800 ; expire",
+            "    86400 ; minimum",
+            ")",
+            f"@ IN NS {nameserver}",
+        ]
+        return "\n".join(lines) + "\n" + body + ("\n" if body else "")
+
+    def render_files(self, fragments, changed, context, state, full):
+        domain = context["domain_name"]
+        origins = {reverse_origin(ipaddress.ip_network(subnet))[0]
+                   for subnet in context["networks"].values()}
+        if full:
+            affected = set(origins)
+        else:
+            affected = set()
+            for hostname, previous in changed.items():
+                for fragment in (previous, fragments.get(hostname)):
+                    if fragment:
+                        affected.update(fragment["reverse"])
+        files: Dict[str, Optional[str]] = {}
+
+        # Forward zone, any host change touches it
+        forward = []
+        if context["nameserver_ip"]:
+            forward.append(f"{context['nameserver']} IN A {context['nameserver_ip']}")
+        for hostname in sorted(fragments):
+            for name, record_type, value in fragments[hostname]["forward"]:
+                forward.append(f"{name} IN {record_type} {value}")
+        files[f"forward.{domain}.zone"] = self.zone(domain, forward, context, state)
+
+        # Reverse zones, only the ones holding records of changed hosts
+        for origin in sorted(origins):
+            if origin not in affected:
+                files[f"reverse.{origin}.zone"] = None
+                continue
+            records = []
+            for hostname in sorted(fragments):
+                for name, fqdn in fragments[hostname]["reverse"].get(origin, []):
+                    records.append(f"{name} IN PTR {fqdn}")
+            files[f"reverse.{origin}.zone"] = self.zone(origin, records, context, state)
+
+        # Zone declarations, to be included in named.conf
+        zones = [f"// {GENERATED_HEADER}"]
+        for origin in [domain] + sorted(origins):
+            kind = "forward" if origin == domain else "reverse"
+            zones.append(f'zone "{origin}" IN {{ type master; file "{self.output_folder}/{kind}.{origin}.zone"; }};')
+        files["zones.conf"] = "\n".join(zones) + "\n"
+
+        state["serials"] = {o: s for o, s in state.get("serials", {}).items() if o in origins or o == domain}
+        return files
@@ -0,0 +1,326 @@
+# common/history.py
+
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.errors import NotFoundError, ValidationError
+from common.merkle import bucket_of, canonical_json, diff_trees, structured_diff
+
+HISTORY_FOLDER = "history"
+
+
+class InventoryHistory:
+    """
+    Content-addressed history of the inventory files, under
+    <working_folder>/history:
+
+      objects/<xx>/<sha1>   file contents (blobs), zlib compressed, stored once
+      commits/<id>.json     one record per save: parent, time, message and
+                            tree, a {relative path: blob sha1} mapping
+      HEAD                  current commit id
+
+    Commits also reference the inventory model hash tree (common/merkle.py):
+    its nodes and leaves are stored as blobs too, named by their hash, which
+    gives structured diffs between commits without parsing inventory files.
+
+    A save only stores blobs not already known, so history grows with the
+    changes, not with the inventory size. Commit ids are the sha1 of the
+    commit record.
+    """
+
+    def __init__(self, working_folder: str):
+        self.folder = os.path.join(os.path.abspath(working_folder), HISTORY_FOLDER)
+        self.objects_dir = os.path.join(self.folder, "objects")
+        self.commits_dir = os.path.join(self.folder, "commits")
+        self.head_path = os.path.join(self.folder, "HEAD")
+
+    # -------------------------
+    # Objects
+    # -------------------------
+
+    def _write_atomic(self, path: str, content: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _object_path(self, blob: str) -> str:
+        return os.path.join(self.objects_dir, blob[:2], blob[2:])
+
+    def store_blob(self, content: bytes) -> str:
+        blob = hashlib.sha1(content).hexdigest()
+        path = self._object_path(blob)
+        if not os.path.isfile(path):
+            self._write_atomic(path, zlib.compress(content))
+        return blob
+
+    def read_blob(self, blob: str) -> bytes:
+        try:
+            with open(self._object_path(blob), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            raise NotFoundError(f"History object {blob} not found")
+
+    def snapshot_tree(self, root: str, store: bool = True) -> Dict[str, str]:
+        """
+        {relative path: blob sha1} of every file under root, storing blobs
+        not known yet if store is True.
+        """
+        tree = {}
+        root = os.path.abspath(root)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    content = f.read()
+                relpath = os.path.relpath(path, root)
+                tree[relpath] = self.store_blob(content) if store else hashlib.sha1(content).hexdigest()
+        return tree
+
+    # -------------------------
+    # Commits
+    # -------------------------
+
+    def head(self) -> Optional[str]:
+        try:
+            with open(self.head_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, commit_id: str) -> str:
+        """
+        Full commit id from an id or a unique id prefix, HEAD and HEAD~N.
+        """
+        if not commit_id:
+            raise ValidationError("No commit specified")
+        if commit_id.startswith("HEAD"):
+            current = self.head()
+            steps = commit_id[len("HEAD"):]
+            if steps and not (steps.startswith("~") and steps[1:].isdigit()):
+                raise ValidationError(f"Invalid commit reference {commit_id}")
+            for _ in range(int(steps[1:] or 0) if steps else 0):
+                current = self.get(current)["parent"] if current else None
+            if current is None:
+                raise NotFoundError(f"Commit {commit_id} not found")
+            return current
+        if not all(c in "0123456789abcdef" for c in commit_id):
+            raise NotFoundError(f"Commit {commit_id} not found")
+        if os.path.isfile(os.path.join(self.commits_dir, f"{commit_id}.json")):
+            return commit_id
+        matches = [f[:-len(".json")] for f in self._commit_files() if f.startswith(commit_id)]
+        if len(matches) > 1:
+            raise ValidationError(f"Ambiguous commit id {commit_id}")
+        if not matches:
+            raise NotFoundError(f"Commit {commit_id} not found")
+        return matches[0]
+
+    def _commit_files(self) -> List[str]:
+        try:
+            return [f for f in os.listdir(self.commits_dir) if f.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def get(self, commit_id: str) -> Dict[str, Any]:
+        commit_id = self.resolve(commit_id)
+        with open(os.path.join(self.commits_dir, f"{commit_id}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def commit(self, tree: Dict[str, str], message: str, **extra) -> Optional[str]:
+        """
+        Record tree as a new commit on top of HEAD, unless it is HEAD tree
+        already. Returns the new commit id, or None if nothing changed.
+        Caller holds the inventory lock.
+        """
+        parent = self.head()
+        if parent is not None and self.get(parent)["tree"] == tree:
+            return None
+        record = {"parent": parent, "time": time.time(), "message": message, "tree": tree}
+        record.update(extra)
+        content = json.dumps(record, sort_keys=True)
+        commit_id = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        record["id"] = commit_id
+        self._write_atomic(os.path.join(self.commits_dir, f"{commit_id}.json"),
+                           json.dumps(record, sort_keys=True).encode("utf-8"))
+        self._write_atomic(self.head_path, (commit_id + "\n").encode("utf-8"))
+        return commit_id
+
+    def record_initial(
+        self,
+        previous_root: str,
+        initial: Optional[Callable[[], Tuple[Tuple[str, Dict[str, Any]], Callable[[str, str], Any]]]] = None,
+    ) -> Optional[str]:
+        """
+        On first use, record previous_root (the inventory as it was before
+        Overlord first saved it), so that it can be rolled back to. Called
+        before the save overwrites it. Returns HEAD.
+
+        initial returns the (model, leaf) pair of previous_root, see record.
+        """
+        head = self.head()
+        if head is None and os.path.isdir(previous_root):
+            extra = {}
+            if initial is not None:
+                initial_model, initial_leaf = initial()
+                extra["model"] = self.store_model(initial_model, initial_leaf, None)
+            head = self.commit(self.snapshot_tree(previous_root), "Initial inventory", **extra)
+        return head
+
+    def record(
+        self,
+        new_root: str,
+        message: str,
+        model: Optional[Tuple[str, Dict[str, Any]]] = None,
+        leaf: Optional[Callable[[str, str], Any]] = None,
+    ) -> Optional[str]:
+        """
+        Record a save of new_root, once written.
+
+        model is the (root, nodes) hash tree of the saved inventory and leaf
+        its leaf(kind, name) content getter, see AnsibleInventory.
+        """
+        head = self.head()
+        extra = {}
+        if model is not None and leaf is not None:
+            extra["model"] = self.store_model(model, leaf, self.get(head).get("model") if head else None)
+        return self.commit(self.snapshot_tree(new_root), message, **extra)
+
+    # -------------------------
+    # Inventory model
+    # -------------------------
+
+    def store_model(
+        self, model: Tuple[str, Dict[str, Any]], leaf: Callable[[str, str], Any], previous_root: Optional[str]
+    ) -> str:
+        """
+        Store hash tree nodes, and the leaves that changed since the previous
+        model (all of them if there is none). Returns the model root hash.
+        """
+        root, nodes = model
+        for content in nodes.values():
+            self.store_blob(canonical_json(content))
+        changes = diff_trees(previous_root, self.fetch, root, nodes.__getitem__)
+        for kind, kind_changes in changes.items():
+            for name in kind_changes["added"] + kind_changes["changed"]:
+                self.store_blob(canonical_json(leaf(kind, name)))
+        return root
+
+    def fetch(self, node_hash: str) -> Any:
+        return json.loads(self.read_blob(node_hash))
+
+    def model_leaf(self, root: str, kind: str, name: str) -> Any:
+        bucket = self.fetch(self.fetch(root)[kind]).get(bucket_of(name))
+        if bucket is None:
+            return None
+        leaf_hash = self.fetch(bucket).get(name)
+        return self.fetch(leaf_hash) if leaf_hash else None
+
+    def model_diff(self, old_id: Optional[str], new_id: str) -> Dict[str, Any]:
+        """
+        Structured diff (hosts, groups, group var files) between the
+        inventory models of two commits, old_id None meaning the parent of
+        new_id. Only differing subtrees are read.
+        """
+        new = self.get(new_id)
+        if old_id is None:
+            old = self.get(new["parent"]) if new.get("parent") else {"id": None}
+        else:
+            old = self.get(old_id)
+        for commit in (old, new):
+            if commit["id"] is not None and not commit.get("model"):
+                raise ValidationError(f"No inventory model recorded for commit {commit['id'][:12]}")
+        old_root, new_root = old.get("model"), new["model"]
+        changes = diff_trees(old_root, self.fetch, new_root, self.fetch)
+        output = structured_diff(
+            changes,
+            lambda kind, name: self.model_leaf(old_root, kind, name),
+            lambda kind, name: self.model_leaf(new_root, kind, name),
+        )
+        return {"from": old["id"], "to": new["id"], "from_model": old_root, "to_model": new_root,
+                "changes": output}
+
+    def log(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Commits from HEAD, following parents, without their trees.
+        """
+        output = []
+        current = self.head()
+        while current and len(output) < limit:
+            commit = self.get(current)
+            parent_tree = self.get(commit["parent"])["tree"] if commit.get("parent") else {}
+            summary = {k: v for k, v in commit.items() if k != "tree"}
+            summary["changes"] = len(self.changes(parent_tree, commit["tree"]))
+            output.append(summary)
+            current = commit.get("parent")
+        return output
+
+    # -------------------------
+    # Diff and checkout
+    # -------------------------
+
+    @staticmethod
+    def changes(old_tree: Dict[str, str], new_tree: Dict[str, str]) -> List[Dict[str, str]]:
+        output = []
+        for path in sorted(set(old_tree) | set(new_tree)):
+            old, new = old_tree.get(path), new_tree.get(path)
+            if old == new:
+                continue
+            status = "added" if old is None else "deleted" if new is None else "modified"
+            output.append({"path": path, "status": status})
+        return output
+
+    def diff(self, old_id: Optional[str], new_id: str) -> Dict[str, Any]:
+        """
+        Changed files and unified diff between two commits, old_id None
+        meaning the parent of new_id.
+        """
+        new = self.get(new_id)
+        if old_id is None:
+            old = self.get(new["parent"]) if new.get("parent") else {"id": None, "tree": {}}
+        else:
+            old = self.get(old_id)
+        changes = self.changes(old["tree"], new["tree"])
+        lines: List[str] = []
+        for change in changes:
+            path = change["path"]
+            old_text = self._text(old["tree"].get(path))
+            new_text = self._text(new["tree"].get(path))
+            lines.extend(difflib.unified_diff(
+                old_text, new_text,
+                fromfile=f"a/{path}" if change["status"] != "added" else "/dev/null",
+                tofile=f"b/{path}" if change["status"] != "deleted" else "/dev/null",
+            ))
+        return {"from": old["id"], "to": new["id"], "changes": changes, "diff": "".join(lines)}
+
+    def _text(self, blob: Optional[str]) -> List[str]:
+        if blob is None:
+            return []
+        return self.read_blob(blob).decode("utf-8", errors="replace").splitlines(keepends=True)
+
+    def checkout(self, tree: Dict[str, str], root: str) -> List[Dict[str, str]]:
+        """
+        Make root content match tree, rewriting only differing files and
+        removing files not in tree. Returns applied changes.
+        Caller holds the inventory lock.
+        """
+        root = os.path.abspath(root)
+        current = self.snapshot_tree(root, store=False) if os.path.isdir(root) else {}
+        changes = self.changes(current, tree)
+        for change in changes:
+            path = os.path.join(root, change["path"])
+            if change["status"] == "deleted":
+                os.remove(path)
+                # Drop folders left empty, host_vars/<host> for example
+                folder = os.path.dirname(path)
+                while folder != root and not os.listdir(folder):
+                    os.rmdir(folder)
+                    folder = os.path.dirname(folder)
+            else:
+                self._write_atomic(path, self.read_blob(tree[change["path"]]))
+        return changes
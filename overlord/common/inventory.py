@@ -1,12 +1,111 @@
 # inventory.py
 
+import copy
+import fcntl
+import hashlib
 import os
 import shutil
 import tempfile
 import subprocess
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from common.errors import ConflictError
+from common.events import EventJournal
 from common.files import load_yaml_file, dump_yaml_file, load_ini_file
+from common.history import InventoryHistory
+from common.merkle import KINDS, HashTree, content_hash, diff_trees, structured_diff
+from common.metrics import REGISTRY
+
+VERSION_FILE = "inventory.version"
+LOCK_FILE = "inventory.lock"
+
+
+# -------------------------
+# Inventory versioning and cache
+# -------------------------
+#
+# Each save bumps a version number stored in working_folder, under a file lock.
+# This allows multiple processes (CLI, UI/API workers) to:
+#  - serialize writes and detect that inventory changed since they loaded it
+#  - reuse an in-memory snapshot as long as version did not change
+#
+# Manual edits of the inventory files (or git pull, other tools) do not bump
+# the version, so snapshots also carry the inventory_signature() of the files
+# they were loaded from, and are only reused if both still match. The cache is
+# disabled by default, long running processes enable it.
+
+_SNAPSHOTS: Dict[str, Tuple[int, str, Dict[str, Any], Dict[str, Any], Dict[str, Dict[str, str]]]] = {}
+_CACHE_ENABLED = False
+
+
+def enable_inventory_cache(enabled: bool = True) -> None:
+    global _CACHE_ENABLED
+    _CACHE_ENABLED = enabled
+    if not enabled:
+        _SNAPSHOTS.clear()
+
+
+def read_inventory_version(working_folder: str) -> int:
+    try:
+        with open(os.path.join(working_folder, VERSION_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_inventory_version(working_folder: str, version: int) -> None:
+    path = os.path.join(working_folder, VERSION_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{version}\n")
+    os.replace(tmp_path, path)
+
+
+def inventory_signature(inventory_root: str) -> str:
+    """
+    Cheap fingerprint of the inventory files: hash of (path, mtime_ns, size)
+    of every file under <inventory_root>/inventory. Stats only, nothing is
+    parsed, so it also catches manual edits which do not bump the version.
+    """
+    signature = []
+    stack = [os.path.join(os.path.abspath(inventory_root), "inventory")]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            else:
+                st = entry.stat()
+                signature.append(f"{entry.path}:{st.st_mtime_ns}:{st.st_size}")
+    return hashlib.sha1("\n".join(sorted(signature)).encode("utf-8")).hexdigest()
+
+
+# Callables(inventory) run after each successful save, in the saving
+# process and under the inventory lock (see common/generators)
+_SAVE_HOOKS: List[Callable[["AnsibleInventory"], None]] = []
+
+
+def register_save_hook(hook: Callable[["AnsibleInventory"], None]) -> None:
+    _SAVE_HOOKS.append(hook)
+
+
+@contextmanager
+def inventory_lock(working_folder: str):
+    """
+    Exclusive inventory write lock, shared by all processes using working_folder.
+    """
+    os.makedirs(working_folder, exist_ok=True)
+    with open(os.path.join(working_folder, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
 
 
 class AnsibleInventory:
@@ -36,7 +135,25 @@ class AnsibleInventory:
 
         self.hosts: Dict[str, Dict[str, Any]] = {}
         self.groups: Dict[str, Dict[str, Any]] = {}
-        self._load_inventory()
+        # Change events, published to the events journal once saved
+        self.pending_events: List[Tuple[str, Dict[str, Any]]] = []
+        # Merkle leaf hashes, {kind: {leaf name: hash}} (see common/merkle.py),
+        # computed on demand and dropped when a mutation touches the leaf
+        self.leaf_hashes: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+        # Hash tree, built on first use, then only leaves touched since
+        # ({kind: {leaf name}}) are applied to it
+        self._tree: Optional[HashTree] = None
+        self._touched: Dict[str, set] = {kind: set() for kind in KINDS}
+        # Version of the inventory we loaded, checked again when saving
+        self.version = read_inventory_version(self.working_folder)
+        start = time.perf_counter()
+        source = self._load_inventory()
+        REGISTRY.observe(
+            "overlord_inventory_load_duration_seconds",
+            time.perf_counter() - start,
+            {"source": source},
+            help_text="Inventory load duration, from disk or from in-memory cache",
+        )
 
     def show(self):
         print(self.hosts)
@@ -46,9 +163,34 @@ class AnsibleInventory:
     # Loading
     # -------------------------
 
-    def _load_inventory(self) -> None:
+    def _load_inventory(self) -> str:
+        signature = None
+        if _CACHE_ENABLED:
+            # Taken before reading files: an edit during the load makes the
+            # snapshot stale for the next load, not silently current
+            signature = inventory_signature(self.inventory_root)
+            snapshot = _SNAPSHOTS.get(self.inventory_root)
+            if snapshot is not None and snapshot[0] == self.version and snapshot[1] == signature:
+                # Private copy, callers are free to mutate it
+                self.hosts = copy.deepcopy(snapshot[2])
+                self.groups = copy.deepcopy(snapshot[3])
+                self.leaf_hashes = {kind: dict(hashes) for kind, hashes in snapshot[4].items()}
+                return "cache"
+
         self._load_hosts()
         self._load_groups()
+        self._store_snapshot(signature)
+        return "disk"
+
+    def _store_snapshot(self, signature: Optional[str] = None) -> None:
+        if _CACHE_ENABLED:
+            _SNAPSHOTS[self.inventory_root] = (
+                self.version,
+                signature if signature is not None else inventory_signature(self.inventory_root),
+                copy.deepcopy(self.hosts),
+                copy.deepcopy(self.groups),
+                {kind: dict(hashes) for kind, hashes in self.leaf_hashes.items()},
+            )
 
     def _load_hosts(self) -> None:
         hosts_file = os.path.join(
@@ -148,6 +290,8 @@ class AnsibleInventory:
             "bmc": data.get("bmc", {}),
             "vars": data.get("vars", {}),
         }
+        self._touch("hosts", name)
+        self._emit("host.added", {"host": name, "alias": data.get("alias")})
 
     def update_host(self, name: str, data: Dict[str, Any]) -> None:
         if name not in self.hosts:
@@ -161,15 +305,21 @@ class AnsibleInventory:
                 host["vars"] = host_vars
             else:
                 host[key] = value
+        self._touch("hosts", name)
+        self._emit("host.updated", {"host": name, "alias": host.get("alias")})
 
     def delete_host(self, name: str) -> None:
         if name not in self.hosts:
             raise ValueError(f"Host {name} does not exist")
         del self.hosts[name]
-                # When deleting an host, we need to make sure it is also purged from groups!
+        self._touch("hosts", name)
+        self._emit("host.deleted", {"host": name})
+        # When deleting an host, we need to make sure it is also purged from groups!
         for group in self.groups:
             if name in self.groups[group]['hosts']:
                 self.groups[group]['hosts'].remove(name)
+                self._touch("groups", group)
+                self._emit("group.hosts", {"group": group, "added": [], "removed": [name]})
 
     # -------------------------
     # Group operations
@@ -188,6 +338,10 @@ class AnsibleInventory:
             "hosts": data.get("hosts", []),
             "vars": data.get("vars", {})
             }
+        self._touch("groups", name)
+        for plugin_name in self.groups[name]["vars"]:
+            self._touch("group_vars", f"{name}/{plugin_name}")
+        self._emit("group.added", {"group": name, "hosts": list(self.groups[name]["hosts"])})
 
     def update_group(
         self,
@@ -199,17 +353,225 @@ class AnsibleInventory:
             raise ValueError(f"Group {name} does not exist")
         group = self.groups[name]
         if hosts is not None:
+            added = [h for h in hosts if h not in group["hosts"]]
+            removed = [h for h in group["hosts"] if h not in hosts]
             group["hosts"] = hosts
+            self._touch("groups", name)
+            if added or removed:
+                self._emit("group.hosts", {"group": name, "added": added, "removed": removed})
         if vars_update:
             for plugin_name, plugin_vars in vars_update.items():
                 existing = group["vars"].get(plugin_name, {})
                 existing.update(plugin_vars or {})
                 group["vars"][plugin_name] = existing
+                self._touch("group_vars", f"{name}/{plugin_name}")
+            self._emit("group.updated", {"group": name, "vars": list(vars_update)})
 
     def delete_group(self, name: str) -> None:
         if name not in self.groups:
             raise ValueError(f"Group {name} does not exist")
+        for plugin_name in self.groups[name]["vars"]:
+            self._touch("group_vars", f"{name}/{plugin_name}")
         del self.groups[name]
+        self._touch("groups", name)
+        self._emit("group.deleted", {"group": name})
+
+    # -------------------------
+    # Merkle hashes
+    # -------------------------
+
+    def leaf(self, kind: str, name: str) -> Any:
+        """
+        Content of a hash tree leaf, None if it does not exist.
+        """
+        if kind == "hosts":
+            return self.hosts.get(name)
+        if kind == "group_vars":
+            group_name, _, plugin_name = name.partition("/")
+            return ((self.groups.get(group_name) or {}).get("vars") or {}).get(plugin_name)
+        group = self.groups.get(name)
+        if group is None:
+            return None
+        # Var files are leaves of their own, a group only carries their hashes
+        return {
+            "hosts": group["hosts"],
+            "vars": {p: self.leaf_hash("group_vars", f"{name}/{p}") for p in group.get("vars") or {}},
+        }
+
+    def leaf_names(self, kind: str) -> List[str]:
+        if kind == "hosts":
+            return list(self.hosts)
+        if kind == "groups":
+            return list(self.groups)
+        return [f"{g}/{p}" for g, group in self.groups.items() for p in group.get("vars") or {}]
+
+    def leaf_hash(self, kind: str, name: str) -> str:
+        cached = self.leaf_hashes[kind].get(name)
+        if cached is None:
+            cached = content_hash(self.leaf(kind, name))
+            self.leaf_hashes[kind][name] = cached
+        return cached
+
+    def leaf_exists(self, kind: str, name: str) -> bool:
+        if kind == "hosts":
+            return name in self.hosts
+        if kind == "groups":
+            return name in self.groups
+        group_name, _, plugin_name = name.partition("/")
+        return plugin_name in ((self.groups.get(group_name) or {}).get("vars") or {})
+
+    def _touch(self, kind: str, name: str) -> None:
+        self.leaf_hashes[kind].pop(name, None)
+        self._touched[kind].add(name)
+        if kind == "group_vars":
+            group_name = name.partition("/")[0]
+            self.leaf_hashes["groups"].pop(group_name, None)
+            self._touched["groups"].add(group_name)
+
+    def merkle_tree(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        (root hash, {node hash: node content}) of the current model. Only
+        leaves touched since last call are hashed again, with their bucket,
+        kind node and the root. The nodes dict is updated in place by
+        later calls.
+        """
+        if self._tree is None:
+            self._tree = HashTree({
+                kind: {name: self.leaf_hash(kind, name) for name in self.leaf_names(kind)}
+                for kind in KINDS
+            })
+        elif any(self._touched.values()):
+            self._tree.update({
+                kind: {
+                    name: self.leaf_hash(kind, name) if self.leaf_exists(kind, name) else None
+                    for name in names
+                }
+                for kind, names in self._touched.items()
+            })
+        self._touched = {kind: set() for kind in KINDS}
+        return self._tree.root, self._tree.nodes
+
+    def root_hash(self) -> str:
+        return self.merkle_tree()[0]
+
+    def diff_from(self, other: "AnsibleInventory") -> Dict[str, Any]:
+        """
+        Structured diff from other inventory state to this one.
+        """
+        old_root, old_nodes = other.merkle_tree()
+        new_root, new_nodes = self.merkle_tree()
+        return structured_diff(
+            diff_trees(old_root, old_nodes.__getitem__, new_root, new_nodes.__getitem__),
+            other.leaf, self.leaf,
+        )
+
+    # -------------------------
+    # Ansible dynamic inventory
+    # -------------------------
+
+    def host_ansible_vars(self, name: str) -> Dict[str, Any]:
+        """
+        Host variables as Ansible sees them from the file layout:
+        hosts.yml entry keys, then host_vars/<host>/main.yml.
+        """
+        host = self.hosts.get(name) or {}
+        host_vars: Dict[str, Any] = {}
+        if host.get("alias") is not None:
+            host_vars["alias"] = host["alias"]
+        for key in ("network_interfaces", "bmc"):
+            if host.get(key) is not None:
+                host_vars[key] = host[key]
+        host_vars.update(host.get("vars") or {})
+        return host_vars
+
+    def to_ansible(self) -> Dict[str, Any]:
+        """
+        Inventory in Ansible dynamic inventory --list format, with a fully
+        populated _meta.hostvars so that Ansible never calls --host.
+
+        Group vars files are merged in file name order, like Ansible does
+        for group_vars/<group>/*.yml.
+        """
+        output: Dict[str, Any] = {"_meta": {"hostvars": {}}}
+        grouped = set()
+        children = []
+
+        for group_name in sorted(self.groups):
+            group = self.groups[group_name]
+            group_vars: Dict[str, Any] = {}
+            for plugin_name in sorted(group.get("vars") or {}):
+                group_vars.update(group["vars"][plugin_name] or {})
+
+            if group_name == "all":
+                if group_vars:
+                    output.setdefault("all", {})["vars"] = group_vars
+                continue
+
+            entry: Dict[str, Any] = {"hosts": list(group.get("hosts", []))}
+            if group_vars:
+                entry["vars"] = group_vars
+            output[group_name] = entry
+            children.append(group_name)
+            grouped.update(entry["hosts"])
+
+        # Hosts only known from group files are still Ansible hosts
+        for name in sorted(set(self.hosts) | grouped | set(self.groups.get("all", {}).get("hosts", []))):
+            output["_meta"]["hostvars"][name] = self.host_ansible_vars(name)
+
+        ungrouped = sorted(h for h in output["_meta"]["hostvars"] if h not in grouped)
+        if ungrouped:
+            output["ungrouped"] = {"hosts": ungrouped}
+        output.setdefault("all", {})["children"] = children + ["ungrouped"]
+        return output
+
+    # -------------------------
+    # Change events
+    # -------------------------
+
+    def _emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        self.pending_events.append((event_type, data))
+
+    def _publish_events(self) -> None:
+        if not self.pending_events:
+            return
+        try:
+            EventJournal(self.working_folder).publish_many(self.pending_events)
+        except OSError as e:
+            # Events are a UI nicety, never fail a save because of them
+            if self.logger:
+                self.logger.warning("Failed to publish inventory events: %s", e)
+        self.pending_events = []
+
+    def _previous_model(self, root: str) -> Tuple[Tuple[str, Dict[str, Any]], Callable[[str, str], Any]]:
+        # Inventory as on disk, before our changes, for the initial commit
+        previous = AnsibleInventory(root, self.working_folder, logger=self.logger)
+        return previous.merkle_tree(), previous.leaf
+
+    def _record_history_initial(self, original_root: str) -> None:
+        try:
+            InventoryHistory(self.working_folder).record_initial(
+                original_root, initial=lambda: self._previous_model(original_root)
+            )
+        except OSError as e:
+            # History must never prevent saving the inventory
+            if self.logger:
+                self.logger.warning("Failed to record inventory history: %s", e)
+
+    def _record_history(self, new_root: str) -> None:
+        message = ", ".join(
+            f"{event_type} {data.get('host') or data.get('group') or ''}".strip()
+            for event_type, data in self.pending_events
+        ) or "Inventory saved"
+        if len(message) > 200:
+            message = message[:197] + "..."
+        try:
+            InventoryHistory(self.working_folder).record(
+                new_root, message, model=self.merkle_tree(), leaf=self.leaf
+            )
+        except OSError as e:
+            # History must never prevent saving the inventory
+            if self.logger:
+                self.logger.warning("Failed to record inventory history: %s", e)
 
     # -------------------------
     # Saving with diff/check
@@ -223,7 +585,24 @@ class AnsibleInventory:
         - If diff/check: run `diff -ruN old new` and print output.
         - If check: do not overwrite original inventory.
         - If not check: overwrite original inventory and remove temp dir.
+
+        Writes are serialized with other processes through the inventory lock.
+        If another process saved the inventory since we loaded it, ConflictError
+        is raised instead of silently overwriting its changes.
         """
+        with REGISTRY.timer(
+            "overlord_inventory_save_duration_seconds",
+            {"check": self.check},
+            help_text="Inventory save duration, lock wait included",
+        ), inventory_lock(self.working_folder):
+            current_version = read_inventory_version(self.working_folder)
+            if current_version != self.version:
+                raise ConflictError(
+                    "Inventory was modified by another operator since it was loaded, please retry"
+                )
+            self._save()
+
+    def _save(self) -> None:
         tmp_dir = tempfile.mkdtemp(
             prefix="overlord-inventory-new-",
             dir=self.working_folder,
@@ -249,10 +628,20 @@ class AnsibleInventory:
             if self.diff or self.check:
                 self._print_diff(original_root, new_root)
             if not self.check:
+                # Inventory as it was is recorded before being overwritten,
+                # the save only once it succeeded
+                self._record_history_initial(original_root)
                 # Overwrite original with new_root content
                 if os.path.isdir(original_root):
                     shutil.rmtree(original_root)
                 shutil.copytree(new_root, original_root)
+                self._record_history(new_root)
+                self.version += 1
+                write_inventory_version(self.working_folder, self.version)
+                self._store_snapshot()
+                self._publish_events()
+                for hook in _SAVE_HOOKS:
+                    hook(self)
 
         finally:
             # Clean temp dir if overwrite occurred, otherwise leave for debugging?
@@ -324,3 +713,31 @@ class AnsibleInventory:
         except FileNotFoundError:
             if self.logger:
                 self.logger.error("diff binary not found; cannot show diff")
+
+
+def rollback_inventory(inventory_root: str, working_folder: str, commit_id: str, logger=None) -> Dict[str, Any]:
+    """
+    Bring inventory files back to their state at commit_id. Only files
+    differing from it are rewritten, and a new commit pointing to the same
+    tree is recorded on top of history, so a rollback can be rolled back.
+    """
+    history = InventoryHistory(working_folder)
+    target = history.get(commit_id)
+    with inventory_lock(working_folder):
+        changes = history.checkout(target["tree"], inventory_root)
+        new_commit = history.commit(
+            target["tree"], f"Rollback to {target['id'][:12]}", rollback_of=target["id"], model=target.get("model")
+        )
+        if changes:
+            write_inventory_version(working_folder, read_inventory_version(working_folder) + 1)
+            try:
+                EventJournal(working_folder).publish(
+                    "inventory.rollback", {"commit": target["id"], "changes": len(changes)}
+                )
+            except OSError as e:
+                if logger:
+                    logger.warning("Failed to publish inventory events: %s", e)
+            inventory = AnsibleInventory(inventory_root, working_folder, logger=logger)
+            for hook in _SAVE_HOOKS:
+                hook(inventory)
+    return {"commit": new_commit, "target": target["id"], "changes": changes}
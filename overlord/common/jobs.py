@@ -0,0 +1,279 @@
+# common/jobs.py
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from common.errors import ConflictError, NotFoundError
+from common.files import follow_file
+
+# Job life cycle: queued -> running -> ok | error
+# A job whose process died while running is reported as lost.
+FINISHED_STATUSES = ("ok", "error", "lost")
+
+
+class JobContext:
+    """
+    Handle given to a running job, to report its progress and log lines.
+    """
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+
+    def log(self, message: str) -> None:
+        self.manager.append_log(self.job_id, message)
+
+    def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        progress = {"current": current, "total": total}
+        if message is not None:
+            progress["message"] = message
+        self.manager.update(self.job_id, progress=progress)
+
+
+class JobManager:
+    """
+    Bounded worker pool running long actions in background.
+
+    Job state is persisted as JSON under <working_folder>/jobs/<id>.json,
+    and job log lines in <id>.log, so any process (UI/API worker, CLI)
+    can poll a job, not only the one running it.
+    """
+
+    def __init__(
+        self,
+        working_folder: str,
+        max_workers: int = 4,
+        max_queued: int = 100,
+        retention: int = 7 * 24 * 3600,
+        logger=None,
+    ):
+        self.jobs_dir = os.path.join(os.path.abspath(working_folder), "jobs")
+        self.max_queued = max_queued
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="overlord-job")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.purge(retention)
+
+    # -------------------------
+    # Storage
+    # -------------------------
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def log_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.log")
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        path = self._state_path(job["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _read(self, job_id: str) -> Dict[str, Any]:
+        # Job ids are generated by us, refuse anything looking like a path
+        if not job_id or os.sep in job_id or job_id.startswith("."):
+            raise NotFoundError(f"Job {job_id} not found")
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise NotFoundError(f"Job {job_id} not found")
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        with self.lock:
+            job = self._read(job_id)
+            job.update(fields)
+            self._write(job)
+            return job
+
+    def append_log(self, job_id: str, message: str) -> None:
+        with open(self.log_path(job_id), "a", encoding="utf-8") as f:
+            f.write(message.rstrip("\n") + "\n")
+
+    def purge(self, retention: int) -> None:
+        """
+        Remove finished jobs older than retention seconds.
+        """
+        limit = time.time() - retention
+        for fname in os.listdir(self.jobs_dir):
+            if not fname.endswith(".json"):
+                continue
+            job_id = fname[:-len(".json")]
+            try:
+                job = self._read(job_id)
+            except (NotFoundError, ValueError):
+                continue
+            if job.get("status") in FINISHED_STATUSES and (job.get("finished") or 0) < limit:
+                for path in (self._state_path(job_id), self.log_path(job_id)):
+                    if os.path.isfile(path):
+                        os.remove(path)
+
+    # -------------------------
+    # Jobs
+    # -------------------------
+
+    def submit(self, name: str, func: Callable[[JobContext], Any]) -> str:
+        """
+        Queue func(job_context) for execution, return the job id.
+        func return value is stored as job result.
+        """
+        with self.lock:
+            if self.pending >= self.max_queued:
+                raise ConflictError("Too many jobs queued, please retry later")
+            self.pending += 1
+
+        job_id = uuid.uuid4().hex
+        self._write({
+            "id": job_id,
+            "name": name,
+            "status": "queued",
+            "pid": os.getpid(),
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": None,
+            "result": None,
+        })
+        open(self.log_path(job_id), "a").close()
+        self.executor.submit(self._run, job_id, func)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable[[JobContext], Any]) -> None:
+        context = JobContext(self, job_id)
+        try:
+            self.update(job_id, status="running", started=time.time())
+            result = func(context)
+            status = "ok"
+            if isinstance(result, dict) and result.get("status") == "error":
+                status = "error"
+        except Exception as e:
+            if self.logger:
+                self.logger.exception("Job %s failed", job_id)
+            context.log(traceback.format_exc())
+            result = {"status": "error", "message": str(e)}
+            status = "error"
+        finally:
+            with self.lock:
+                self.pending -= 1
+        self.update(job_id, status=status, finished=time.time(), result=result)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        job = self._read(job_id)
+        if job["status"] not in FINISHED_STATUSES and not pid_alive(job.get("pid")):
+            job["status"] = "lost"
+        return job
+
+    def list(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for fname in os.listdir(self.jobs_dir):
+            if fname.endswith(".json"):
+                try:
+                    jobs.append(self.get(fname[:-len(".json")]))
+                except (NotFoundError, ValueError):
+                    continue
+        return sorted(jobs, key=lambda j: j["created"], reverse=True)
+
+    def follow_log(
+        self, job_id: str, poll_interval: float = 0.5, offset: int = 0, max_duration: float = 0
+    ) -> Iterator[str]:
+        """
+        Return a generator yielding job log lines as they are written,
+        until the job is finished, from offset and for at most max_duration
+        seconds (see follow_file). Raises NotFoundError right away for an
+        unknown job.
+        """
+        self._read(job_id)
+        return follow_file(
+            self.log_path(job_id),
+            lambda: self.get(job_id)["status"] in FINISHED_STATUSES,
+            poll_interval,
+            offset,
+            max_duration,
+        )
+
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# One manager per process, created on first use, so that forked
+# production workers each start their own worker threads.
+_MANAGER: Optional[JobManager] = None
+_MANAGER_LOCK = threading.Lock()
+# Held by jobs running BasePlugin.SERIAL_ACTIONS
+_SERIAL_LOCK = threading.Lock()
+
+
+def get_job_manager(config: Dict[str, Any], logger=None) -> JobManager:
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            jobs_cfg = config.get("jobs", {})
+            _MANAGER = JobManager(
+                config["working_folder"],
+                max_workers=int(jobs_cfg.get("max_workers", 4)),
+                max_queued=int(jobs_cfg.get("max_queued", 100)),
+                retention=int(jobs_cfg.get("retention", 7 * 24 * 3600)),
+                logger=logger,
+            )
+        return _MANAGER
+
+
+def dispatch_action(
+    plugin_class, plugin_args: Dict[str, Any], action: str, payload: Any, run_async: bool = False
+) -> Dict[str, Any]:
+    """
+    Execute a plugin action now, or as a background job if requested and
+    the plugin allows it for this action (BasePlugin.ASYNC_ACTIONS).
+
+    The plugin is instantiated from plugin_args (action_args, config,
+    logger, global_args) where the action runs: plugins load the inventory
+    when created, so a job must load it when it starts, not when queued,
+    or it would conflict with the jobs saved meanwhile.
+    """
+    if not run_async or action not in plugin_class.ASYNC_ACTIONS:
+        return plugin_class(**plugin_args).execute(action, payload)
+
+    global_args = plugin_args["global_args"]
+    manager = get_job_manager(global_args["config"], plugin_args.get("logger"))
+    name = f"{global_args.get('section')} {global_args.get('plugin')} {action}"
+
+    def run(job):
+        with _SERIAL_LOCK if action in plugin_class.SERIAL_ACTIONS else nullcontext():
+            plugin = plugin_class(**plugin_args)
+            plugin.job = job
+            return plugin.execute(action, payload)
+
+    job_id = manager.submit(name, run)
+    return {
+        "status": "ok",
+        "data": {"job_id": job_id, "url": f"/api/v1/jobs/{job_id}"},
+        "message": f"Job {job_id} submitted",
+    }
+
+
+def async_requested(args) -> bool:
+    """
+    True if an API request asks for a background job (?async=1).
+    """
+    return str(args.get("async", "")).lower() in ("1", "true", "yes")
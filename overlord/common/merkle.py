@@ -0,0 +1,219 @@
+# common/merkle.py
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Inventory model hash tree:
+#
+#   root            {kind: kind hash}
+#   +- hosts        {bucket: bucket hash}, one leaf per host
+#   +- groups       one leaf per group: its hosts and the hashes of its var files
+#   +- group_vars   one leaf per group var file, named <group>/<plugin>
+#
+# Leaves of each kind are spread in buckets ({leaf name: leaf hash}) on the
+# first two hex digits of the sha1 of their name, so that comparing two trees
+# of 50k hosts compares 256 bucket hashes, then the leaves of differing
+# buckets only.
+#
+# Every hash is the sha1 of the canonical JSON of the node content, so nodes
+# and leaves can be stored content-addressed (see common/history.py) and
+# read back by hash. A tree is a root hash plus a fetch(hash) function
+# returning node contents.
+
+KINDS = ("hosts", "groups", "group_vars")
+
+
+def canonical_json(data: Any) -> bytes:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def content_hash(data: Any) -> str:
+    return hashlib.sha1(canonical_json(data)).hexdigest()
+
+
+def bucket_of(name: str) -> str:
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+
+class HashTree:
+    """
+    Hash tree kept up to date between changes: update() only hashes again
+    the buckets holding changed leaves, their kind nodes and the root, not
+    the whole tree.
+
+    nodes ({node hash: node content}) is updated in place. Nodes can have
+    the same content, and so hash (empty kinds), they are counted so that
+    one is only dropped with its last reference.
+    """
+
+    def __init__(self, leaves: Dict[str, Dict[str, str]]):
+        # {kind: {bucket: {leaf name: leaf hash}}} and {kind: {bucket: hash}}
+        self.buckets: Dict[str, Dict[str, Dict[str, str]]] = {kind: {} for kind in KINDS}
+        self.bucket_hashes: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+        self.kind_hashes: Dict[str, str] = {}
+        self.nodes: Dict[str, Any] = {}
+        self.references: Dict[str, int] = {}
+        self.root = ""
+        self.update({
+            kind: {name: leaf_hash for name, leaf_hash in (leaves.get(kind) or {}).items()}
+            for kind in KINDS
+        }, initial=True)
+
+    def _add_node(self, node_hash: str, content: Any) -> None:
+        self.nodes[node_hash] = content
+        self.references[node_hash] = self.references.get(node_hash, 0) + 1
+
+    def _drop_node(self, node_hash: Optional[str]) -> None:
+        if node_hash is None:
+            return
+        self.references[node_hash] -= 1
+        if not self.references[node_hash]:
+            del self.references[node_hash]
+            del self.nodes[node_hash]
+
+    def update(self, changes: Dict[str, Dict[str, Optional[str]]], initial: bool = False) -> None:
+        """
+        Apply {kind: {leaf name: leaf hash, None if removed}}.
+        """
+        for kind in KINDS:
+            kind_changes = changes.get(kind) or {}
+            if not kind_changes and not initial:
+                continue
+            buckets = self.buckets[kind]
+            dirty = set()
+            for name, leaf_hash in kind_changes.items():
+                bucket = bucket_of(name)
+                dirty.add(bucket)
+                if leaf_hash is None:
+                    buckets.get(bucket, {}).pop(name, None)
+                else:
+                    buckets.setdefault(bucket, {})[name] = leaf_hash
+            bucket_hashes = self.bucket_hashes[kind]
+            for bucket in dirty:
+                self._drop_node(bucket_hashes.pop(bucket, None))
+                if buckets.get(bucket):
+                    bucket_hashes[bucket] = content_hash(buckets[bucket])
+                    self._add_node(bucket_hashes[bucket], dict(buckets[bucket]))
+                else:
+                    buckets.pop(bucket, None)
+            self._drop_node(self.kind_hashes.get(kind))
+            self.kind_hashes[kind] = content_hash(bucket_hashes)
+            self._add_node(self.kind_hashes[kind], dict(bucket_hashes))
+        if self.root:
+            self._drop_node(self.root)
+        self.root = content_hash(self.kind_hashes)
+        self._add_node(self.root, dict(self.kind_hashes))
+
+
+def build_tree(leaves: Dict[str, Dict[str, str]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Hash tree from {kind: {leaf name: leaf hash}}.
+    Returns (root hash, {node hash: node content}).
+    """
+    tree = HashTree(leaves)
+    return tree.root, tree.nodes
+
+
+def tree_leaves(root: str, fetch: Callable[[str], Any], kind: str) -> Dict[str, str]:
+    leaves: Dict[str, str] = {}
+    for bucket_hash in fetch(fetch(root)[kind]).values():
+        leaves.update(fetch(bucket_hash))
+    return leaves
+
+
+def diff_trees(
+    old_root: Optional[str], old_fetch: Callable[[str], Any], new_root: str, new_fetch: Callable[[str], Any]
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    {kind: {"added": [...], "removed": [...], "changed": [...]}} between two
+    trees, only descending into kinds and buckets whose hashes differ.
+    old_root None is an empty tree.
+    """
+    output: Dict[str, Dict[str, List[str]]] = {}
+    old_kinds = old_fetch(old_root) if old_root and old_root != new_root else {}
+    new_kinds = new_fetch(new_root) if old_root != new_root else {}
+    for kind in KINDS:
+        changes: Dict[str, List[str]] = {"added": [], "removed": [], "changed": []}
+        output[kind] = changes
+        if old_root == new_root or old_kinds.get(kind) == new_kinds.get(kind):
+            continue
+        old_buckets = old_fetch(old_kinds[kind]) if kind in old_kinds else {}
+        new_buckets = new_fetch(new_kinds[kind])
+        for bucket in set(old_buckets) | set(new_buckets):
+            if old_buckets.get(bucket) == new_buckets.get(bucket):
+                continue
+            old_leaves = old_fetch(old_buckets[bucket]) if bucket in old_buckets else {}
+            new_leaves = new_fetch(new_buckets[bucket]) if bucket in new_buckets else {}
+            for name in set(old_leaves) | set(new_leaves):
+                if name not in old_leaves:
+                    changes["added"].append(name)
+                elif name not in new_leaves:
+                    changes["removed"].append(name)
+                elif old_leaves[name] != new_leaves[name]:
+                    changes["changed"].append(name)
+        for names in changes.values():
+            names.sort()
+    return output
+
+
+def structured_diff(
+    changes: Dict[str, Dict[str, List[str]]],
+    old_leaf: Callable[[str, str], Any],
+    new_leaf: Callable[[str, str], Any],
+) -> Dict[str, Any]:
+    """
+    Expand diff_trees() output: content of added leaves, deep_diff of
+    changed ones, names of removed ones.
+    """
+    output: Dict[str, Any] = {}
+    for kind, kind_changes in changes.items():
+        output[kind] = {
+            "added": {name: new_leaf(kind, name) for name in kind_changes["added"]},
+            "removed": kind_changes["removed"],
+            "changed": {
+                name: deep_diff(old_leaf(kind, name), new_leaf(kind, name))
+                for name in kind_changes["changed"]
+            },
+        }
+    return output
+
+
+def deep_diff(a: Any, b: Any) -> Any:
+    """
+    Compute a recursive diff between a and b.
+
+    Returns a structure describing:
+    - added keys
+    - removed keys
+    - changed values
+
+    Examples:
+    deep_diff({"x":1}, {"x":2})
+        -> {"x": {"from":1, "to":2}}
+
+    deep_diff({"a":1}, {"a":1})
+        -> None
+
+    deep_diff({"a":1}, {"a":1, "b":2})
+        -> {"b": {"added":2}}
+    """
+    # Both dicts → recurse, but only into values that differ
+    if isinstance(a, dict) and isinstance(b, dict):
+        diff: Dict[str, Any] = {}
+        for key in set(a.keys()) | set(b.keys()):
+            if key not in a:
+                diff[key] = {"added": b[key]}
+            elif key not in b:
+                diff[key] = {"removed": a[key]}
+            elif a[key] != b[key]:
+                sub = deep_diff(a[key], b[key])
+                if sub not in (None, {}):
+                    diff[key] = sub
+        return diff or None
+
+    # Scalars and lists → compare directly
+    if a != b:
+        return {"from": a, "to": b}
+
+    return None
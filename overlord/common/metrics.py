@@ -0,0 +1,206 @@
+# common/metrics.py
+
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Default buckets, in seconds for durations and bytes for sizes
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [100, 1000, 10000, 100000, 1000000, 10000000]
+
+
+def _labels_key(labels: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(sorted((labels or {}).items()))
+
+
+def _format_labels(pairs: List, extra: Optional[Dict[str, str]] = None) -> str:
+    items = [(str(k), str(v)) for k, v in pairs] + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = []
+    for k, v in items:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (counters and histograms),
+    rendered in Prometheus text exposition format.
+
+    A registry can be dumped to a JSON snapshot and snapshots merged, which
+    allows to aggregate metrics of multiple processes (UI/API workers, CLI)
+    sharing a metrics folder.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Serializes dumps of this registry, taken by request threads
+        self.dump_lock = threading.Lock()
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+
+    def _metric(self, name: str, metric_type: str, help_text: str, buckets=None) -> Dict[str, Any]:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = {"type": metric_type, "help": help_text, "samples": {}}
+            if buckets is not None:
+                metric["buckets"] = list(buckets)
+            self.metrics[name] = metric
+        return metric
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1, help_text: str = "") -> None:
+        with self.lock:
+            samples = self._metric(name, "counter", help_text)["samples"]
+            key = _labels_key(labels)
+            samples[key] = samples.get(key, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        buckets: List[float] = LATENCY_BUCKETS,
+        help_text: str = "",
+    ) -> None:
+        with self.lock:
+            metric = self._metric(name, "histogram", help_text, buckets)
+            key = _labels_key(labels)
+            sample = metric["samples"].get(key)
+            if sample is None:
+                sample = {"counts": [0] * len(metric["buckets"]), "sum": 0.0, "count": 0}
+                metric["samples"][key] = sample
+            for i, bound in enumerate(metric["buckets"]):
+                if value <= bound:
+                    sample["counts"][i] += 1
+            sample["sum"] += value
+            sample["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None, help_text: str = ""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels, help_text=help_text)
+
+    # -------------------------
+    # Snapshots
+    # -------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return json.loads(json.dumps(self.metrics))
+
+    def dump(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per thread too, should another registry dump to path
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self.dump_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+
+    def load(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Add snapshot values to this registry.
+        """
+        with self.lock:
+            for name, other in snapshot.items():
+                metric = self._metric(name, other["type"], other.get("help", ""), other.get("buckets"))
+                for key, value in other["samples"].items():
+                    if other["type"] == "counter":
+                        metric["samples"][key] = metric["samples"].get(key, 0) + value
+                        continue
+                    sample = metric["samples"].get(key)
+                    if sample is None or metric.get("buckets") != other.get("buckets"):
+                        metric["samples"][key] = json.loads(json.dumps(value))
+                        continue
+                    sample["counts"] = [a + b for a, b in zip(sample["counts"], value["counts"])]
+                    sample["sum"] += value["sum"]
+                    sample["count"] += value["count"]
+
+    # -------------------------
+    # Prometheus text format
+    # -------------------------
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted(self.metrics):
+                metric = self.metrics[name]
+                if metric.get("help"):
+                    lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key in sorted(metric["samples"]):
+                    pairs = json.loads(key)
+                    value = metric["samples"][key]
+                    if metric["type"] == "counter":
+                        lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                        continue
+                    for bound, count in zip(metric["buckets"], value["counts"]):
+                        labels = _format_labels(pairs, {"le": _format_value(bound)})
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(pairs, {"le": "+Inf"})
+                    lines.append(f"{name}_bucket{labels} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(pairs)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# Process wide registry
+REGISTRY = MetricsRegistry()
+
+
+def collect_metrics_folder(metrics_dir: str) -> MetricsRegistry:
+    """
+    Merge all snapshots found in metrics_dir into a new registry.
+    """
+    merged = MetricsRegistry()
+    if not os.path.isdir(metrics_dir):
+        return merged
+    for fname in sorted(os.listdir(metrics_dir)):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, fname), "r", encoding="utf-8") as f:
+                merged.load(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+def accumulate_snapshot(path: str, registry: MetricsRegistry) -> MetricsRegistry:
+    """
+    Add registry values to the snapshot stored at path, under a file lock.
+    Used by short lived processes (CLI) to keep counters across runs.
+    Returns the accumulated registry.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    accumulated = MetricsRegistry()
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.isfile(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        accumulated.load(json.load(f))
+                except ValueError:
+                    pass
+            accumulated.load(registry.snapshot())
+            accumulated.dump(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return accumulated
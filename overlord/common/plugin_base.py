@@ -2,6 +2,7 @@
 
 from typing import Any, Dict, List
 from common.errors import PluginError
+from common.merkle import deep_diff
 
 
 class BasePlugin:
@@ -10,11 +11,28 @@ class BasePlugin:
     Optional.
     """
 
+    # Actions that may run as background jobs when requested (see common/jobs.py)
+    ASYNC_ACTIONS: List[str] = []
+    # Async actions saving the inventory: their jobs run one at a time in a
+    # process, each loading the inventory saved by the previous one
+    SERIAL_ACTIONS: List[str] = []
+
     def __init__(self, action_args, config, logger, global_args):
         self.action_args = action_args or []
         self.config = config or {}
         self.logger = logger
         self.global_args = global_args or {}
+        # Set to a JobContext when running as a background job
+        self.job = None
+
+    # Report job progress and log lines, no-ops when not running as a job
+    def job_log(self, message: str):
+        if self.job is not None:
+            self.job.log(message)
+
+    def job_progress(self, current: int, total: int = None, message: str = None):
+        if self.job is not None:
+            self.job.progress(current, total, message)
 
     # Allow nested value update
     def set_deep(self, data: dict, path: str, value: Any):
@@ -46,11 +64,11 @@ class BasePlugin:
     # Deep path setter 
     # ------------------------------------------------------------
 
-    def set_deep_path(root: Dict[str, Any], path: str, value: Any) -> None:
+    def set_deep_path(self, root: Dict[str, Any], path: str, value: Any) -> None:
         """
         Set a value in a nested dict using a dot-separated path.
         Example:
-            set_deep_path(data, "vars.networks.admin.ip", "10.0.0.1")
+            self.set_deep_path(data, "vars.networks.admin.ip", "10.0.0.1")
         """
         keys = path.split(".")
         d = root
@@ -65,7 +83,7 @@ class BasePlugin:
     # Deep merge
     # ------------------------------------------------------------
 
-    def deep_merge(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    def deep_merge(self, a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
         """
         Recursively merge dict b into dict a.
         Values in b override values in a.
@@ -78,7 +96,7 @@ class BasePlugin:
                 and isinstance(result[key], dict)
                 and isinstance(value, dict)
             ):
-                result[key] = deep_merge(result[key], value)
+                result[key] = self.deep_merge(result[key], value)
             else:
                 result[key] = value
         return result
@@ -88,44 +106,8 @@ class BasePlugin:
     # Deep diff
     # ------------------------------------------------------------
 
-    def deep_diff(a: Any, b: Any) -> Any:
+    def deep_diff(self, a: Any, b: Any) -> Any:
         """
-        Compute a recursive diff between a and b.
-
-        Returns a structure describing:
-        - added keys
-        - removed keys
-        - changed values
-
-        Examples:
-        deep_diff({"x":1}, {"x":2})
-            -> {"x": {"from":1, "to":2}}
-
-        deep_diff({"a":1}, {"a":1})
-            -> None
-
-        deep_diff({"a":1}, {"a":1, "b":2})
-            -> {"b": {"added":2}}
+        Compute a recursive diff between a and b, see common.merkle.deep_diff.
         """
-        # Both dicts → recurse
-        if isinstance(a, dict) and isinstance(b, dict):
-            diff: Dict[str, Any] = {}
-            keys = set(a.keys()) | set(b.keys())
-
-            for key in keys:
-                if key not in a:
-                    diff[key] = {"added": b[key]}
-                elif key not in b:
-                    diff[key] = {"removed": a[key]}
-                else:
-                    sub = deep_diff(a[key], b[key])
-                    if sub not in (None, {}):
-                        diff[key] = sub
-
-            return diff or None
-
-        # Scalars → compare directly
-        if a != b:
-            return {"from": a, "to": b}
-
-        return None
\ No newline at end of file
+        return deep_diff(a, b)
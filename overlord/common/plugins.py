@@ -1,7 +1,13 @@
 import os
+import ast
+import json
 import importlib.util
 import yaml
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.files import load_yaml_file
+
+MANIFEST_FILE = "plugins_manifest.json"
 
 def discover_plugins(plugins_path: str) -> List[Tuple[str, str, str]]:
     """
@@ -51,3 +57,162 @@ def load_plugin_metadata(plugin_dir: str) -> Dict[str, Any]:
         data = yaml.safe_load(f) or {}
 
     return data
+
+
+# -------------------------
+# Plugins manifest
+# -------------------------
+
+def plugin_cli_actions(main_path: str) -> List[str]:
+    """
+    CLI actions of a plugin, read from the SUPPORTED_ACTIONS list literal of
+    its main.py without importing it. Empty if there is none.
+    """
+    try:
+        with open(main_path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=main_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Assign)
+            and any(isinstance(t, ast.Name) and t.id == "SUPPORTED_ACTIONS" for t in node.targets)
+            and isinstance(node.value, (ast.List, ast.Tuple))
+        ):
+            return [e.value for e in node.value.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    return []
+
+
+def scan_plugins(plugins_path: str) -> Dict[str, Any]:
+    """
+    Scan plugins_path once and describe every plugin found.
+
+    Layout: <plugins_path>/<section>/<plugin>/
+      main.py, main_ui.py, main_api.py, config.yml, metadata.yml, templates/
+
+    Returns a manifest:
+    {
+      "plugins_path": ...,
+      "signature": { path: mtime_ns },  # what the manifest depends on
+      "plugins": { "section/plugin": { ... } },
+    }
+    No plugin module is imported here.
+    """
+    plugins_path = os.path.abspath(plugins_path)
+    manifest = {"plugins_path": plugins_path, "signature": {}, "plugins": {}}
+    if not os.path.isdir(plugins_path):
+        return manifest
+
+    signature = manifest["signature"]
+    signature[plugins_path] = os.stat(plugins_path).st_mtime_ns
+
+    for section in sorted(os.listdir(plugins_path)):
+        section_path = os.path.join(plugins_path, section)
+        if not os.path.isdir(section_path):
+            continue
+        signature[section_path] = os.stat(section_path).st_mtime_ns
+
+        for plugin_name in sorted(os.listdir(section_path)):
+            plugin_path = os.path.join(section_path, plugin_name)
+            if not os.path.isdir(plugin_path):
+                continue
+            signature[plugin_path] = os.stat(plugin_path).st_mtime_ns
+            files = os.listdir(plugin_path)
+
+            # Config and metadata content changes do not update directory mtime
+            config = {}
+            if "config.yml" in files:
+                config_path = os.path.join(plugin_path, "config.yml")
+                signature[config_path] = os.stat(config_path).st_mtime_ns
+                config = load_yaml_file(config_path) or {}
+            if "metadata.yml" in files:
+                metadata_path = os.path.join(plugin_path, "metadata.yml")
+                signature[metadata_path] = os.stat(metadata_path).st_mtime_ns
+            # CLI actions, for shell completion
+            actions = []
+            if "main.py" in files:
+                main_path = os.path.join(plugin_path, "main.py")
+                signature[main_path] = os.stat(main_path).st_mtime_ns
+                actions = plugin_cli_actions(main_path)
+
+            manifest["plugins"][f"{section}/{plugin_name}"] = {
+                "section": section,
+                "plugin": plugin_name,
+                "path": plugin_path,
+                "main": "main.py" in files,
+                "actions": actions,
+                "main_ui": "main_ui.py" in files,
+                "main_api": "main_api.py" in files,
+                "templates": os.path.join(plugin_path, "templates") if "templates" in files else None,
+                "config": config,
+                "ui_integration": config.get("ui_integration"),
+                "metadata": load_plugin_metadata(plugin_path),
+            }
+
+    return manifest
+
+
+def manifest_is_fresh(manifest: Dict[str, Any], plugins_path: str) -> bool:
+    """
+    A manifest is fresh if none of the directories and config files it was
+    built from changed. Adding or removing a plugin (or a plugin file)
+    updates its parent directory mtime, so a stat per entry is enough.
+    """
+    if manifest.get("plugins_path") != os.path.abspath(plugins_path):
+        return False
+    for path, mtime_ns in manifest.get("signature", {}).items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime_ns:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def load_plugin_manifest(plugins_path: str, cache_dir: Optional[str] = None, logger=None) -> Dict[str, Any]:
+    """
+    Return the plugins manifest, from cache_dir if still fresh,
+    otherwise scan plugins_path and refresh the cache.
+    """
+    cache_path = os.path.join(cache_dir, MANIFEST_FILE) if cache_dir else None
+
+    if cache_path and os.path.isfile(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest_is_fresh(manifest, plugins_path):
+                if logger:
+                    logger.debug("Using cached plugins manifest %s", cache_path)
+                return manifest
+        except (OSError, ValueError):
+            pass
+
+    if logger:
+        logger.debug("Scanning plugins in %s", plugins_path)
+    manifest = scan_plugins(plugins_path)
+
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            if logger:
+                logger.warning("Unable to write plugins manifest cache: %s", e)
+
+    return manifest
+
+
+def enabled_plugins(manifest: Dict[str, Any], enabled: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Return manifest entries, restricted to the "section/plugin" list
+    in enabled if provided.
+    """
+    entries = []
+    for key, entry in manifest.get("plugins", {}).items():
+        if enabled is not None and key not in enabled:
+            continue
+        entries.append(entry)
+    return entries
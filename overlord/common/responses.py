@@ -3,3 +3,15 @@
 from typing import Any, Dict, Optional
 
 
+def etag_response(result: Dict[str, Any], etag: Optional[str], if_none_match=None, status_code: int = 200):
+    """
+    flask_restful return value for a GET: result with an ETag header, or an
+    empty 304 when the client copy (If-None-Match) is still current.
+    if_none_match is flask request.if_none_match.
+    """
+    if etag is None:
+        return result, status_code
+    headers = {"ETag": f'"{etag}"'}
+    if if_none_match is not None and if_none_match.contains(etag):
+        return "", 304, headers
+    return result, status_code, headers
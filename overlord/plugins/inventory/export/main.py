@@ -0,0 +1,133 @@
+# plugins/inventory/export/main.py
+
+from common.generators import GENERATORS, get_generator, run_generators
+from common.inventory import AnsibleInventory
+from common.plugin_base import BasePlugin
+
+
+class Plugin(BasePlugin):
+
+    ASYNC_ACTIONS = ["render"]
+
+    def __init__(self, action_args, config, logger, global_args):
+        """
+        action_args: list of tokens, e.g. ["render", "hosts", "dns"]
+        config: plugin-specific config (unused for now, see generators: in overlord config)
+        logger: shared logger
+        global_args: dict with context (diff, check, inventory_root, etc.)
+        """
+        super().__init__(action_args, config, logger, global_args)
+        # Generators read working_folder from overlord config, follow CLI override
+        self.overlord_config = dict(
+            self.global_args.get("config") or {},
+            working_folder=self.global_args["working_folder"],
+        )
+
+######################## CLI ENTRY POINT ########################
+
+    def cli_execute(self):
+        """
+        CLI entry: parse self.action_args, build a payload, and delegate to execute().
+        """
+
+        self.logger.debug("Entering CLI export plugin")
+        ##################### CHECKS
+
+        # We define supported actions, to be filtered later
+        SUPPORTED_ACTIONS = ["list", "get", "render"]
+        # Check there is action
+        if not self.action_args:
+            return self.api_error("No action specified. Use: " + str(SUPPORTED_ACTIONS))
+
+        action = self.action_args[0]
+        # Check action is allowed by plugin
+        if action not in SUPPORTED_ACTIONS:
+            return self.api_error(f"Unsupported action '{action}'. Allowed actions: '{str(SUPPORTED_ACTIONS)}'")
+
+        ##################### FILTER ACTION AND BUILD PAYLOAD
+
+        args = self.action_args[1:]
+        if action == "list":
+            payload = {}
+
+        elif action == "get":
+            if not args:
+                return self.api_error("get requires a generator name")
+            payload = {args[0]}
+
+        elif action == "render":
+            # render [--force] [GENERATOR...], all generators by default
+            payload = {
+                "generators": [a for a in args if a != "--force"],
+                "force": "--force" in args,
+            }
+
+        ##################### EXECUTE
+
+        try:
+            return self.execute(action, payload)
+        except Exception as e:
+            self.logger.exception("Error in export plugin")
+            return self.api_error(str(e))
+
+######################## EXECUTE AND ACTIONS ########################
+
+    def execute(self, action, payload):
+        """
+        Programmatic entry: used by cli_run and REST API.
+        payload structure depends on action:
+
+        - list: {}
+        - get: { "dns" }
+        - render: { "generators": ["hosts", "dns"], "force": false }, all generators if empty
+        """
+
+        if action == "list":
+            return self.action_list(payload)
+        elif action == "get":
+            return self.action_get(payload)
+        elif action == "render":
+            return self.action_render(payload)
+        return self.api_error(f"Unknown action: {action}")
+
+    def describe(self, name):
+        generator = get_generator(self.overlord_config, name, self.logger)
+        on_save = (self.overlord_config.get("generators") or {}).get("on_save") or []
+        return {
+            "name": name,
+            "description": generator.description,
+            "output_folder": generator.output_folder,
+            "on_save": name in on_save,
+            "last_report": generator.last_report(),
+        }
+
+    def action_list(self, payload):
+        return self.api_ok(data={"generators": [self.describe(name) for name in sorted(GENERATORS)]})
+
+    def action_get(self, payload):
+        name = next(iter(payload))
+        return self.api_ok(data={"generator": self.describe(name)})
+
+    def action_render(self, payload):
+        names = payload.get("generators") or sorted(GENERATORS)
+        for name in names:
+            # Fail before rendering anything on unknown names
+            get_generator(self.overlord_config, name, self.logger)
+
+        inventory = AnsibleInventory(
+            inventory_root=self.global_args['inventory_root'],
+            working_folder=self.global_args['working_folder'],
+            logger=self.logger,
+        )
+        reports = []
+        for index, name in enumerate(names):
+            self.job_progress(index, len(names), f"Rendering {name}")
+            report = run_generators(inventory, self.overlord_config, [name],
+                                    force=bool(payload.get("force")), logger=self.logger)[0]
+            self.job_log(f"{name}: {report['changed_hosts']} host(s) changed, "
+                         f"{len(report['written'])} file(s) written, {len(report['removed'])} removed")
+            reports.append(report)
+        self.job_progress(len(names), len(names))
+
+        written = sum(len(r["written"]) for r in reports)
+        return self.api_ok(data={"reports": reports}, message=f"{written} file(s) written")
@@ -0,0 +1,112 @@
+# plugins/inventory/export/main_api.py
+
+from typing import Any, Dict
+
+from flask import (
+    Blueprint,
+    request,
+    current_app,
+)
+from flask_restful import Api, Resource
+
+from common.files import load_yaml_file
+from common.jobs import async_requested, dispatch_action
+from common.logging import configure_logging
+
+# Import plugin logic
+from plugins.inventory.export.main import Plugin as ExportPlugin
+
+blueprint = Blueprint(
+    "inventory_export_api",
+    __name__,
+    template_folder="templates",
+)
+api = Api(blueprint)
+
+
+def call_plugin(action: str, payload: Dict[str, Any], run_async: bool = False) -> Dict[str, Any]:
+    """
+    Instantiate ExportPlugin and execute a specific action with payload.
+    With run_async, allowed actions are submitted as background jobs.
+    """
+    cfg = current_app.config.get("OVERLORD_CONFIG", {})
+
+    # Get logger
+    log_level = cfg.get("log_level", "INFO")
+    log_file = cfg.get("log_file")
+    logger = configure_logging(log_file, log_level)
+
+    # Get plugin config
+    plugins_path = cfg.get("plugins_path", "./plugins")
+    config_path = f"{plugins_path}/inventory/export/config.yml"
+    try:
+        plugin_config = load_yaml_file(config_path) or {}
+    except FileNotFoundError:
+        plugin_config = {}
+
+    # Build global context to pass to plugin
+    global_ctx = {
+        "diff": False,
+        "check": False,
+        "debug": cfg.get("log_level", "INFO").upper() == "DEBUG",
+        "inventory_root": cfg.get("inventory_path"),
+        "working_folder": cfg.get("working_folder"),
+        "section": "inventory",
+        "plugin": "export",
+        "config": cfg,
+    }
+
+    plugin_args = {
+        "action_args": [action],
+        "config": plugin_config,
+        "logger": logger,
+        "global_args": global_ctx,
+    }
+
+    # Ok ready to call plugin, it is instantiated where the action runs
+    return dispatch_action(ExportPlugin, plugin_args, action, payload, run_async)
+
+
+################## REST API ##################
+
+
+class ExportListResource(Resource):
+    def get(self):
+        result = call_plugin("list", {})
+        status_code = 200 if result.get("status") == "ok" else 400
+        return result, status_code
+
+
+class ExportRenderResource(Resource):
+    def post(self):
+        """
+        Render generators, add ?async=1 to run it in background.
+        Payload, all optional:
+        {
+          "generators": ["hosts", "dns"],
+          "force": false
+        }
+        """
+        data = request.get_json(force=True, silent=True) or {}
+        if not isinstance(data, dict):
+            return {
+                "status": "error",
+                "message": "JSON payload must be an object",
+            }, 400
+        result = call_plugin("render", data, async_requested(request.args))
+        if "job_id" in result.get("data", {}):
+            return result, 202
+        status_code = 200 if result.get("status") == "ok" else 400
+        return result, status_code
+
+
+class ExportResource(Resource):
+    def get(self, name: str):
+        result = call_plugin("get", {name})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+api.add_resource(ExportListResource, "/api/v1/inventory/export")
+api.add_resource(ExportRenderResource, "/api/v1/inventory/export/render")
+api.add_resource(ExportResource, "/api/v1/inventory/export/<string:name>")
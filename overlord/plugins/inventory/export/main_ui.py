@@ -0,0 +1,21 @@
+# plugins/inventory/export/main_ui.py
+
+from flask import (
+    Blueprint,
+    render_template,
+)
+
+blueprint = Blueprint(
+    "inventory_export",
+    __name__,
+    template_folder="templates",
+)
+
+####################### HTML ENDPOINT #######################
+
+@blueprint.route("/inventory/export")
+def export_page():
+    return render_template(
+        "export/index.j2",
+        current_section="inventory",
+    )
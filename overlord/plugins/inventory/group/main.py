@@ -7,6 +7,10 @@ import json
 
 
 class Plugin(BasePlugin):
+
+    ASYNC_ACTIONS = ["add", "update", "delete", "add_hosts", "delete_hosts"]
+    SERIAL_ACTIONS = ASYNC_ACTIONS
+
     def __init__(self, action_args, config, logger, global_args):
         """
         Inventory groups management plugin.
@@ -204,7 +208,9 @@ class Plugin(BasePlugin):
                 return self.api_error(f"Group {groupname} not found")
             output[groupname] = group_data
 
-        return self.api_ok(data={"groups": output})
+        # Merkle hashes of returned groups, used as ETags by the API
+        hashes = {name: self.inventory.leaf_hash("groups", name) for name in output}
+        return self.api_ok(data={"groups": output, "hashes": hashes})
 
     def action_update(self, payload):
         for groupname, group_data in payload.items():
@@ -240,8 +246,9 @@ class Plugin(BasePlugin):
                 return self.api_error(f"Group {groupname} not found")
             inventory_group_data = self.inventory.get_group(groupname)
             # Add new hosts and make sure no duplicates
-            inventory_group_data["hosts"] = list(set(inventory_group_data["hosts"] + group_data["hosts"]))
-            self.inventory.update_group(groupname, inventory_group_data["hosts"], inventory_group_data["vars"])
+            # Build a new list, so inventory can see what changed
+            hosts = inventory_group_data["hosts"] + [h for h in group_data["hosts"] if h not in inventory_group_data["hosts"]]
+            self.inventory.update_group(groupname, hosts)
         self.inventory.save()
 
         return self.api_ok(message=f"{len(payload)} groups(s) updated")
@@ -256,8 +263,8 @@ class Plugin(BasePlugin):
                 return self.api_error(f"Group {groupname} not found")
             inventory_group_data = self.inventory.get_group(groupname)
             # Remove hosts and handle if not exist (aka skip if not exist)
-            inventory_group_data["hosts"] = list(set(inventory_group_data["hosts"]) - set(group_data["hosts"]))
-            self.inventory.update_group(groupname, inventory_group_data["hosts"], inventory_group_data["vars"])
+            hosts = [h for h in inventory_group_data["hosts"] if h not in group_data["hosts"]]
+            self.inventory.update_group(groupname, hosts)
         self.inventory.save()
 
         return self.api_ok(message=f"{len(payload)} groups(s) updated")
\ No newline at end of file
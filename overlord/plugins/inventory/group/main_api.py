@@ -6,7 +6,9 @@ from flask_restful import Api, Resource
 
 
 from common.files import load_yaml_file
+from common.jobs import async_requested, dispatch_action
 from common.logging import configure_logging
+from common.responses import etag_response
 from typing import Any, Dict
 
 # Import plugin logic
@@ -21,9 +23,10 @@ api = Api(blueprint)
 
 
 
-def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+def call_plugin(action: str, payload: Dict[str, Any], run_async: bool = False) -> Dict[str, Any]:
     """
     Instantiate GroupPlugin and execute a specific action with payload.
+    With run_async, allowed actions are submitted as background jobs.
     """
     cfg = current_app.config.get("OVERLORD_CONFIG", {})
 
@@ -52,16 +55,15 @@ def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "config": cfg,
     }
 
-    # Ok ready to call plugin, init it
-    plugin = GroupPlugin(
-        action_args=[action],
-        config=plugin_config,
-        logger=logger,
-        global_args=global_ctx,
-    )
+    plugin_args = {
+        "action_args": [action],
+        "config": plugin_config,
+        "logger": logger,
+        "global_args": global_ctx,
+    }
 
-    # All went well, execute with payload and action
-    return plugin.execute(action, payload)
+    # Ok ready to call plugin, it is instantiated where the action runs
+    return dispatch_action(GroupPlugin, plugin_args, action, payload, run_async)
 
 # ------------------------------------------------------------
 # /api/v1/inventory/group
@@ -101,7 +103,7 @@ class GroupListResource(Resource):
 
         payload = data
 
-        result = call_plugin("add", payload)
+        result = call_plugin("add", payload, async_requested(request.args))
         status_code = 201 if result.get("status") == "ok" else 400
         return result, status_code
 
@@ -112,8 +114,9 @@ class GroupResource(Resource):
     def get(self, groupname):
         payload = {groupname}
         result = call_plugin("get", payload)
-        status_code = 200 if result.get("status") == "ok" else 404
-        return result, status_code
+        if result.get("status") != "ok":
+            return result, 404
+        return etag_response(result, result["data"]["hashes"][groupname], request.if_none_match)
 
     def put(self, groupname):
         """
@@ -133,13 +136,13 @@ class GroupResource(Resource):
             }, 400
 
         payload = {groupname: data}
-        result = call_plugin("update", payload)
+        result = call_plugin("update", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
     def delete(self, groupname: str):
         payload = {groupname}
-        result = call_plugin("delete", payload)
+        result = call_plugin("delete", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 404
         return result, status_code
 
@@ -169,14 +172,14 @@ class GroupHostsResource(Resource):
             }, 400
 
         payload = {groupname: {"hosts": [data["host"]]}}
-        result = call_plugin("add_hosts", payload)
+        result = call_plugin("add_hosts", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
     def delete(self, groupname: str):
         data = request.get_json(force=True, silent=True)
         payload = {groupname: {"hosts": [data["host"]]}}
-        result = call_plugin("delete_hosts", payload)
+        result = call_plugin("delete_hosts", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 404
         return result, status_code
 
@@ -0,0 +1,127 @@
+# plugins/inventory/history/main.py
+
+import sys
+
+from common.history import InventoryHistory
+from common.inventory import rollback_inventory
+from common.plugin_base import BasePlugin
+
+
+class Plugin(BasePlugin):
+    def __init__(self, action_args, config, logger, global_args):
+        """
+        action_args: list of tokens, e.g. ["diff", "HEAD~1", "HEAD"]
+        config: plugin-specific config (unused for now)
+        logger: shared logger
+        global_args: dict with context (diff, check, inventory_root, etc.)
+        """
+        super().__init__(action_args, config, logger, global_args)
+        self.history = InventoryHistory(self.global_args['working_folder'])
+
+######################## CLI ENTRY POINT ########################
+
+    def cli_execute(self):
+        """
+        CLI entry: parse self.action_args, build a payload, and delegate to execute().
+        """
+
+        self.logger.debug("Entering CLI history plugin")
+        ##################### CHECKS
+
+        # We define supported actions, to be filtered later
+        SUPPORTED_ACTIONS = ["list", "show", "diff", "changes", "rollback"]
+        # Check there is action
+        if not self.action_args:
+            return self.api_error("No action specified. Use: " + str(SUPPORTED_ACTIONS))
+
+        action = self.action_args[0]
+        # Check action is allowed by plugin
+        if action not in SUPPORTED_ACTIONS:
+            return self.api_error(f"Unsupported action '{action}'. Allowed actions: '{str(SUPPORTED_ACTIONS)}'")
+
+        ##################### FILTER ACTION AND BUILD PAYLOAD
+
+        args = self.action_args[1:]
+        if action == "list":
+            # Optional number of commits
+            payload = {"limit": int(args[0])} if args else {}
+
+        elif action in ("show", "rollback"):
+            if not args:
+                return self.api_error(f"{action} requires a commit id")
+            payload = {args[0]}
+
+        elif action in ("diff", "changes"):
+            # diff COMMIT: changes of this commit, diff FROM TO: between two commits
+            if not args:
+                return self.api_error(f"{action} requires a commit id, or two")
+            payload = {"from": args[0], "to": args[1]} if len(args) > 1 else {"to": args[0]}
+
+        ##################### EXECUTE
+
+        try:
+            result = self.execute(action, payload)
+        except Exception as e:
+            self.logger.exception("Error in history plugin")
+            return self.api_error(str(e))
+
+        # Diffs are printed as is, like git does
+        if action in ("show", "diff") and result.get("status") == "ok":
+            data = result["data"]
+            sys.stdout.write(data["diff"])
+            return self.api_ok(message=f"{len(data['changes'])} file(s) changed")
+        return result
+
+######################## EXECUTE AND ACTIONS ########################
+
+    def execute(self, action, payload):
+        """
+        Programmatic entry: used by cli_run and REST API.
+        payload structure depends on action:
+
+        - list: {} or { "limit": 50 }
+        - show: { "HEAD" }, commit and its changes
+        - diff: { "from": "HEAD~3", "to": "HEAD" }, "from" defaults to parent of "to"
+        - changes: same as diff, structured diff of hosts, groups and group var files
+        - rollback: { "3f2a9c" }, commit id or unique prefix
+        """
+
+        if action == "list":
+            return self.action_list(payload)
+        elif action == "show":
+            return self.action_show(payload)
+        elif action == "diff":
+            return self.action_diff(payload)
+        elif action == "changes":
+            return self.action_changes(payload)
+        elif action == "rollback":
+            return self.action_rollback(payload)
+        return self.api_error(f"Unknown action: {action}")
+
+    def action_list(self, payload):
+        commits = self.history.log(int(payload.get("limit", 50)))
+        return self.api_ok(data={"head": self.history.head(), "commits": commits})
+
+    def action_show(self, payload):
+        commit = self.history.get(next(iter(payload)))
+        output = self.history.diff(None, commit["id"])
+        output["commit"] = {k: v for k, v in commit.items() if k != "tree"}
+        return self.api_ok(data=output)
+
+    def action_diff(self, payload):
+        return self.api_ok(data=self.history.diff(payload.get("from"), payload["to"]))
+
+    def action_changes(self, payload):
+        return self.api_ok(data=self.history.model_diff(payload.get("from"), payload["to"]))
+
+    def action_rollback(self, payload):
+        result = rollback_inventory(
+            self.global_args['inventory_root'],
+            self.global_args['working_folder'],
+            next(iter(payload)),
+            self.logger,
+        )
+        return self.api_ok(
+            data=result,
+            message=f"Rolled back to {result['target'][:12]}, {len(result['changes'])} file(s) rewritten",
+        )
@@ -0,0 +1,120 @@
+# plugins/inventory/history/main_api.py
+
+from typing import Any, Dict
+
+from flask import (
+    Blueprint,
+    request,
+    current_app,
+)
+from flask_restful import Api, Resource
+
+from common.files import load_yaml_file
+from common.logging import configure_logging
+
+# Import plugin logic
+from plugins.inventory.history.main import Plugin as HistoryPlugin
+
+blueprint = Blueprint(
+    "inventory_history_api",
+    __name__,
+    template_folder="templates",
+)
+api = Api(blueprint)
+
+
+def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Instantiate HistoryPlugin and execute a specific action with payload.
+    """
+    cfg = current_app.config.get("OVERLORD_CONFIG", {})
+
+    # Get logger
+    log_level = cfg.get("log_level", "INFO")
+    log_file = cfg.get("log_file")
+    logger = configure_logging(log_file, log_level)
+
+    # Get plugin config
+    plugins_path = cfg.get("plugins_path", "./plugins")
+    config_path = f"{plugins_path}/inventory/history/config.yml"
+    try:
+        plugin_config = load_yaml_file(config_path) or {}
+    except FileNotFoundError:
+        plugin_config = {}
+
+    # Build global context to pass to plugin
+    global_ctx = {
+        "diff": False,
+        "check": False,
+        "debug": cfg.get("log_level", "INFO").upper() == "DEBUG",
+        "inventory_root": cfg.get("inventory_path"),
+        "working_folder": cfg.get("working_folder"),
+        "section": "inventory",
+        "plugin": "history",
+        "config": cfg,
+    }
+
+    # Ok ready to call plugin, init it
+    plugin = HistoryPlugin(
+        action_args=[action],
+        config=plugin_config,
+        logger=logger,
+        global_args=global_ctx,
+    )
+
+    # All went well, execute with payload and action
+    return plugin.execute(action, payload)
+
+
+################## REST API ##################
+
+
+class HistoryListResource(Resource):
+    def get(self):
+        payload = {}
+        if request.args.get("limit"):
+            payload["limit"] = request.args.get("limit")
+        result = call_plugin("list", payload)
+        status_code = 200 if result.get("status") == "ok" else 400
+        return result, status_code
+
+
+class HistoryCommitResource(Resource):
+    def get(self, commit_id: str):
+        result = call_plugin("show", {commit_id})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+class HistoryDiffResource(Resource):
+    def get(self, commit_id: str):
+        """
+        Diff of commit_id against ?from=<commit>, its parent by default.
+        """
+        result = call_plugin("diff", {"from": request.args.get("from"), "to": commit_id})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+class HistoryChangesResource(Resource):
+    def get(self, commit_id: str):
+        """
+        Structured diff of commit_id against ?from=<commit>, its parent by default.
+        """
+        result = call_plugin("changes", {"from": request.args.get("from"), "to": commit_id})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+class HistoryRollbackResource(Resource):
+    def post(self, commit_id: str):
+        result = call_plugin("rollback", {commit_id})
+        status_code = 200 if result.get("status") == "ok" else 400
+        return result, status_code
+
+
+api.add_resource(HistoryListResource, "/api/v1/inventory/history")
+api.add_resource(HistoryCommitResource, "/api/v1/inventory/history/<string:commit_id>")
+api.add_resource(HistoryDiffResource, "/api/v1/inventory/history/<string:commit_id>/diff")
+api.add_resource(HistoryChangesResource, "/api/v1/inventory/history/<string:commit_id>/changes")
+api.add_resource(HistoryRollbackResource, "/api/v1/inventory/history/<string:commit_id>/rollback")
@@ -0,0 +1,29 @@
+# plugins/inventory/history/main_ui.py
+
+from flask import (
+    Blueprint,
+    render_template,
+)
+
+blueprint = Blueprint(
+    "inventory_history",
+    __name__,
+    template_folder="templates",
+)
+
+####################### HTML ENDPOINT #######################
+
+@blueprint.route("/inventory/history")
+def history_page():
+    return render_template(
+        "history/list.j2",
+        current_section="inventory",
+    )
+
+@blueprint.route("/inventory/history/<string:commit_id>")
+def history_commit_page(commit_id: str):
+    return render_template(
+        "history/commit.j2",
+        current_section="inventory",
+        commit_id=commit_id,
+    )
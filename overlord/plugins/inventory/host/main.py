@@ -6,6 +6,10 @@ from common.inventory import AnsibleInventory
 from common.plugin_base import BasePlugin
 
 class Plugin(BasePlugin):
+
+    ASYNC_ACTIONS = ["add", "update", "delete"]
+    SERIAL_ACTIONS = ASYNC_ACTIONS
+
     def __init__(self, action_args, config, logger, global_args):
         """
         action_args: list of tokens, e.g. ["add", "c001", '{"c001": {"alias": "compute-1"}}']
@@ -159,8 +163,10 @@ class Plugin(BasePlugin):
 
     # Support for multiple add to be added in cli parse later
     def action_add(self, payload):
-        for hostname, host_data in payload.items():
+        for i, (hostname, host_data) in enumerate(payload.items()):
+            self.job_progress(i, len(payload), f"Adding host {hostname}")
             self.inventory.add_host(hostname, host_data or {})
+        self.job_log("Saving inventory")
         self.inventory.save()
 
         return self.api_ok(message=f"Added {len(payload)} host(s)")
@@ -173,7 +179,9 @@ class Plugin(BasePlugin):
                 return self.api_error(f"Host {hostname} not found")
             output[hostname] = host_data
 
-        return self.api_ok(data={"hosts": output})
+        # Merkle hashes of returned hosts, used as ETags by the API
+        hashes = {name: self.inventory.leaf_hash("hosts", name) for name in output}
+        return self.api_ok(data={"hosts": output, "hashes": hashes})
 
     def action_update(self, payload):
         for hostname, host_data in payload.items():
@@ -189,10 +197,12 @@ class Plugin(BasePlugin):
         return self.api_ok(message=f"Host {hostname} updated")
 
     def action_delete(self, payload):
-        for hostname in payload:
+        for i, hostname in enumerate(payload):
             if self.inventory.get_host(hostname) is None:
                 return self.api_error(f"Host {hostname} not found")
+            self.job_progress(i, len(payload), f"Deleting host {hostname}")
             self.inventory.delete_host(hostname)
+        self.job_log("Saving inventory")
         self.inventory.save()
 
         return self.api_ok(message=f"Host {hostname} deleted")
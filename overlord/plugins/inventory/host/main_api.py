@@ -12,7 +12,9 @@ from flask import (
 from flask_restful import Api, Resource
 
 from common.files import load_yaml_file
+from common.jobs import async_requested, dispatch_action
 from common.logging import configure_logging
+from common.responses import etag_response
 
 # Import plugin logic
 from plugins.inventory.host.main import Plugin as HostPlugin
@@ -25,9 +27,10 @@ blueprint = Blueprint(
 api = Api(blueprint)
 
 
-def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+def call_plugin(action: str, payload: Dict[str, Any], run_async: bool = False) -> Dict[str, Any]:
     """
     Instantiate HostPlugin and execute a specific action with payload.
+    With run_async, allowed actions are submitted as background jobs.
     """
     cfg = current_app.config.get("OVERLORD_CONFIG", {})
 
@@ -56,16 +59,15 @@ def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "config": cfg,
     }
 
-    # Ok ready to call plugin, init it
-    plugin = HostPlugin(
-        action_args=[action],
-        config=plugin_config,
-        logger=logger,
-        global_args=global_ctx,
-    )
+    plugin_args = {
+        "action_args": [action],
+        "config": plugin_config,
+        "logger": logger,
+        "global_args": global_ctx,
+    }
 
-    # All went well, execute with payload and action
-    return plugin.execute(action, payload)
+    # Ok ready to call plugin, it is instantiated where the action runs
+    return dispatch_action(HostPlugin, plugin_args, action, payload, run_async)
 
 
 ################## REST API ##################
@@ -96,7 +98,7 @@ class HostListResource(Resource):
             }, 400
 
         payload = data
-        result = call_plugin("add", payload)
+        result = call_plugin("add", payload, async_requested(request.args))
         status_code = 201 if result.get("status") == "ok" else 400
         return result, status_code
 
@@ -105,8 +107,9 @@ class HostResource(Resource):
     def get(self, hostname: str):
         payload = {hostname}
         result = call_plugin("get", payload)
-        status_code = 200 if result.get("status") == "ok" else 404
-        return result, status_code
+        if result.get("status") != "ok":
+            return result, 404
+        return etag_response(result, result["data"]["hashes"][hostname], request.if_none_match)
 
     def put(self, hostname: str):
         """
@@ -128,13 +131,13 @@ class HostResource(Resource):
             }, 400
 
         payload = {hostname: data}
-        result = call_plugin("update", payload)
+        result = call_plugin("update", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
     def delete(self, hostname: str):
         payload = {hostname}
-        result = call_plugin("delete", payload)
+        result = call_plugin("delete", payload, async_requested(request.args))
         status_code = 200 if result.get("status") == "ok" else 404
         return result, status_code
 
@@ -39,10 +39,13 @@ class Plugin(BasePlugin):
         - get: { "net-admin" }
         - update: { "net-admin": { ... } }
         - delete: { "net-admin" }
+        - hashes: {}, Merkle root hash and per kind hashes of the inventory model
         """
 
         if action == "get":
             return self.action_get(payload)
+        elif action == "hashes":
+            return self.action_hashes(payload)
 
     def action_get(self, payload):
 
@@ -50,3 +53,7 @@ class Plugin(BasePlugin):
         inventory['inventory_root'] = self.global_args['inventory_root']
         
         return self.api_ok(data=inventory)
+
+    def action_hashes(self, payload):
+        root, nodes = self.inventory.merkle_tree()
+        return self.api_ok(data={"root": root, "kinds": nodes[root]})
@@ -0,0 +1,85 @@
+# plugins/inventory/inventory/main_api.py
+
+from typing import Any, Dict
+
+from flask import (
+    Blueprint,
+    request,
+    current_app,
+)
+from flask_restful import Api, Resource
+
+from common.files import load_yaml_file
+from common.logging import configure_logging
+from common.responses import etag_response
+
+# Import plugin logic
+from plugins.inventory.inventory.main import Plugin as InventoryPlugin
+
+blueprint = Blueprint(
+    "inventory_inventory_api",
+    __name__,
+)
+api = Api(blueprint)
+
+
+def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Instantiate plugin and execute a specific action with payload.
+    """
+    cfg = current_app.config.get("OVERLORD_CONFIG", {})
+
+    # Get logger
+    log_level = cfg.get("log_level", "INFO")
+    log_file = cfg.get("log_file")
+    logger = configure_logging(log_file, log_level)
+
+    # Get plugin config
+    plugins_path = cfg.get("plugins_path", "./plugins")
+    config_path = f"{plugins_path}/inventory/inventory/config.yml"
+    try:
+        plugin_config = load_yaml_file(config_path) or {}
+    except FileNotFoundError:
+        plugin_config = {}
+
+    # Build global context to pass to plugin
+    global_ctx = {
+        "diff": False,
+        "check": False,
+        "debug": cfg.get("log_level", "INFO").upper() == "DEBUG",
+        "inventory_root": cfg.get("inventory_path"),
+        "working_folder": cfg.get("working_folder"),
+        "section": "inventory",
+        "plugin": "inventory",
+        "config": cfg,
+    }
+
+    # Ok ready to call plugin, init it
+    plugin = InventoryPlugin(
+        action_args=[action],
+        config=plugin_config,
+        logger=logger,
+        global_args=global_ctx,
+    )
+
+    # All went well, execute with payload and action
+    return plugin.execute(action, payload)
+
+
+################## REST API ##################
+
+
+class InventoryHashesResource(Resource):
+    def get(self):
+        """
+        Merkle root hash of the inventory model, and hashes of its hosts,
+        groups and group_vars subtrees. The root hash is the ETag, so
+        clients can poll with If-None-Match to detect any inventory change.
+        """
+        result = call_plugin("hashes", {})
+        if result.get("status") != "ok":
+            return result, 400
+        return etag_response(result, result["data"]["root"], request.if_none_match)
+
+
+api.add_resource(InventoryHashesResource, "/api/v1/inventory/hashes")
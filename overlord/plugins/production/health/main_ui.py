@@ -1,5 +1,8 @@
 # plugins/production/health/main_ui.py
 
+import fcntl
+import json
+import os
 from typing import Any, Dict
 
 from flask import (
@@ -21,12 +24,93 @@ blueprint = Blueprint(
     template_folder="templates",
 )
 
+
+def health_results_file(cfg: Dict[str, Any]) -> str:
+    return cfg.get("health", {}).get("results_file", "results.yaml")
+
+
+def host_health_state(data: Dict[str, Any]) -> str:
+    if data.get("inmaintenance", False):
+        return "maintenance"
+    if data.get("errors", False):
+        return "error"
+    return "ok"
+
+
+####################### CHANGE EVENTS #######################
+
+class HealthWatcher:
+    """
+    Event poller publishing health.state events when a host changes state.
+
+    Last known states are kept under working_folder, so that multiple
+    UI processes watching the same results file publish each transition once.
+    """
+
+    def __init__(self, results_file: str, working_folder: str):
+        self.results_file = results_file
+        self.states_file = os.path.join(working_folder, "health_states.json")
+        self.last_mtime = None
+
+    def __call__(self, journal):
+        try:
+            mtime = os.stat(self.results_file).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self.last_mtime:
+            return
+        self.last_mtime = mtime
+
+        results = load_yaml_file(self.results_file)
+        states = {}
+        for rack, hosts in results.items():
+            for host, data in (hosts or {}).items():
+                states[host] = {"rack": rack, "state": host_health_state(data or {})}
+
+        os.makedirs(os.path.dirname(self.states_file), exist_ok=True)
+        with open(self.states_file + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                previous = {}
+                if os.path.isfile(self.states_file):
+                    with open(self.states_file, "r", encoding="utf-8") as f:
+                        previous = json.load(f)
+
+                events = []
+                for host, current in states.items():
+                    before = previous.get(host, {}).get("state")
+                    if before != current["state"]:
+                        events.append(("health.state", {
+                            "host": host,
+                            "rack": current["rack"],
+                            "state": current["state"],
+                            "previous": before,
+                        }))
+
+                if states != previous:
+                    with open(self.states_file, "w", encoding="utf-8") as f:
+                        json.dump(states, f)
+                journal.publish_many(events)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@blueprint.record_once
+def register_health_watcher(state):
+    cfg = state.app.config.get("OVERLORD_CONFIG", {})
+    if not cfg.get("working_folder"):
+        return
+    state.app.config.setdefault("EVENT_POLLERS", []).append(
+        HealthWatcher(health_results_file(cfg), cfg["working_folder"])
+    )
+
 ####################### HTML ENDPOINT #######################
 
 @blueprint.route("/production/health/cluster_view")
 def health_cluster_view():
 
-    results = load_yaml_file("results.yaml")
+    cfg = current_app.config.get("OVERLORD_CONFIG", {})
+    results = load_yaml_file(health_results_file(cfg))
 
     return render_template(
         "health/cluster_view.j2",
@@ -37,7 +121,8 @@ def health_cluster_view():
 @blueprint.route("/production/health/cluster_view/<string:hostname>")
 def health_hostpage(hostname):
 
-    results = load_yaml_file("results.yaml")
+    cfg = current_app.config.get("OVERLORD_CONFIG", {})
+    results = load_yaml_file(health_results_file(cfg))
     host_result = {}
     for rack in results:
         for host in results[rack]:
@@ -1,31 +1,196 @@
-# plugins/inventory/network/main.py
+# plugins/production/playbook/main.py
 
+import argparse
+import fcntl
 import json
-
+import math
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from common.errors import NotFoundError, ValidationError
+from common.files import follow_file
 from common.inventory import AnsibleInventory
+from common.jobs import pid_alive
 from common.plugin_base import BasePlugin
+from plugins.production.playbook.results import HostResultsStore, RunIngestor
+
+# Run life cycle: queued (waiting for a run slot) -> running -> ok | failed | cancelled
+# error means ansible-playbook could not be started at all, lost that the
+# Overlord process owning the run died before it finished.
+RUN_FINISHED_STATUSES = ("ok", "failed", "cancelled", "error", "lost")
+
+# Default callback PLAY RECAP line:
+# c001 : ok=3    changed=1    unreachable=0    failed=0    skipped=2    rescued=0    ignored=0
+RECAP_RE = re.compile(
+    r"^(?P<host>\S+)\s+:\s+ok=(?P<ok>\d+)\s+changed=(?P<changed>\d+)\s+"
+    r"unreachable=(?P<unreachable>\d+)\s+failed=(?P<failures>\d+)"
+    r"(?:\s+skipped=(?P<skipped>\d+))?(?:\s+rescued=(?P<rescued>\d+))?(?:\s+ignored=(?P<ignored>\d+))?"
+)
+
+PLAYBOOK_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+# Sharding: group name prefix used to split hosts, chunks splits evenly
+SHARD_GROUP_PREFIXES = {"rack": "rack_", "function": "fn_"}
+
+
+class RunStore:
+    """
+    Playbook run records, stored under <working_folder>/playbook/runs:
+    <run_id>.json for the record, <run_id>.log for the full output.
+    Shared by CLI and UI/API workers.
+    """
+
+    def __init__(self, working_folder: str):
+        self.runs_dir = os.path.join(os.path.abspath(working_folder), "playbook", "runs")
+        os.makedirs(self.runs_dir, exist_ok=True)
+        self.lock_path = os.path.join(self.runs_dir, ".lock")
+
+    @contextmanager
+    def locked(self):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def path(self, run_id: str) -> str:
+        return os.path.join(self.runs_dir, f"{run_id}.json")
+
+    def log_path(self, run_id: str) -> str:
+        return os.path.join(self.runs_dir, f"{run_id}.log")
+
+    def limit_path(self, run_id: str, shard: int) -> str:
+        return os.path.join(self.runs_dir, f"{run_id}.shard{shard}.limit")
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        path = self.path(record["id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def create(self, record: Dict[str, Any], keep: int = 200) -> Dict[str, Any]:
+        with self.locked():
+            self._write(record)
+            open(self.log_path(record["id"]), "a").close()
+        self.purge(keep)
+        return record
+
+    def load(self, run_id: str) -> Dict[str, Any]:
+        if not run_id or os.sep in run_id or run_id.startswith("."):
+            raise NotFoundError(f"Run {run_id} not found")
+        try:
+            with open(self.path(run_id), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            raise NotFoundError(f"Run {run_id} not found")
+        if record["status"] not in RUN_FINISHED_STATUSES and not pid_alive(record.get("owner")):
+            record["status"] = "lost"
+        return record
+
+    def update(self, run_id: str, **fields) -> Dict[str, Any]:
+        with self.locked():
+            record = self.load(run_id)
+            record.update(fields)
+            self._write(record)
+            return record
+
+    def update_shard(self, run_id: str, shard: int, **fields) -> Dict[str, Any]:
+        with self.locked():
+            record = self.load(run_id)
+            record["shards"][shard].update(fields)
+            self._write(record)
+            return record
+
+    def list(self) -> List[Dict[str, Any]]:
+        records = []
+        for fname in os.listdir(self.runs_dir):
+            if fname.endswith(".json"):
+                try:
+                    records.append(self.load(fname[:-len(".json")]))
+                except (NotFoundError, ValueError):
+                    continue
+        return sorted(records, key=lambda r: r["created"], reverse=True)
+
+    def purge(self, keep: int) -> None:
+        """
+        Keep only the last <keep> finished runs.
+        """
+        finished = [r for r in self.list() if r["status"] in RUN_FINISHED_STATUSES]
+        for record in finished[keep:]:
+            # Record, log and shard limit files
+            for fname in os.listdir(self.runs_dir):
+                if fname.startswith(record["id"] + "."):
+                    os.remove(os.path.join(self.runs_dir, fname))
+
+
+class RunSlots:
+    """
+    Limit the number of ansible-playbook processes running at once, across
+    all processes sharing the working folder. A slot is an exclusive flock on
+    slot.<n>.lock, released by the kernel even if its holder crashes.
+    """
+
+    def __init__(self, runs_dir: str, max_runs: int):
+        self.runs_dir = runs_dir
+        self.max_runs = max(1, int(max_runs))
+
+    @contextmanager
+    def acquire(self, should_stop=None, poll_interval: float = 1.0):
+        """
+        Wait for a free slot, yield its number, or None if should_stop()
+        returned True while waiting.
+        """
+        while True:
+            for n in range(self.max_runs):
+                lock = open(os.path.join(self.runs_dir, f"slot.{n}.lock"), "a")
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock.close()
+                    continue
+                try:
+                    yield n
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                    lock.close()
+                return
+            if should_stop is not None and should_stop():
+                yield None
+                return
+            time.sleep(poll_interval)
+
 
 class Plugin(BasePlugin):
+
+    ASYNC_ACTIONS = ["run"]
+
     def __init__(self, action_args, config, logger, global_args):
         """
-        action_args: list of tokens, e.g. ["add", "c001", '{"c001": {"alias": "compute-1"}}']
-        inventory: AnsibleInventory instance
-        config: plugin-specific config (unused for now)
+        action_args: list of tokens, e.g. ["run", "computes.yml", "--limit", "c001"]
+        config: plugin-specific config (ansible-playbook command, paths, limits)
         logger: shared logger
         global_args: dict with context (diff, check, inventory_root, etc.)
         """
         super().__init__(action_args, config, logger, global_args)
-      
-        # Load inventory
-        self.logger.debug("Loading inventory...")
-        self.inventory = AnsibleInventory(
-            inventory_root=self.global_args['inventory_root'],
-            working_folder=self.global_args['working_folder'],
-            diff=self.global_args['diff'],
-            check=self.global_args['check'],
-            logger=self.logger,
-        )
-        # self.logger.debug("Current inventory:" + str(self.inventory.show()))
+
+        self.runs = RunStore(self.global_args["working_folder"])
+        self.inventory = None
+        self.results = HostResultsStore(self.global_args["working_folder"])
+        # Per host results of the run in progress
+        self.ingestor = None
+        # When True, run output is also written to stdout (CLI)
+        self.echo = False
 
 ######################## CLI ENTRY POINT ########################
 
@@ -34,11 +199,11 @@ class Plugin(BasePlugin):
         CLI entry: parse self.action_args, build a payload, and delegate to execute().
         """
 
-        self.logger.debug("Entering CLI network plugin")
+        self.logger.debug("Entering CLI playbook plugin")
         ##################### CHECKS
 
         # We define supported actions, to be filtered later
-        SUPPORTED_ACTIONS = ["list", "add", "get", "update", "delete"]
+        SUPPORTED_ACTIONS = ["list", "get", "run", "runs", "show", "log", "cancel", "hosts", "host", "results"]
         # Check there is action
         if not self.action_args:
             return self.api_error("No action specified. Use: " + str(SUPPORTED_ACTIONS))
@@ -46,86 +211,92 @@ class Plugin(BasePlugin):
         action = self.action_args[0]
         # Check action is allowed by plugin
         if action not in SUPPORTED_ACTIONS:
-            return api_error(f"Unsupported action '{action}'. Allowed actions: '{str(SUPPORTED_ACTIONS)}'")
-
+            return self.api_error(f"Unsupported action '{action}'. Allowed actions: '{str(SUPPORTED_ACTIONS)}'")
 
         ##################### FILTER ACTION AND BUILD PAYLOAD
 
-        # Now we need to create the payload, it should be similar to something sent via HTML
-        # to have execute handle both HTML and CLI :)
-
-        if action == "list":
-            payload = {}
-
         args = self.action_args[1:]
-        if action in ("add", "get", "update", "delete"):
-            if not args:
-                raise ValueError(f"{action} requires at least HOSTNAME")
-
-            networkname = args[0]
-
-            if action == "get" or action == "delete":
-                payload = {networkname}
+        if action in ("list", "runs"):
+            payload = {}
 
-            elif action == "add":
-                if len(args) < 2:
-                    # No JSON provided: minimal data
-                    payload = {networkname: {}}
+        elif action == "hosts":
+            # Optional status filter: ok, failed, unreachable, running
+            payload = {"status": args[0]} if args else {}
+
+        elif action == "run":
+            parser = argparse.ArgumentParser(prog="bluebanquise-overlord.py production playbook run")
+            parser.add_argument("playbook")
+            parser.add_argument("-l", "--limit")
+            parser.add_argument("-t", "--tags")
+            parser.add_argument("--skip-tags")
+            parser.add_argument("-e", "--extra-vars", action="append", default=[],
+                                help="JSON or key=value, can be repeated")
+            parser.add_argument("--shard-by", choices=["rack", "function", "chunks"],
+                                help="Split hosts into concurrent ansible-playbook processes")
+            parser.add_argument("--shards", type=int, help="Number of chunks, with --shard-by chunks")
+            parser.add_argument("--parallel", type=int, help="Shards running at once")
+            parser.add_argument("--forks", type=int, help="Forks budget, shared by running shards")
+            parser.add_argument("--max-failure-ratio", type=float,
+                                help="Stop starting shards above this ratio of failed hosts")
+            try:
+                parsed = parser.parse_args(args)
+            except SystemExit:
+                return self.api_error("Invalid run arguments")
+            extra_vars = {}
+            for extra in parsed.extra_vars:
+                if extra.strip().startswith("{"):
+                    extra_vars.update(json.loads(extra))
                 else:
-                    # JSON, lets read it and inculde it as data to payload
-                    try:
-                        data = json.loads(args[1])
-                    except json.JSONDecodeError as e:
-                        raise ValueError(f"Invalid JSON: {e}") from e
-                    payload = {networkname: data}
-
-            elif action == "update":
-                if len(args) < 2:
-                    raise ValueError("Update requires JSON or key=value pairs")
-
-                update_payload = args[1]
-                # User could provide both json or foo.stuff=bar
-                if update_payload.strip().startswith("{"):  # This is JSON, try to load it
-                    try:
-                        data = json.loads(update_payload)
-                    except json.JSONDecodeError as e:
-                        raise ValueError(f"Invalid JSON: {e}") from e
-                else:  # This is foo.stuff=bar, try to load it
-                    data = self.parse_update_kv(args[1:])
-                payload = {networkname: data}
-            else:
-                raise ValueError(f"Unknown action: {action}")
-                return self.api_error(str(f"Unknown action: {action}"))
-
+                    key, _, value = extra.partition("=")
+                    extra_vars[key] = value
+            payload = {
+                parsed.playbook: {
+                    "limit": parsed.limit,
+                    "tags": parsed.tags,
+                    "skip_tags": parsed.skip_tags,
+                    "extra_vars": extra_vars,
+                    # Global -c/--check and -D/--diff are forwarded to ansible
+                    "check": self.global_args.get("check", False),
+                    "diff": self.global_args.get("diff", False),
+                }
+            }
+            if parsed.shard_by:
+                payload[parsed.playbook]["shard"] = {
+                    "by": parsed.shard_by,
+                    "count": parsed.shards,
+                    "parallel": parsed.parallel,
+                    "forks": parsed.forks,
+                    "max_failure_ratio": parsed.max_failure_ratio,
+                }
+            elif parsed.forks:
+                payload[parsed.playbook]["forks"] = parsed.forks
+            self.echo = True
+
+        else:
+            if not args:
+                expected = {"get": "PLAYBOOK", "host": "HOSTNAME"}.get(action, "RUN_ID")
+                return self.api_error(f"{action} requires a {expected}")
+            payload = {args[0]}
 
         ##################### EXECUTE
 
-        # Payload is ready, lets call main execute now
         try:
+            if action == "log":
+                return self.cli_follow_log(args[0])
             return self.execute(action, payload)
         except Exception as e:
-            self.logger.exception("Error in network plugin")
+            self.logger.exception("Error in playbook plugin")
             return self.api_error(str(e))
 
-    # Function to parse dot like dict path
-    # Can be improved later
-    def parse_update_kv(self, kv_args):
-        data = {}
-        for kv in kv_args:
-            if "=" not in kv:
-                raise ValueError(f"Invalid key=value pair: {kv}")
-            path, value = kv.split("=", 1)
-
-            # Special case: vars.* goes into nested dict
-            if path.startswith("vars."):
-                if "vars" not in data:
-                    data["vars"] = {}
-                self.set_deep(data["vars"], path[5:], value)
-            else:
-                data[path] = value
-
-        return data
-
+    def cli_follow_log(self, run_id):
+        """
+        Print a run output, following it until the run is finished.
+        """
+        for line in self.follow_run_log(run_id):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        record = self.runs.load(run_id)
+        return self.api_ok(message=f"Run {run_id} {record['status']}")
 
 ######################## EXECUTE AND ACTIONS ########################
 
@@ -135,81 +306,542 @@ class Plugin(BasePlugin):
         payload structure depends on action:
 
         - list: {}
-        - add: { "net-admin": { ... } }
-        - get: { "net-admin" }
-        - update: { "net-admin": { ... } }
-        - delete: { "net-admin" }
+        - get: { "site.yml" }
+        - create_run: { "site.yml": { "limit": ..., "tags": ..., "extra_vars": {...}, "check": false,
+                                      "shard": { "by": "rack|function|chunks", "count": 4, "parallel": 4,
+                                                 "forks": 100, "max_failure_ratio": 0.2 } } }
+        - run: same as create_run, or { "run_id": ... } for a run created before
+        - runs: {}
+        - show: { run_id }
+        - cancel: { run_id }
+        - hosts: {} or { "status": "failed" }, last result of each host
+        - host: { hostname }, results history of hosts
+        - results: { run_id }, per host results of runs
         """
 
         if action == "list":
             return self.action_list(payload)
-        elif action == "add":
-            return self.action_add(payload)
         elif action == "get":
             return self.action_get(payload)
-        elif action == "update":
-            return self.action_update(payload)
-        elif action == "delete":
-            return self.action_delete(payload)
+        elif action == "create_run":
+            return self.action_create_run(payload)
+        elif action == "run":
+            return self.action_run(payload)
+        elif action == "runs":
+            return self.action_runs(payload)
+        elif action == "show":
+            return self.action_show(payload)
+        elif action == "cancel":
+            return self.action_cancel(payload)
+        elif action == "hosts":
+            return self.action_hosts(payload)
+        elif action == "host":
+            return self.action_host(payload)
+        elif action == "results":
+            return self.action_results(payload)
+        return self.api_error(f"Unknown action: {action}")
+
+    # ------------- Utility -------------
+
+    def playbooks_path(self) -> str:
+        return self.config.get("playbooks_path", "/var/lib/bluebanquise/playbooks")
+
+    def playbook_file(self, name: str) -> str:
+        if not PLAYBOOK_NAME_RE.match(name or ""):
+            raise ValidationError(f"Invalid playbook name {name}")
+        for candidate in (name, f"{name}.yml", f"{name}.yaml"):
+            path = os.path.join(self.playbooks_path(), candidate)
+            if os.path.isfile(path):
+                return path
+        raise NotFoundError(f"Playbook {name} not found in {self.playbooks_path()}")
+
+    def build_command(self, playbook_path: str, options: Dict[str, Any]) -> List[str]:
+        command = [self.config.get("ansible_playbook", "ansible-playbook"), playbook_path]
+        if options.get("limit"):
+            command += ["--limit", str(options["limit"])]
+        if options.get("tags"):
+            command += ["--tags", str(options["tags"])]
+        if options.get("skip_tags"):
+            command += ["--skip-tags", str(options["skip_tags"])]
+        if options.get("extra_vars"):
+            command += ["--extra-vars", json.dumps(options["extra_vars"])]
+        if options.get("forks"):
+            command += ["--forks", str(int(options["forks"]))]
+        if options.get("check"):
+            command.append("--check")
+        if options.get("diff"):
+            command.append("--diff")
+        return command
+
+    def run_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["ANSIBLE_CONFIG"] = self.config.get("ansible_config", "/var/lib/bluebanquise/bluebanquise/ansible.cfg")
+        env["ANSIBLE_NOCOLOR"] = "1"
+        env["ANSIBLE_FORCE_COLOR"] = "0"
+        env["PYTHONUNBUFFERED"] = "1"
+        # e.g. ansible.posix.jsonl, one JSON event per line
+        if self.config.get("stdout_callback"):
+            env["ANSIBLE_STDOUT_CALLBACK"] = self.config["stdout_callback"]
+            env["ANSIBLE_LOAD_CALLBACK_PLUGINS"] = "1"
+        return env
+
+    def follow_run_log(self, run_id: str, offset: int = 0, max_duration: float = 0):
+        self.runs.load(run_id)
+        return follow_file(
+            self.runs.log_path(run_id),
+            lambda: self.runs.load(run_id)["status"] in RUN_FINISHED_STATUSES,
+            offset=offset,
+            max_duration=max_duration,
+        )
 
+    # ------------- Output parsing -------------
 
-    def action_list(self, payload):
-        networks = self.inventory.get_group('all')['vars'].get('networks',{'networks': {}})
-        return self.api_ok(data=networks)
+    def handle_line(self, line: str, stats: Dict[str, Dict[str, int]], stream: str = "") -> None:
+        """
+        Extract per host results from an output line, either a JSON callback
+        event or a default callback line. stream identifies the process
+        (shard) the line comes from.
+        """
+        if line.startswith("{"):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                return
+            self.handle_event(event, stats)
+            return
+        if self.ingestor is not None:
+            self.ingestor.line(line, stream)
+        match = RECAP_RE.match(line)
+        if match:
+            stats[match.group("host")] = {
+                k: int(v) for k, v in match.groupdict().items() if k != "host" and v is not None
+            }
+
+    def handle_event(self, event: Dict[str, Any], stats: Dict[str, Dict[str, int]]) -> None:
+        """
+        JSON callback event (ansible.posix.jsonl).
+        """
+        if self.ingestor is not None:
+            self.ingestor.event(event)
+        if event.get("_event") == "v2_playbook_on_stats":
+            for host, host_stats in (event.get("stats") or {}).items():
+                stats[host] = {k: int(v) for k, v in host_stats.items() if isinstance(v, int)}
 
-    # Support for multiple add to be added in cli parse later
-    def action_add(self, payload):
+    # ------------- Actions -------------
 
-        print(payload)
+    def action_list(self, payload):
+        playbooks = {}
+        path = self.playbooks_path()
+        if os.path.isdir(path):
+            for fname in sorted(os.listdir(path)):
+                if fname.endswith((".yml", ".yaml")) and os.path.isfile(os.path.join(path, fname)):
+                    st = os.stat(os.path.join(path, fname))
+                    playbooks[fname] = {"size": st.st_size, "mtime": st.st_mtime}
+        return self.api_ok(data={"playbooks": playbooks})
 
-        networks = self.inventory.get_group('all')['vars'].get('networks',{'networks': {}})
-        for networkname, network_data in payload.items():
-            if 'subnet' not in network_data:
-                return self.api_error("Subnet is required")
-            if 'prefix' not in network_data:
-                return self.api_error("Prefix is required")
-            networks['networks'][networkname] = network_data
-        self.inventory.update_group('all', None, {'networks': networks})
-        self.inventory.save()
+    def action_get(self, payload):
+        output = {}
+        for name in payload:
+            path = self.playbook_file(name)
+            with open(path, "r", encoding="utf-8") as f:
+                output[os.path.basename(path)] = {"path": path, "content": f.read()}
+        return self.api_ok(data={"playbooks": output})
+
+    def new_run(self, name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        options = options or {}
+        playbook_path = self.playbook_file(name)
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        record = {
+            "id": run_id,
+            "playbook": os.path.basename(playbook_path),
+            "options": options,
+            "command": self.build_command(playbook_path, options),
+            "status": "queued",
+            "owner": os.getpid(),
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "pid": None,
+            "returncode": None,
+            "stats": {},
+        }
+        if options.get("shard"):
+            record["playbook_path"] = playbook_path
+            shards = self.partition_hosts(
+                self.target_hosts(options.get("limit")),
+                options["shard"].get("by", "chunks"),
+                options["shard"].get("count"),
+            )
+            # Host lists can be large, they go to limit files, passed as --limit @file
+            record["shards"] = []
+            for index, (name, hosts) in enumerate(shards):
+                with open(self.runs.limit_path(run_id, index), "w", encoding="utf-8") as f:
+                    f.write("\n".join(hosts) + "\n")
+                record["shards"].append({"name": name, "hosts": len(hosts), "status": "pending"})
+        record = self.runs.create(record, keep=int(self.config.get("max_runs_kept", 200)))
+        self.results.purge([r["id"] for r in self.runs.list()])
+        return record
+
+    def action_create_run(self, payload):
+        if len(payload) != 1:
+            return self.api_error("Exactly one playbook per run")
+        name, options = next(iter(payload.items()))
+        record = self.new_run(name, options)
+        return self.api_ok(data={"run": record}, message=f"Run {record['id']} created")
+
+    def action_run(self, payload):
+        if "run_id" in payload:
+            record = self.runs.load(payload["run_id"])
+        else:
+            result = self.action_create_run(payload)
+            if result["status"] != "ok":
+                return result
+            record = result["data"]["run"]
+
+        record = self.run_playbook(record)
+        summary = (
+            f"Run {record['id']} {record['status']}: {len(record['stats'])} host(s), "
+            f"{len(record.get('failed_hosts', []))} failed, "
+            f"{len(record.get('unreachable_hosts', []))} unreachable"
+        )
+        if record["status"] != "ok":
+            return self.api_error(summary, data={"run": record})
+        return self.api_ok(data={"run": record}, message=summary)
 
-        return self.api_ok(message=f"Added {len(payload)} network(s)")
+    def run_process(self, run_id: str, command: List[str], log, log_lock, stats, prefix: str = "", on_start=None) -> int:
+        """
+        Run one ansible-playbook process, streaming its output line by line
+        to the run log (and stdout when echo is set). Only per host stats are
+        kept in memory. Returns the process return code.
+        """
+        ansible_config = self.run_env()["ANSIBLE_CONFIG"]
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            env=self.run_env(),
+            cwd=os.path.dirname(ansible_config) if os.path.isdir(os.path.dirname(ansible_config)) else None,
+            text=True,
+            bufsize=1,
+            errors="replace",
+            # Own process group, so cancel reaches ansible forks too
+            start_new_session=True,
+        )
+        if on_start is not None:
+            on_start(process.pid)
+
+        lines = 0
+        for line in process.stdout:
+            with log_lock:
+                log.write(prefix + line)
+                log.flush()
+                if self.echo:
+                    sys.stdout.write(prefix + line)
+                    sys.stdout.flush()
+            self.handle_line(line, stats, prefix)
+            lines += 1
+            if lines % 100 == 0:
+                self.job_progress(lines, None, f"Run {run_id}{prefix and ' ' + prefix.strip()}: {lines} output lines")
+        return process.wait()
+
+    def finish_run(self, run_id: str, status: str, stats, **fields) -> Dict[str, Any]:
+        if self.ingestor is not None:
+            self.ingestor.finish(stats)
+        return self.runs.update(
+            run_id,
+            status=status,
+            finished=time.time(),
+            stats=stats,
+            failed_hosts=sorted(h for h, s in stats.items() if s.get("failures")),
+            unreachable_hosts=sorted(h for h, s in stats.items() if s.get("unreachable")),
+            **fields,
+        )
 
-    def action_get(self, payload):
+    def run_playbook(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Launch ansible-playbook for a queued run record, once a run slot is
+        free.
+        """
+        self.ingestor = RunIngestor(
+            self.results, record["id"], record["playbook"],
+            flush_interval=float(self.config.get("results_flush_interval", 2)),
+        )
+        if record.get("shards"):
+            return self.run_sharded(record)
+
+        run_id = record["id"]
+        slots = RunSlots(self.runs.runs_dir, self.config.get("max_concurrent_runs", 2))
+
+        def cancelled():
+            return self.runs.load(run_id).get("cancel_requested", False)
+
+        def started(pid):
+            self.runs.update(run_id, status="running", owner=os.getpid(), started=time.time(), pid=pid)
+            self.job_log(f"Run {run_id} started, pid {pid}")
+
+        stats: Dict[str, Dict[str, int]] = {}
+        with slots.acquire(should_stop=cancelled) as slot:
+            if slot is None or cancelled():
+                return self.runs.update(run_id, status="cancelled", finished=time.time())
+
+            with open(self.runs.log_path(run_id), "a", encoding="utf-8") as log:
+                try:
+                    returncode = self.run_process(
+                        run_id, record["command"], log, threading.Lock(), stats, on_start=started
+                    )
+                except OSError as e:
+                    log.write(f"Failed to start ansible-playbook: {e}\n")
+                    return self.runs.update(run_id, status="error", finished=time.time(), error=str(e))
+
+        if returncode == 0:
+            status = "ok"
+        elif cancelled():
+            status = "cancelled"
+        else:
+            status = "failed"
+        return self.finish_run(run_id, status, stats, returncode=returncode)
+
+    # ------------- Sharded runs -------------
+
+    def load_inventory(self) -> AnsibleInventory:
+        # Only sharded runs need the inventory, load it once on demand
+        if self.inventory is None:
+            self.inventory = AnsibleInventory(
+                inventory_root=self.global_args["inventory_root"],
+                working_folder=self.global_args["working_folder"],
+                logger=self.logger,
+            )
+        return self.inventory
+
+    def target_hosts(self, limit: str = None) -> List[str]:
+        """
+        Resolve a limit made of host and group names (comma or colon
+        separated) into a sorted host list, using the inventory.
+        """
+        inventory = self.load_inventory()
+        hosts = inventory.list_hosts()
+        groups = inventory.list_groups()
+        if not limit or limit == "all":
+            return sorted(hosts)
+
+        selected = set()
+        for pattern in re.split(r"[,:]", limit):
+            if not pattern:
+                continue
+            if pattern == "all":
+                selected.update(hosts)
+            elif pattern in groups:
+                selected.update(h for h in groups[pattern].get("hosts", []) if h in hosts)
+            elif pattern in hosts:
+                selected.add(pattern)
+            else:
+                raise ValidationError(
+                    f"Cannot shard on limit pattern '{pattern}', only host and group names are supported"
+                )
+        return sorted(selected)
+
+    def partition_hosts(self, hosts: List[str], by: str, count: int = None) -> List[tuple]:
+        """
+        Split hosts into shards, returns a list of (shard name, hosts).
+        rack/function: one shard per rack_*/fn_* group, hosts in none of
+        them go to an "ungrouped" shard. chunks: count even chunks.
+        """
+        if not hosts:
+            raise ValidationError("No hosts to run on")
+
+        if by == "chunks":
+            count = max(1, min(int(count or self.config.get("shard_count", 4)), len(hosts)))
+            size = math.ceil(len(hosts) / count)
+            return [
+                (f"chunk{i}", hosts[i * size:(i + 1) * size])
+                for i in range(count)
+                if hosts[i * size:(i + 1) * size]
+            ]
+
+        if by not in SHARD_GROUP_PREFIXES:
+            raise ValidationError(f"Unknown shard mode '{by}', use rack, function or chunks")
+
+        inventory = self.load_inventory()
+        wanted = set(hosts)
+        assigned = set()
+        shards = []
+        for group_name, group in sorted(inventory.list_groups().items()):
+            if not group_name.startswith(SHARD_GROUP_PREFIXES[by]):
+                continue
+            members = sorted(h for h in group.get("hosts", []) if h in wanted and h not in assigned)
+            if members:
+                assigned.update(members)
+                shards.append((group_name, members))
+        leftover = sorted(wanted - assigned)
+        if leftover:
+            shards.append(("ungrouped", leftover))
+        return shards
+
+    def run_sharded(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run shards as concurrent ansible-playbook --limit processes, no
+        more at once than run slots. Each shard takes a run slot and its
+        share of the forks budget among the shards running with it. Shards
+        not started yet are skipped once the ratio of failed (or
+        unreachable) hosts over hosts done exceeds max_failure_ratio.
+        """
+        run_id = record["id"]
+        options = record["options"]
+        shard_options = options["shard"]
+        shards = record["shards"]
+        slots = RunSlots(self.runs.runs_dir, self.config.get("max_concurrent_runs", 2))
+
+        # Shards beyond run slots would only wait for one, out of reach of
+        # the failure ratio check which skips shards not submitted yet
+        parallel = max(1, min(int(shard_options.get("parallel") or len(shards)), len(shards), slots.max_runs))
+        forks_budget = int(shard_options.get("forks") or self.config.get("shard_forks", 100))
+        max_failure_ratio = shard_options.get("max_failure_ratio")
+        if max_failure_ratio is None:
+            max_failure_ratio = self.config.get("shard_max_failure_ratio", 1.0)
+        max_failure_ratio = float(max_failure_ratio)
+
+        def cancelled():
+            return self.runs.load(run_id).get("cancel_requested", False)
+
+        self.runs.update(run_id, status="running", owner=os.getpid(), started=time.time())
+        stats: Dict[str, Dict[str, int]] = {}
+        log_lock = threading.Lock()
+
+        def run_shard(index, log, forks):
+            shard = shards[index]
+            with slots.acquire(should_stop=cancelled) as slot:
+                if slot is None or cancelled():
+                    self.runs.update_shard(run_id, index, status="cancelled")
+                    return None
+                command = self.build_command(
+                    record["playbook_path"],
+                    dict(options, limit="@" + self.runs.limit_path(run_id, index), forks=forks),
+                )
+                shard_stats: Dict[str, Dict[str, int]] = {}
+                returncode = self.run_process(
+                    run_id, command, log, log_lock, shard_stats,
+                    prefix=f"[{shard['name']}] ",
+                    on_start=lambda pid: self.runs.update_shard(
+                        run_id, index, status="running", pid=pid, started=time.time()
+                    ),
+                )
+            stats.update(shard_stats)
+            self.runs.update_shard(
+                run_id, index,
+                status="ok" if returncode == 0 else "failed",
+                returncode=returncode,
+                finished=time.time(),
+            )
+            return returncode, shard_stats
+
+        pending = list(range(len(shards)))
+        running = {}
+        hosts_done = 0
+        hosts_failed = 0
+        stopped = False
+        failed = False
+        errors = []
+
+        with open(self.runs.log_path(run_id), "a", encoding="utf-8") as log, \
+                ThreadPoolExecutor(max_workers=parallel) as executor:
+            while pending or running:
+                while pending and len(running) < parallel and not stopped:
+                    # Budget shared with the shards running alongside this one
+                    forks = max(1, forks_budget // min(parallel, len(running) + len(pending)))
+                    index = pending.pop(0)
+                    running[executor.submit(run_shard, index, log, forks)] = index
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        # Shard state unknown: do not start any other
+                        reason = "Failed to start ansible-playbook" if isinstance(e, OSError) else "Shard failed"
+                        with log_lock:
+                            log.write(f"[{shards[index]['name']}] {reason}: {e}\n")
+                        self.runs.update_shard(run_id, index, status="error", error=str(e), finished=time.time())
+                        errors.append(f"{shards[index]['name']}: {e}")
+                        continue
+                    if outcome is None:
+                        continue
+                    returncode, shard_stats = outcome
+                    failed = failed or returncode != 0
+                    bad = sum(1 for s in shard_stats.values() if s.get("failures") or s.get("unreachable"))
+                    if returncode != 0 and not bad:
+                        # Failed before reaching hosts (syntax error, ...)
+                        bad = shards[index]["hosts"]
+                    hosts_done += shards[index]["hosts"]
+                    hosts_failed += bad
+                    self.job_progress(hosts_done, sum(s["hosts"] for s in shards), f"Run {run_id}: {hosts_failed} failed host(s)")
+
+                if pending and not stopped and (
+                    errors or cancelled() or (hosts_done and hosts_failed / hosts_done > max_failure_ratio)
+                ):
+                    stopped = True
+                    with log_lock:
+                        if errors:
+                            log.write(f"Stopping: shard error, {len(pending)} shard(s) skipped\n")
+                        else:
+                            log.write(
+                                f"Stopping: {hosts_failed}/{hosts_done} hosts failed "
+                                f"(max ratio {max_failure_ratio}), {len(pending)} shard(s) skipped\n"
+                            )
+                    for index in pending:
+                        self.runs.update_shard(run_id, index, status="skipped")
+                    pending = []
+
+        fields = {"error": "; ".join(errors)} if errors else {}
+        if errors:
+            status = "error"
+        elif cancelled():
+            status = "cancelled"
+        elif failed or stopped:
+            status = "failed"
+        else:
+            status = "ok"
+        return self.finish_run(run_id, status, stats, stopped=stopped, **fields)
+
+    def action_runs(self, payload):
+        return self.api_ok(data={"runs": self.runs.list()})
+
+    def action_show(self, payload):
+        output = {}
+        for run_id in payload:
+            output[run_id] = self.runs.load(run_id)
+        return self.api_ok(data={"runs": output})
+
+    def action_cancel(self, payload):
+        for run_id in payload:
+            record = self.runs.update(run_id, cancel_requested=True)
+            if record["status"] != "running":
+                continue
+            pids = [record.get("pid")]
+            pids += [s.get("pid") for s in record.get("shards", []) if s.get("status") == "running"]
+            for pid in pids:
+                if not pid:
+                    continue
+                try:
+                    os.killpg(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        return self.api_ok(message=f"Cancel requested for {len(payload)} run(s)")
+
+    def action_hosts(self, payload):
+        hosts = self.results.last_results(payload.get("status") if payload else None)
+        return self.api_ok(data={"hosts": hosts})
+
+    def action_host(self, payload):
+        output = {}
+        for hostname in payload:
+            output[hostname] = self.results.host_history(hostname)
+        return self.api_ok(data={"hosts": output})
 
+    def action_results(self, payload):
         output = {}
-        networks = self.inventory.get_group('all')['vars'].get('networks',{'networks': {}})
-        for networkname in payload:
-            if networkname not in networks['networks']:
-                return self.api_error(f"Network {networkname} not found")
-            output[networkname] = networks['networks'][networkname]
-
-        return self.api_ok(data={"networks": output})
-
-    def action_update(self, payload):
-
-        networks = self.inventory.get_group('all')['vars'].get('networks',{'networks': {}})
-        for networkname, network_data in payload.items():
-            if not networkname:
-                return self.api_error("networkname is required")
-            if not isinstance(network_data, dict) or not network_data:
-                return self.api_error("data must be a non-empty dict")
-            if networkname not in networks['networks']:
-                return self.api_error(f"Network {networkname} not found")
-            networks['networks'][networkname] = network_data
-
-        self.inventory.update_group('all', None, {'networks': networks})
-        self.inventory.save()
-
-        return self.api_ok(message=f"Network {networkname} updated")
-
-    def action_delete(self, payload):
-
-        networks = self.inventory.get_group('all')['vars'].get('networks',{'networks': {}})
-        for networkname in payload:
-            if networkname not in networks['networks']:
-                return self.api_error(f"Network {networkname} not found")
-            networks['networks'].pop(networkname)
-        self.inventory.update_group('all', None, {'networks': networks})
-        self.inventory.save()
-
-        return self.api_ok(message=f"Network {networkname} deleted")
+        for run_id in payload:
+            self.runs.load(run_id)
+            output[run_id] = self.results.run_results(run_id)
+        return self.api_ok(data={"runs": output})
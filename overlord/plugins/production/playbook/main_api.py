@@ -1,9 +1,10 @@
-# plugins/inventory/playbook/main_ui.py
+# plugins/production/playbook/main_api.py
 
 from typing import Any, Dict
 
 from flask import (
     Blueprint,
+    Response,
     request,
     jsonify,
     current_app,
@@ -12,6 +13,7 @@ from flask import (
 from flask_restful import Api, Resource
 
 from common.files import load_yaml_file
+from common.jobs import async_requested, dispatch_action
 from common.logging import configure_logging
 
 # Import plugin logic
@@ -25,9 +27,9 @@ blueprint = Blueprint(
 api = Api(blueprint)
 
 
-def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+def get_plugin_args(action: str) -> Dict[str, Any]:
     """
-    Instantiate playbookPlugin and execute a specific action with payload.
+    Arguments to instantiate playbookPlugin for a specific action.
     """
     cfg = current_app.config.get("OVERLORD_CONFIG", {})
 
@@ -56,16 +58,28 @@ def call_plugin(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "config": cfg,
     }
 
-    # Ok ready to call plugin, init it
-    plugin = playbookPlugin(
-        action_args=[action],
-        config=plugin_config,
-        logger=logger,
-        global_args=global_ctx,
-    )
+    return {
+        "action_args": [action],
+        "config": plugin_config,
+        "logger": logger,
+        "global_args": global_ctx,
+    }
+
+
+def get_plugin(action: str) -> playbookPlugin:
+    """
+    Instantiate playbookPlugin for a specific action.
+    """
+    return playbookPlugin(**get_plugin_args(action))
+
 
-    # All went well, execute with payload and action
-    return plugin.execute(action, payload)
+def call_plugin(action: str, payload: Dict[str, Any], run_async: bool = False) -> Dict[str, Any]:
+    """
+    Instantiate playbookPlugin and execute a specific action with payload.
+    With run_async, allowed actions are submitted as background jobs.
+    """
+    # Ok ready to call plugin, it is instantiated where the action runs
+    return dispatch_action(playbookPlugin, get_plugin_args(action), action, payload, run_async)
 
 
 ################## REST API ##################
@@ -78,60 +92,124 @@ class playbookListResource(Resource):
         status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
-    def post(self):
+
+class playbookResource(Resource):
+    def get(self, playbookname: str):
+        payload = {playbookname}
+        result = call_plugin("get", payload)
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+class playbookRunResource(Resource):
+    def post(self, playbookname: str):
         """
-        Payload expected:
+        Start a playbook run, add ?async=1 to run it in background.
+        Payload, all optional:
         {
-          "net-admin": {
-            "subnet": "10.10.0.0",
-            ...
-          }
+          "limit": "c001,c002",
+          "tags": "...",
+          "skip_tags": "...",
+          "extra_vars": {...},
+          "check": false,
+          "diff": false
         }
         """
-        data = request.get_json(force=True, silent=True)
-        if not isinstance(data, dict) or not data:
+        data = request.get_json(force=True, silent=True) or {}
+        if not isinstance(data, dict):
             return {
                 "status": "error",
-                "message": "JSON payload must be a non-empty object",
+                "message": "JSON payload must be an object",
             }, 400
 
-        payload = data
-        result = call_plugin("add", payload)
-        status_code = 201 if result.get("status") == "ok" else 400
+        # Run record is created right away, so its output can be followed
+        # while the run is waiting for a slot in background.
+        result = call_plugin("create_run", {playbookname: data})
+        if result.get("status") != "ok":
+            return result, 400
+        run = result["data"]["run"]
+
+        result = call_plugin("run", {"run_id": run["id"]}, async_requested(request.args))
+        if "job_id" in result.get("data", {}):
+            result["data"]["run"] = run
+            return result, 202
+        status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
 
-class playbookResource(Resource):
-    def get(self, playbookname: str):
-        payload = {playbookname}
-        result = call_plugin("get", payload)
+class playbookRunsResource(Resource):
+    def get(self):
+        result = call_plugin("runs", {})
+        status_code = 200 if result.get("status") == "ok" else 400
+        return result, status_code
+
+
+class playbookRunDetailsResource(Resource):
+    def get(self, run_id: str):
+        result = call_plugin("show", {run_id})
         status_code = 200 if result.get("status") == "ok" else 404
         return result, status_code
 
-    def put(self, playbookname: str):
+    def delete(self, run_id: str):
         """
-        Update playbook.
-        Body is a dict of fields to update
+        Cancel a queued or running run.
         """
-        data = request.get_json(force=True, silent=True)
-        if not isinstance(data, dict):
-            return {
-                "status": "error",
-                "message": "JSON payload must be an object",
-            }, 400
+        result = call_plugin("cancel", {run_id})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
+
+
+class playbookRunResultsResource(Resource):
+    def get(self, run_id: str):
+        result = call_plugin("results", {run_id})
+        status_code = 200 if result.get("status") == "ok" else 404
+        return result, status_code
 
-        payload = {playbookname: data}
-        result = call_plugin("update", payload)
+
+class playbookHostsResource(Resource):
+    def get(self):
+        """
+        Last playbook result of every host, ?status=failed to filter.
+        """
+        payload = {"status": request.args.get("status")} if request.args.get("status") else {}
+        result = call_plugin("hosts", payload)
         status_code = 200 if result.get("status") == "ok" else 400
         return result, status_code
 
-    def delete(self, playbookname: str):
-        payload = {playbookname}
-        result = call_plugin("delete", payload)
+
+class playbookHostResource(Resource):
+    def get(self, hostname: str):
+        result = call_plugin("host", {hostname})
         status_code = 200 if result.get("status") == "ok" else 404
         return result, status_code
 
 
+class playbookRunLogResource(Resource):
+    def get(self, run_id: str):
+        """
+        Run output as plain text, streamed line by line until the run is
+        finished, or for ui.log_max_duration seconds: clients then resume
+        with ?offset=<bytes received>.
+        """
+        cfg = current_app.config.get("OVERLORD_CONFIG", {})
+        stream = get_plugin("log").follow_run_log(
+            run_id,
+            offset=max(0, request.args.get("offset", 0, type=int)),
+            max_duration=float(cfg.get("ui", {}).get("log_max_duration", 300)),
+        )
+        return Response(
+            stream,
+            mimetype="text/plain",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
 api.add_resource(playbookListResource, "/api/v1/production/playbook")
+api.add_resource(playbookRunsResource, "/api/v1/production/playbook/runs")
+api.add_resource(playbookRunDetailsResource, "/api/v1/production/playbook/runs/<string:run_id>")
+api.add_resource(playbookRunLogResource, "/api/v1/production/playbook/runs/<string:run_id>/log")
+api.add_resource(playbookRunResultsResource, "/api/v1/production/playbook/runs/<string:run_id>/hosts")
+api.add_resource(playbookHostsResource, "/api/v1/production/playbook/hosts")
+api.add_resource(playbookHostResource, "/api/v1/production/playbook/hosts/<string:hostname>")
 api.add_resource(playbookResource, "/api/v1/production/playbook/<string:playbookname>")
-
+api.add_resource(playbookRunResource, "/api/v1/production/playbook/<string:playbookname>/run")
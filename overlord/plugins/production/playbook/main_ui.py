@@ -27,6 +27,7 @@ blueprint = Blueprint(
 
 ####################### HTML ENDPOINT #######################
 
+@blueprint.route("/production/playbook")
 @blueprint.route("/production/playbook/list")
 def playbook_list_page():
     return render_template(
@@ -34,19 +35,26 @@ def playbook_list_page():
         current_section="production",
     )
 
-@blueprint.route("/production/playbook/add")
-def playbook_add_page():
+@blueprint.route("/production/playbook/runs")
+def playbook_runs_page():
     return render_template(
-        "playbook/add.j2",
+        "playbook/runs.j2",
         current_section="production",
     )
 
-@blueprint.route("/production/playbook/delete/<string:playbookname>")
-def playbook_delete_page(playbookname: str):
+@blueprint.route("/production/playbook/runs/<string:run_id>")
+def playbook_run_page(run_id: str):
     return render_template(
-        "playbook/delete.j2",
+        "playbook/run.j2",
+        current_section="production",
+        run_id=run_id
+    )
+
+@blueprint.route("/production/playbook/hosts")
+def playbook_hosts_page():
+    return render_template(
+        "playbook/hosts.j2",
         current_section="production",
-        name=playbookname
     )
 
 @blueprint.route("/production/playbook/<string:playbookname>")
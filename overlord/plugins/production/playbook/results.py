@@ -0,0 +1,250 @@
+# plugins/production/playbook/results.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Default callback lines giving a per host task result:
+#   TASK [role : task name] ****
+#   ok: [c001]  /  changed: [c001] => (item=...)  /  skipping: [c001]
+#   fatal: [c001]: FAILED! => {...}  /  failed: [c001] (item=...) => {...}
+#   fatal: [c001]: UNREACHABLE! => {...}
+TASK_RE = re.compile(r"^TASK \[(?P<task>.*)\] \**$")
+HOST_RESULT_RE = re.compile(
+    r"^(?P<result>ok|changed|skipping|fatal|failed): \[(?P<host>[^\]\s]+)(?: -> [^\]]+)?\]"
+    r"(?P<unreachable>: UNREACHABLE!)?"
+)
+
+# JSON callback (ansible.posix.jsonl) runner events
+EVENT_RESULTS = {
+    "v2_runner_on_ok": "ok",
+    "v2_runner_on_failed": "failed",
+    "v2_runner_on_unreachable": "unreachable",
+    "v2_runner_on_skipped": "skipped",
+}
+
+# Failing task names kept per host and run
+MAX_FAILED_TASKS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS host_results (
+    run_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    playbook TEXT,
+    status TEXT NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    unreachable INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed_tasks TEXT NOT NULL DEFAULT '[]',
+    started REAL,
+    finished REAL,
+    PRIMARY KEY (run_id, host)
+);
+CREATE INDEX IF NOT EXISTS host_results_host ON host_results (host, finished);
+"""
+
+COLUMNS = ["run_id", "host", "playbook", "status", "ok", "changed", "failed",
+           "unreachable", "skipped", "failed_tasks", "started", "finished"]
+
+
+class HostResultsStore:
+    """
+    Per host playbook results, one row per (run, host), in a SQLite
+    database under <working_folder>/playbook/results.db. Indexed by run
+    (primary key) and by host, so both "what happened in this run" and
+    "what is the last result of this host" are cheap queries.
+    """
+
+    def __init__(self, working_folder: str):
+        folder = os.path.join(os.path.abspath(working_folder), "playbook")
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, "results.db")
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        # Readers (UI) do not block the writer (a running playbook)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in COLUMNS[2:])
+        with self.connect() as db:
+            db.executemany(
+                f"INSERT INTO host_results ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (run_id, host) DO UPDATE SET {updates}",
+                [[json.dumps(r[c]) if c == "failed_tasks" else r.get(c) for c in COLUMNS] for r in rows],
+            )
+
+    def _rows(self, query: str, args=()) -> List[Dict[str, Any]]:
+        with self.connect() as db:
+            rows = db.execute(query, args).fetchall()
+        output = []
+        for row in rows:
+            entry = dict(row)
+            entry["failed_tasks"] = json.loads(entry["failed_tasks"] or "[]")
+            if entry["started"] and entry["finished"]:
+                entry["duration"] = round(entry["finished"] - entry["started"], 3)
+            output.append(entry)
+        return output
+
+    def run_results(self, run_id: str) -> List[Dict[str, Any]]:
+        return self._rows("SELECT * FROM host_results WHERE run_id = ? ORDER BY host", (run_id,))
+
+    def host_history(self, host: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return self._rows(
+            "SELECT * FROM host_results WHERE host = ? ORDER BY finished DESC LIMIT ?", (host, limit)
+        )
+
+    def last_results(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Last result of every host, optionally filtered on status.
+        """
+        query = (
+            "SELECT r.* FROM host_results r "
+            "JOIN (SELECT host, MAX(finished) AS finished FROM host_results GROUP BY host) last "
+            "ON r.host = last.host AND r.finished = last.finished"
+        )
+        args = ()
+        if status:
+            query += " WHERE r.status = ?"
+            args = (status,)
+        return self._rows(query + " ORDER BY r.host", args)
+
+    def purge(self, keep_runs: List[str]) -> None:
+        """
+        Drop results of runs no longer kept.
+        """
+        with self.connect() as db:
+            db.execute("CREATE TEMP TABLE keep (run_id TEXT PRIMARY KEY)")
+            db.executemany("INSERT OR IGNORE INTO keep VALUES (?)", [(r,) for r in keep_runs])
+            db.execute("DELETE FROM host_results WHERE run_id NOT IN (SELECT run_id FROM keep)")
+
+
+class RunIngestor:
+    """
+    Turn a run output into per host results as lines arrive, and write
+    changed hosts to the store every flush_interval seconds, so results are
+    visible while the run is going on. Safe to share between shards.
+    """
+
+    def __init__(self, store: HostResultsStore, run_id: str, playbook: str, flush_interval: float = 2.0):
+        self.store = store
+        self.run_id = run_id
+        self.playbook = playbook
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self.dirty = set()
+        self.last_flush = time.time()
+        # Current task of each output stream (shard), for the default callback
+        self.tasks: Dict[str, str] = {}
+
+    def _host(self, host: str, touch: bool = True) -> Dict[str, Any]:
+        entry = self.hosts.get(host)
+        if entry is None:
+            entry = {
+                "run_id": self.run_id, "host": host, "playbook": self.playbook, "status": "running",
+                "ok": 0, "changed": 0, "failed": 0, "unreachable": 0, "skipped": 0,
+                "failed_tasks": [], "started": time.time(), "finished": time.time(),
+            }
+            self.hosts[host] = entry
+        elif touch:
+            entry["finished"] = time.time()
+        self.dirty.add(host)
+        return entry
+
+    def _record(self, host: str, result: str, task: Optional[str], changed: bool = False) -> None:
+        entry = self._host(host)
+        if result == "ok":
+            entry["ok"] += 1
+            if changed:
+                entry["changed"] += 1
+        elif result in ("failed", "unreachable"):
+            entry[result] += 1
+            if task and task not in entry["failed_tasks"] and len(entry["failed_tasks"]) < MAX_FAILED_TASKS:
+                entry["failed_tasks"].append(task)
+        elif result == "skipped":
+            entry["skipped"] += 1
+
+    def line(self, line: str, stream: str = "") -> None:
+        """
+        Ingest a default callback output line.
+        """
+        match = TASK_RE.match(line.rstrip())
+        with self.lock:
+            if match:
+                self.tasks[stream] = match.group("task")
+            else:
+                match = HOST_RESULT_RE.match(line)
+                if match:
+                    result = match.group("result")
+                    if match.group("unreachable"):
+                        result = "unreachable"
+                    elif result in ("fatal", "failed"):
+                        result = "failed"
+                    elif result == "skipping":
+                        result = "skipped"
+                    elif result == "changed":
+                        result = "ok"
+                    self._record(match.group("host"), result, self.tasks.get(stream),
+                                 changed=match.group("result") == "changed")
+        self.maybe_flush()
+
+    def event(self, event: Dict[str, Any]) -> None:
+        """
+        Ingest a JSON callback event.
+        """
+        result = EVENT_RESULTS.get(event.get("_event"))
+        if result is None:
+            return
+        task = (event.get("task") or {}).get("name")
+        with self.lock:
+            for host, host_result in (event.get("hosts") or {}).items():
+                changed = isinstance(host_result, dict) and bool(host_result.get("changed"))
+                self._record(host, result, task, changed)
+        self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            rows = [dict(self.hosts[h], failed_tasks=list(self.hosts[h]["failed_tasks"])) for h in self.dirty]
+            self.dirty = set()
+            self.last_flush = time.time()
+        self.store.upsert(rows)
+
+    def finish(self, stats: Dict[str, Dict[str, int]]) -> None:
+        """
+        End of run: recap stats are authoritative for counters, set final
+        host status and write everything.
+        """
+        with self.lock:
+            for host, host_stats in stats.items():
+                entry = self._host(host, touch=False)
+                for key, stat in (("ok", "ok"), ("changed", "changed"), ("failed", "failures"),
+                                  ("unreachable", "unreachable"), ("skipped", "skipped")):
+                    if stat in host_stats:
+                        entry[key] = host_stats[stat]
+            for host, entry in self.hosts.items():
+                if entry["unreachable"]:
+                    entry["status"] = "unreachable"
+                elif entry["failed"]:
+                    entry["status"] = "failed"
+                else:
+                    entry["status"] = "ok"
+                self.dirty.add(host)
+        self.flush()
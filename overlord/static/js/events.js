@@ -0,0 +1,26 @@
+// static/js/events.js
+
+// Subscribe to the Overlord change feed (Server-Sent Events).
+// types: list of event type prefixes, e.g. ["host.", "group."]
+// handlers: { "host.added": (data) => {...}, ... }
+// The browser reconnects by itself, resuming from the last received event.
+function subscribeEvents(types, handlers) {
+    if (typeof EventSource === "undefined") {
+        return null;
+    }
+
+    const url = "/api/v1/events?types=" + encodeURIComponent(types.join(","));
+    const source = new EventSource(url);
+
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, (event) => {
+            try {
+                handler(JSON.parse(event.data));
+            } catch (e) {
+                console.error("Failed to handle event " + type + ":", e);
+            }
+        });
+    });
+
+    return source;
+}
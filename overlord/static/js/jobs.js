@@ -0,0 +1,70 @@
+// static/js/jobs.js
+//
+// Run an API action as a background job (?async=1) and follow it
+// until it is finished, showing its progress in a persistent toast.
+// Resolves with the job result data, rejects on job failure.
+
+async function apiJob(method, url, data = null, pollInterval = 1000) {
+    const sep = url.includes("?") ? "&" : "?";
+    const submitted = await apiRequest(method, `${url}${sep}async=1`, data);
+
+    // Action not allowed to run in background, it was executed right away
+    if (!submitted.job_id) {
+        return submitted;
+    }
+
+    const box = jobProgressBox();
+    try {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, pollInterval));
+            const job = (await apiRequest("GET", submitted.url)).job;
+            updateJobProgressBox(box, job);
+
+            if (["ok", "error", "lost"].includes(job.status)) {
+                const result = job.result || {};
+                if (job.status !== "ok") {
+                    const msg = result.message || `Job ${job.name} ${job.status}`;
+                    showNotification("is-danger", msg);
+                    throw new Error(msg);
+                }
+                if (result.message) {
+                    showNotification("is-success", result.message);
+                }
+                return result.data || {};
+            }
+        }
+    } finally {
+        hideToast(box);
+    }
+}
+
+function jobProgressBox() {
+    const container = document.getElementById("notification-container");
+    const box = document.createElement("div");
+    box.className = "notification is-info toast-notification";
+    box.style.pointerEvents = "auto";
+    box.style.minWidth = "300px";
+    box.style.maxWidth = "600px";
+    box.style.marginBottom = "0.5rem";
+    box.innerHTML = '<span class="job-message">Job submitted...</span>'
+        + '<progress class="progress is-small is-primary mt-2" max="100"></progress>';
+    if (container) {
+        container.appendChild(box);
+    }
+    return box;
+}
+
+function updateJobProgressBox(box, job) {
+    const progress = job.progress || {};
+    const message = box.querySelector(".job-message");
+    const bar = box.querySelector("progress");
+
+    message.textContent = progress.message || `${job.name}: ${job.status}`;
+    if (progress.total) {
+        bar.max = progress.total;
+        bar.value = progress.current;
+    } else {
+        // Indeterminate progress bar
+        bar.removeAttribute("value");
+    }
+}